@@ -0,0 +1,153 @@
+import copyreg
+import hashlib
+import io
+import os
+import pickle
+import stat
+import tempfile
+
+# Entries are pickles, and unpickling runs whatever code an entry names, so
+# the cache directory has to be as trusted as the Obsidian sources
+# themselves. It's made readable and writable by its owner only, and a
+# directory that's a symlink, someone else's, or writable by anyone else is
+# ignored, as if caching were disabled. Every entry starts with a sha256
+# of its pickle, checked before unpickling, so truncated or corrupt entries
+# are dropped without being loaded.
+
+cache_format = 2
+digest_size = hashlib.sha256().digest_size
+
+# files whose contents determine what a cache entry decodes to
+versioned_files = [
+    'grammar.py',
+    'parser.py',
+    'descent.py',
+    'positions.py',
+    'semantics.py',
+    'cache.py',
+    os.path.join('interpreter', 'types', 'ast.py'),
+]
+
+
+def default_cache_dir():
+    path = os.environ.get('OBSIDIAN_CACHE_DIR')
+    if path is not None:
+        return path or None  # an empty value disables caching
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'obsidian')
+
+
+cache_dir = default_cache_dir()
+_version = None
+
+
+def set_cache_dir(path):
+    global cache_dir
+    cache_dir = path
+
+
+def version():
+    global _version
+    if _version is None:
+        digest = hashlib.sha256()
+        digest.update('{}:{}'.format(
+            cache_format, pickle.HIGHEST_PROTOCOL).encode())
+        dirname = os.path.dirname(os.path.abspath(__file__))
+        for fnm in versioned_files:
+            try:
+                with open(os.path.join(dirname, fnm), 'rb') as f:
+                    digest.update(f.read())
+            except OSError:
+                digest.update(fnm.encode())
+        _version = digest.hexdigest()
+    return _version
+
+
+def trusted(path):
+    # whether `path` is a directory of ours that nobody else can write to
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return False
+    if not stat.S_ISDIR(info.st_mode):
+        return False
+    if hasattr(os, 'getuid') and info.st_uid != os.getuid():
+        return False
+    return not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def entry_path(kind, source):
+    if cache_dir is None:
+        return None
+    digest = hashlib.sha256()
+    digest.update(version().encode())
+    digest.update(kind.encode())
+    digest.update(b'\0')
+    digest.update(source.encode('utf-8', 'surrogatepass'))
+    return os.path.join(cache_dir, '{}-{}.pickle'.format(kind, digest.hexdigest()))
+
+
+def discard(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def load(kind, source):
+    path = entry_path(kind, source)
+    if path is None or not trusted(cache_dir):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    digest, payload = data[:digest_size], data[digest_size:]
+    if hashlib.sha256(payload).digest() != digest:
+        discard(path)
+        return None
+    try:
+        return pickle.loads(payload)
+    except Exception:
+        # entries that no longer unpickle are treated as misses
+        discard(path)
+        return None
+
+
+def store(kind, source, obj, reducers=None):
+    path = entry_path(kind, source)
+    if path is None:
+        return False
+    dispatch_table = copyreg.dispatch_table.copy()
+    if reducers is not None:
+        dispatch_table.update(reducers)
+    tmp_path = None
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        if not trusted(cache_dir):
+            return False
+        buffer = io.BytesIO()
+        pickler = pickle.Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL)
+        pickler.dispatch_table = dispatch_table
+        pickler.dump(obj)
+        payload = buffer.getvalue()
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(hashlib.sha256(payload).digest())
+            f.write(payload)
+        os.replace(tmp_path, path)  # atomic, so readers never see partial entries
+        return True
+    except (OSError, pickle.PicklingError, RecursionError):
+        if tmp_path is not None:
+            discard(tmp_path)
+        return False
+
+
+def clear():
+    if cache_dir is None or not os.path.isdir(cache_dir):
+        return
+    for fnm in os.listdir(cache_dir):
+        if fnm.endswith('.pickle') or fnm.endswith('.tmp'):
+            discard(os.path.join(cache_dir, fnm))
@@ -0,0 +1,551 @@
+import re
+
+from tatsu.exceptions import FailedParse
+
+from .semantics import Semantics
+
+# A hand-written recursive descent parser for src/grammar.ebnf. It follows the
+# rules of the tatsu-generated parser exactly (whitespace and comments are
+# skipped when entering a lowercase rule and before every token, a failure
+# after a join separator is fatal, a node's parseinfo is the offset where its
+# rule was entered), so both produce the same nodes, but
+# it only memoizes `expression`, the one rule that gets retried at the same
+# position (by `tuple` after `call_expression` and `map` after
+# `curly_expression`).
+
+indent_tok = '{-INDENT-}'
+dedent_tok = '{-DEDENT-}'
+
+skip_re = re.compile(r'(?:[\t ]+|#[^\n]*)*')
+ident_re = re.compile(r'[_a-zA-Z][_a-zA-Z0-9]*[?!]?')
+integer_re = re.compile(r'[0-9][_0-9]*([eE]-?[0-9][_0-9]*)?')
+float_re = re.compile(r'[0-9][_0-9]*\.[0-9][_0-9]*([eE]-?[0-9][_0-9]*)?')
+sigil_re = re.compile(r'[a-zA-Z]+')
+tss_val_re = re.compile(r"'''([^'\\]|\\.|'([^'\\]|\\.)|''([^'\\]|\\.))*'''")
+ss_val_re = re.compile(r"'([^'\\]|\\.)*'")
+string_body_re = re.compile(r'([^"\\$]|\\.)+')
+tstring_body_re = re.compile(r'([^"\\$]|\\.|"(?=[^"\\]|\\.)|""(?=[^"\\]|\\.))+')
+op_re = re.compile(r'[+\-=\/*&|^%!?<>.:]+')
+
+ident_start = frozenset('_abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')
+digits = frozenset('0123456789')
+
+
+class ParseError(FailedParse):
+    # a `FailedParse`, as the tatsu backend raises, but with no tokenizer
+    # behind it, so its message says where it failed
+    def __init__(self, msg, pos=None):
+        Exception.__init__(self, msg, pos)
+        self.tokenizer = None
+        self.stack = []
+        self.pos = pos
+        self.item = msg
+
+    def __str__(self):
+        return self.item
+
+
+class Info(dict):
+    # what tatsu hands to a semantic action: the named elements of the rule
+    __slots__ = ('parseinfo',)
+
+
+class DescentParser:
+    rules = [
+        'statement_list', 'statement', 'block', 'block_slurp', 'binary_slurp',
+        'curly_expression', 'call_expression', 'tuple', 'map', 'list',
+        'unquote_expression', 'identifier', 'binary_identifier', 'integer',
+        'float', 'triple_single_string', 'single_string',
+        'triple_interpolated_string', 'interpolated_string', 'STRING_BODY',
+        'TSTRING_BODY', 'symbol', 'op',
+    ]
+
+    def __init__(self, semantics=Semantics):
+        self.actions = {}
+        for rule in self.rules:
+            action = getattr(semantics, rule, None)
+            self.actions[rule] = action if action is not None else (lambda info: info)
+
+    def reset(self, text, offset=0, line_offset=0):
+        # `offset` and `line_offset` place `text` within a larger source, for
+        # parsing it in pieces
+        self.text = text
+        self.offset = offset
+        self.line_offset = line_offset
+        self.memo = {}
+        self.furthest = 0
+
+    def parse(self, text, offset=0, line_offset=0):
+        self.reset(text, offset, line_offset)
+        try:
+            statements, pos = self.statement_list(0)
+            self.check_end(pos)
+            return statements
+        finally:
+            self.memo = None
+
+    def parse_iter(self, text):
+        # the top level `statement_list`, yielding each statement as soon as
+        # it has been parsed and forgetting what was memoized along the way
+        self.reset(text)
+        try:
+            pos = self.separators(self.skip(0))
+            res = self.statement(pos)
+            while res is not None:
+                statement, pos = res
+                self.memo.clear()
+                yield statement
+                res = self.separated_statement(pos)
+            self.check_end(self.separators(pos))
+        finally:
+            self.memo = None
+
+    def check_end(self, pos):
+        pos = skip_re.match(self.text, pos).end()
+        if pos != len(self.text):
+            self.fail(pos)
+            self.error()
+
+    def fail(self, pos):
+        if pos > self.furthest:
+            self.furthest = pos
+        return None
+
+    def error(self):
+        line = self.text.count('\n', 0, self.furthest)
+        col = self.furthest - (self.text.rfind('\n', 0, self.furthest) + 1)
+        raise ParseError('Invalid syntax at line {}, column {}'.format(
+            line + self.line_offset + 1, col + 1), self.furthest + self.offset)
+
+    def node(self, rule, pos, end, info):
+        info.parseinfo = pos + self.offset
+        return self.actions[rule](info), end
+
+    def skip(self, pos):
+        return skip_re.match(self.text, pos).end()
+
+    def token(self, pos, token):
+        pos = skip_re.match(self.text, pos).end()
+        if self.text.startswith(token, pos):
+            return pos + len(token)
+        return self.fail(pos)
+
+    def eols(self, pos):
+        # {eol}
+        text = self.text
+        while True:
+            next_pos = skip_re.match(text, pos).end()
+            if not text.startswith('\n', next_pos):
+                return pos
+            pos = next_pos + 1
+
+    def separators(self, pos):
+        # {eol | ';'}
+        text = self.text
+        while True:
+            next_pos = skip_re.match(text, pos).end()
+            if next_pos >= len(text) or text[next_pos] not in '\n;':
+                return pos
+            pos = next_pos + 1
+
+    def statement_list(self, pos):
+        start = pos
+        pos = self.separators(self.skip(pos))
+        # tatsu leaves what its failed attempt at a statement built behind in
+        # `first`, which for an empty list is always an empty closure
+        first = []
+        res = self.statement(pos)
+        if res is not None:
+            first, pos = res
+        rest = []
+        while True:
+            res = self.separated_statement(pos)
+            if res is None:
+                break
+            statement, pos = res
+            rest.append(statement)
+        pos = self.separators(pos)
+        return self.node('statement_list', start, pos, Info(first=first, rest=rest))
+
+    def separated_statement(self, pos):
+        pos = self.skip(pos)
+        next_pos = self.separators(pos)
+        if next_pos == pos:
+            return self.fail(pos)
+        return self.statement(next_pos)
+
+    def statement(self, pos):
+        start = pos
+        res = self.block_expression(pos)
+        if res is None:
+            return None
+        head, pos = res
+        args = []
+        while True:
+            res = self.block_expression(pos)
+            if res is None:
+                break
+            arg, pos = res
+            args.append(arg)
+        return self.node('statement', start, pos, Info(head=head, args=args))
+
+    def block(self, pos):
+        start = pos
+        pos = self.token(self.eols(self.skip(pos)), indent_tok)
+        if pos is None:
+            return None
+        statements, pos = self.statement_list(self.eols(pos))
+        pos = self.token(self.eols(pos), dedent_tok)
+        if pos is None:
+            return None
+        return self.node('block', start, pos, Info(statements=statements))
+
+    def block_expression(self, pos):
+        return self.block_slurp(self.skip(pos))
+
+    def block_element(self, pos):
+        res = self.simple_expression(pos)
+        if res is None:
+            res = self.block(pos)
+        return res
+
+    def block_slurp(self, pos):
+        return self.slurp('block_slurp', pos, self.block_element)
+
+    def expression(self, pos):
+        try:
+            return self.memo[pos]
+        except KeyError:
+            res = self.memo[pos] = self.binary_slurp(self.skip(pos))
+            return res
+
+    def binary_slurp(self, pos):
+        return self.slurp('binary_slurp', pos, self.simple_expression)
+
+    def slurp(self, rule, pos, element):
+        # slurp:(binary_op)%{element}+
+        start = pos
+        res = element(self.skip(pos))
+        if res is None:
+            return None
+        node, pos = res
+        slurp = [node]
+        while True:
+            res = self.binary_op(pos)
+            if res is None:
+                break
+            op, pos = res
+            res = element(pos)
+            if res is None:
+                # the separator commits to another element, like tatsu's cut
+                self.error()
+            node, pos = res
+            slurp += [op, node]
+        return self.node(rule, start, pos, Info(slurp=slurp))
+
+    def binary_op(self, pos):
+        pos = self.eols(self.skip(pos))
+        res = self.op(pos)
+        if res is None:
+            res = self.binary_identifier(pos)
+            if res is None:
+                return None
+        op, pos = res
+        return op, self.eols(pos)
+
+    def simple_expression(self, pos, interpolated=True):
+        pos = self.skip(pos)
+        text = self.text
+        match = sigil_re.match(text, pos)
+        quote_pos = pos if match is None else match.end()
+        quote = text[quote_pos:quote_pos + 1]
+        res = None
+        if quote == "'":
+            res = self.triple_single_string(pos)
+            if res is None:
+                res = self.single_string(pos)
+        elif quote == '"' and interpolated:
+            res = self.triple_interpolated_string(pos)
+            if res is None:
+                res = self.interpolated_string(pos)
+        if res is None:
+            res = self.nonstring_expression(pos)
+        return res
+
+    def simple_single_expression(self, pos):
+        return self.simple_expression(pos, interpolated=False)
+
+    def nonstring_expression(self, pos):
+        pos = self.skip(pos)
+        char = self.text[pos:pos + 1]
+        if char in ident_start:
+            return self.identifier(pos)
+        elif char in digits:
+            res = self.float(pos)
+            if res is None:
+                res = self.integer(pos)
+            return res
+        elif char == '@':
+            return self.symbol(pos)
+        elif char == '{':
+            res = self.curly_expression(pos)
+            if res is None:
+                res = self.map(pos)
+            return res
+        elif char == '(':
+            res = self.call_expression(pos)
+            if res is None:
+                res = self.tuple(pos)
+            return res
+        elif char == '[':
+            return self.list(pos)
+        elif char == '$':
+            return self.unquote_expression(pos)
+        return self.fail(pos)
+
+    def curly_expression(self, pos):
+        res = self.curly_expression_list(self.skip(pos))
+        if res is None:
+            return None
+        exprs, end = res
+        return self.node('curly_expression', pos, end, Info(exprs=exprs))
+
+    def curly_expression_list(self, pos):
+        pos = self.token(self.skip(pos), '{')
+        if pos is None:
+            return None
+        pos = self.eols(pos)
+        res = self.op(pos)
+        if res is None:
+            res = self.binary_identifier(pos)
+        if res is not None:
+            expr, pos = res
+            exprs = [expr]
+        else:
+            res = self.expression(pos)
+            if res is None:
+                return None
+            expr, pos = res
+            exprs = [expr]
+            while True:
+                res = self.expression(self.separators(pos))
+                if res is None:
+                    break
+                expr, pos = res
+                exprs.append(expr)
+        pos = self.token(self.eols(pos), '}')
+        if pos is None:
+            return None
+        return exprs, pos
+
+    def call_expression(self, pos):
+        start = pos
+        pos = self.token(self.skip(pos), '(')
+        if pos is None:
+            return None
+        pos = self.eols(pos)
+        res = self.expression(pos)
+        if res is None:
+            res = self.op(pos)
+            if res is None:
+                return None
+        head, pos = res
+        pos = self.eols(pos)
+        args = []
+        while True:
+            res = self.expression(pos)
+            if res is None:
+                break
+            arg, pos = res
+            args.append(arg)
+            pos = self.eols(pos)
+        pos = self.token(self.eols(pos), ')')
+        if pos is None:
+            return None
+        return self.node('call_expression', start, pos, Info(head=head, args=args))
+
+    def tuple(self, pos):
+        return self.collection('tuple', pos, '(', ')')
+
+    def map(self, pos):
+        return self.collection('map', pos, '{', '}')
+
+    def collection(self, rule, pos, left, right):
+        # '(' {eol} ')' | '(' {eol} first:expression {eol} ',' {eol} rest:[collection_rest] {eol} ')'
+        start = pos
+        pos = self.token(self.skip(pos), left)
+        if pos is None:
+            return None
+        pos = self.eols(pos)
+        end = self.token(pos, right)
+        if end is not None:
+            return self.node(rule, start, end, Info(first=None, rest=None))
+        res = self.expression(pos)
+        if res is None:
+            return None
+        first, pos = res
+        pos = self.token(self.eols(pos), ',')
+        if pos is None:
+            return None
+        pos = self.eols(pos)
+        rest = None
+        res = self.collection_rest(pos)
+        if res is not None:
+            rest, pos = res
+        pos = self.token(self.eols(pos), right)
+        if pos is None:
+            return None
+        return self.node(rule, start, pos, Info(first=first, rest=rest))
+
+    def list(self, pos):
+        start = pos
+        pos = self.token(self.skip(pos), '[')
+        if pos is None:
+            return None
+        pos = self.eols(pos)
+        contents = None
+        res = self.collection_rest(pos)
+        if res is not None:
+            contents, pos = res
+        pos = self.token(self.eols(pos), ']')
+        if pos is None:
+            return None
+        return self.node('list', start, pos, Info(contents=contents))
+
+    def collection_rest(self, pos):
+        res = self.expression(self.skip(pos))
+        if res is None:
+            return None
+        expr, pos = res
+        exprs = [expr]
+        while True:
+            next_pos = self.token(self.eols(pos), ',')
+            if next_pos is None:
+                break
+            res = self.expression(self.eols(next_pos))
+            if res is None:
+                break
+            expr, pos = res
+            exprs.append(expr)
+        pos = self.eols(pos)
+        next_pos = self.token(pos, ',')
+        if next_pos is not None:
+            pos = next_pos
+        return exprs, pos
+
+    def unquote_expression(self, pos):
+        pos = self.token(self.skip(pos), '$')
+        if pos is None:
+            return None
+        res = self.simple_expression(pos)
+        if res is None:
+            return None
+        expr, pos = res
+        return self.actions['unquote_expression'](expr), pos
+
+    def match(self, regex, pos):
+        match = regex.match(self.text, pos)
+        if match is None:
+            return self.fail(pos)
+        return match
+
+    def identifier(self, pos):
+        match = self.match(ident_re, self.skip(pos))
+        if match is None:
+            return None
+        return self.node('identifier', pos, match.end(), Info(ident=match.group()))
+
+    def binary_identifier(self, pos):
+        next_pos = self.token(self.skip(pos), '~')
+        if next_pos is None:
+            return None
+        match = self.match(ident_re, next_pos)
+        if match is None:
+            return None
+        return self.node('binary_identifier', pos, match.end(), Info(ident=match.group()))
+
+    def op(self, pos):
+        match = self.match(op_re, self.skip(pos))
+        if match is None:
+            return None
+        return self.node('op', pos, match.end(), Info(op=match.group()))
+
+    def symbol(self, pos):
+        next_pos = self.token(self.skip(pos), '@')
+        if next_pos is None:
+            return None
+        match = self.match(ident_re, next_pos)
+        if match is None:
+            return None
+        return self.node('symbol', pos, match.end(), Info(symbol=match.group()))
+
+    def number(self, rule, regex, pos):
+        match = self.match(regex, self.skip(pos))
+        if match is None:
+            return None
+        end = match.end()
+        sigil = sigil_re.match(self.text, end)
+        if sigil is not None:
+            end = sigil.end()
+            sigil = sigil.group()
+        return self.node(rule, pos, end, Info(val=match.group(), sigil=sigil))
+
+    def integer(self, pos):
+        return self.number('integer', integer_re, pos)
+
+    def float(self, pos):
+        return self.number('float', float_re, pos)
+
+    def sigil(self, pos):
+        # sigil:sigil, returning the sigil and where the string itself starts
+        pos = self.skip(pos)
+        match = sigil_re.match(self.text, pos)
+        if match is None:
+            return None, pos
+        return match.group(), match.end()
+
+    def quoted_string(self, rule, regex, pos):
+        sigil, next_pos = self.sigil(self.skip(pos))
+        match = self.match(regex, next_pos)
+        if match is None:
+            return None
+        return self.node(rule, pos, match.end(), Info(sigil=sigil, val=match.group()))
+
+    def triple_single_string(self, pos):
+        return self.quoted_string('triple_single_string', tss_val_re, pos)
+
+    def single_string(self, pos):
+        return self.quoted_string('single_string', ss_val_re, pos)
+
+    def interpolated_string(self, pos):
+        return self.string_bodies('interpolated_string', 'STRING_BODY',
+                                  string_body_re, '"', pos)
+
+    def triple_interpolated_string(self, pos):
+        return self.string_bodies('triple_interpolated_string', 'TSTRING_BODY',
+                                  tstring_body_re, '"""', pos)
+
+    def string_bodies(self, rule, body_rule, body_re, quote, pos):
+        text = self.text
+        sigil, next_pos = self.sigil(self.skip(pos))
+        if not text.startswith(quote, next_pos):
+            return self.fail(next_pos)
+        next_pos += len(quote)
+        bodies = []
+        while True:
+            match = body_re.match(text, next_pos)
+            if match is not None:
+                body, next_pos = self.node(body_rule, next_pos, match.end(),
+                                           Info(body=match.group()))
+            elif text.startswith('$', next_pos):
+                res = self.simple_single_expression(next_pos + 1)
+                if res is None:
+                    break
+                body, next_pos = res
+            else:
+                break
+            bodies.append(body)
+        if not text.startswith(quote, next_pos):
+            return self.fail(next_pos)
+        next_pos += len(quote)
+        return self.node(rule, pos, next_pos, Info(sigil=sigil, bodies=bodies))
@@ -1,10 +1,37 @@
+import os
+
+
 class Panic(Exception):
+    # whether the calls a Panic goes through record their args for the
+    # traceback, which can be turned off with OBSIDIAN_PANIC_ARGS=0
+    capture_args = os.environ.get('OBSIDIAN_PANIC_ARGS') != '0'
+
     def __init__(self, msg, parseinfo=None, stack=None):
         self.msg = msg
         self.parseinfo = parseinfo
-        if stack is None:
-            stack = []
-        self.stack = stack
+        # the calls the Panic went through, as linked (fun, info, next)
+        # frames with the outermost first, so that recording one is O(1)
+        self.frames = None
+        for fun, info in stack or []:
+            self.push(fun, info)
+
+    def push(self, fun, info):
+        self.frames = (fun, info, self.frames)
+
+    def push_call(self, fun, args):
+        # records that the Panic went through a call to `fun` with `args`
+        self.frames = (fun, {'args': args if Panic.capture_args else None}, self.frames)
+
+    @property
+    def stack(self):
+        # the (fun, info) of the calls the Panic went through, innermost first
+        stack = []
+        frame = self.frames
+        while frame is not None:
+            stack.append((frame[0], frame[1]))
+            frame = frame[2]
+        stack.reverse()
+        return stack
 
 
 def type_name(obj):
@@ -32,6 +59,10 @@ def type_type_name(t):
 
 
 class PrimObject:
+    # `__dict__` is only made for objects that get Python attrs of their own,
+    # so that `Value`s can get by with their slots
+    __slots__ = ('attrs', '__dict__')
+
     def __init__(self, attrs):
         self.attrs = attrs
 
@@ -54,9 +85,18 @@ class PrimObject:
 
     def __eq__(self, other):
         if type(other) is type(self):
-            return self.__dict__ == other.__dict__
+            return self.fields() == other.fields()
         return False
 
+    def fields(self):
+        # the object's Python attrs, slots included
+        fields = dict(self.__dict__)
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get('__slots__', ()):
+                if name != '__dict__' and hasattr(self, name):
+                    fields[name] = getattr(self, name)
+        return fields
+
     def __repr__(self):
         # return 'PrimObject({})'.format({k: v for k, v in self.attrs.items() if k != 'meta'})
         type_name = self.get('meta').get('type').get('name')
@@ -73,21 +113,75 @@ class PrimObject:
 
 
 class Object(PrimObject):
+    __slots__ = ()
+
     def __init__(self, attrs):
         super().__init__(attrs)
         self.attrs['meta'] = PrimObject(
             {'type': self.__class__.T, 'meta': meta_obj})
 
 
+class SharedMeta(PrimObject):
+    __slots__ = ()
+
+    def set(self, name, obj):
+        raise Panic('The meta shared by `{}`s can\'t be changed'.format(
+            type_type_name(self.get('type'))))
+
+
+class Value(Object):
+    # Ints, Strings, Lists and the like, of which there are lots and which
+    # hardly ever get attrs of their own: they start out sharing their type's
+    # `attrs`, with a `SharedMeta`, and only get their own when something's
+    # set on them or `get_attr` hands out their meta
+    __slots__ = ()
+    shared_attrs = {}  # by class
+
+    def __init__(self):
+        try:
+            self.attrs = Value.shared_attrs[type(self)]
+        except KeyError:
+            self.attrs = Value.shared_attrs[type(self)] = {
+                'meta': SharedMeta({'type': self.__class__.T, 'meta': meta_obj})}
+
+    def owns_attrs(self):
+        return self.attrs is not Value.shared_attrs.get(type(self))
+
+    def own_meta(self):
+        if not self.owns_attrs():
+            self.attrs = dict(self.attrs)
+        meta = self.attrs['meta']
+        if isinstance(meta, SharedMeta):
+            meta = self.attrs['meta'] = PrimObject(dict(meta.attrs))
+        return meta
+
+    def set(self, name, obj):
+        if not self.owns_attrs():
+            self.attrs = dict(self.attrs)
+        self.attrs[name] = obj
+
+
 class PrimFun(Object):
+    # PrimFuns like `prim.cond` that end by evaluating one of their arg ASTs
+    # set `tails`, and `tail(caller_scope, *args)` does everything up to that
+    # and returns the AST (or None, for `nil`), for `Fun.call` to evaluate
+    # as if in the caller's place
+    tails = False
+
     def __init__(self, name, args=None, variadic=False):
         super().__init__({'name': String(name)})
         self.name = name
         assert args is not None or variadic
         self.args = args
         self.variadic = variadic
+        # worked out once for `call`: how many args it takes, if fixed, and
+        # whether they're all just evaluated and passed to `fun`
+        self.arity = None if variadic else len(args)
+        self.evaluates_args = type(self).macro is PrimFun.macro
 
     def typecheck_arg(self, arg, type):
+        if isinstance(arg, type):
+            return
         if isinstance(type, tuple):
             if not any(isinstance(arg, t) for t in type):
                 types_str = ', '.join('`{}`'.format(
@@ -102,21 +196,72 @@ class PrimFun(Object):
     def call(self, caller_scope, args=None):
         if args is None:
             args = []
-        if not self.variadic and not len(args) == len(self.args):
+        n_args = len(args)
+        if self.arity is not None and n_args != self.arity:
             raise Panic('PrimFun `{}` takes {} arguments, not {}'.format(
-                self.name, len(self.args), len(args)))
+                self.name, self.arity, n_args))
         try:
-            res = self.macro(caller_scope, *args)
+            if not self.evaluates_args:
+                res = self.macro(caller_scope, *args)
+            elif n_args == 2:
+                res = self.fun(caller_scope.eval(args[0]), caller_scope.eval(args[1]))
+            elif n_args == 1:
+                res = self.fun(caller_scope.eval(args[0]))
+            else:
+                res = self.fun(*[caller_scope.eval(arg) for arg in args])
         except Panic as p:
-            raise Panic(p.msg, p.parseinfo, p.stack + [(self, {'args': args})])
+            p.push_call(self, args)
+            raise
         if res is None:
             return nil
         return res
 
+    def call_method(self, caller_scope, obj, args=None):
+        # `call` for a method call on `obj`, which is passed on as the first
+        # arg as it is, without going through an AST or the caller's scope
+        if args is None:
+            args = []
+        if self.arity is not None and len(args) + 1 != self.arity:
+            raise Panic('PrimFun `{}` takes {} arguments, not {}'.format(
+                self.name, self.arity, len(args) + 1))
+        try:
+            if not self.evaluates_args:
+                res = self.method_macro(caller_scope, obj, *args)
+            elif not args:
+                res = self.fun(obj)
+            elif len(args) == 1:
+                res = self.fun(obj, caller_scope.eval(args[0]))
+            else:
+                res = self.fun(obj, *[caller_scope.eval(arg) for arg in args])
+        except Panic as p:
+            p.push_call(self, [obj] + list(args))
+            raise
+        if res is None:
+            return nil
+        return res
+
+    def takes_receiver(self):
+        # whether `call_method` works; PrimFuns with a `macro` of their own
+        # get all their args as ASTs instead
+        return self.evaluates_args
+
     def macro(self, caller_scope, *args):
         # print('PrimFun {} got args {}'.format(self.name, args))
         return self.fun(*[caller_scope.eval(arg) for arg in args])
 
+    def method_macro(self, caller_scope, obj, *args):
+        return self.fun(obj, *[caller_scope.eval(arg) for arg in args])
+
+
+class PrimMethod(PrimFun):
+    # a PrimFun that evaluates its args other than the receiver itself, in
+    # `method_macro`
+    def takes_receiver(self):
+        return True
+
+    def macro(self, caller_scope, obj, *args):
+        return self.method_macro(caller_scope, caller_scope.eval(obj), *args)
+
 
 class ObjectConstructor(PrimFun):
     def __init__(self):
@@ -146,15 +291,28 @@ class StringToStr(PrimFun):
         return string
 
 
-class String(Object):
+class String(Value):
+    # `hash_int` is the Int `String.hash` returned, once it's been called
+    __slots__ = ('str', 'hash_int')
+
     def __init__(self, string):
-        super().__init__({})
+        super().__init__()
         self.str = string
 
     def __repr__(self):
         return '"{}"'.format(self.str)
 
 
+class AttrTable(Object):
+    # the `methods` and `statics` of a Type; `get_attr` saves what it finds
+    # in them on the Types until any of them change
+    generation = 0
+
+    def set(self, name, obj):
+        AttrTable.generation += 1
+        super().set(name, obj)
+
+
 class Type(Object):
     def __init__(self, name, parent, statics=None):
         if statics is None:
@@ -162,8 +320,8 @@ class Type(Object):
         super().__init__({
             'name': String(name),
             'parent': parent,
-            'methods': Object({}),
-            'statics': Object(statics),
+            'methods': AttrTable({}),
+            'statics': AttrTable(statics),
         })
 
 
@@ -194,6 +352,7 @@ meta_obj.set('type', Object.T)
 String.T = PrimObject(
     {'meta': PrimObject({'type': Type.T, 'meta': meta_obj})})
 Object.T.set('name', String('Object'))
+AttrTable.T = Object.T
 
 String.T.set('name', String('String'))
 Type.T.set('name', String('Type'))
@@ -201,21 +360,21 @@ Type.T.set('meta', PrimObject(
     {'name': String('Type'), 'type': Type.T, 'meta': meta_obj}))
 
 Object.T.set('parent', Object.T)
-Object.T.set('methods', Object({}))
-Object.T.set('statics', Object({}))
+Object.T.set('methods', AttrTable({}))
+Object.T.set('statics', AttrTable({}))
 Type.T.set('parent', Object.T)
-Type.T.set('methods', Object({}))
-Type.T.set('statics', Object({}))
-String.T.set('statics', Object({}))
+Type.T.set('methods', AttrTable({}))
+Type.T.set('statics', AttrTable({}))
+String.T.set('statics', AttrTable({}))
 String.T.set('parent', Object.T)
 
 PrimFun.T = PrimObject(
     {'name': String('PrimFun'), 'parent': Object.T, 'meta': PrimObject({'type': Type.T})})
-PrimFun.T.set('methods', Object({}))
-PrimFun.T.set('statics', Object({}))
+PrimFun.T.set('methods', AttrTable({}))
+PrimFun.T.set('statics', AttrTable({}))
 Object.T.set('call', ObjectConstructor())
 Type.T.set('call', TypeConstructor())
-String.T.set('methods', Object({'to_str': StringToStr()}))
+String.T.set('methods', AttrTable({'to_str': StringToStr()}))
 
 Nil.T = Type('Nil', Object.T)
 nil = Nil()
@@ -1,4 +1,6 @@
-from ..parser import parse
+from ..parser import parse_iter
+from .. import cache
+from . import onc
 
 from .types import (
     Object,
@@ -15,6 +17,10 @@ from .types import (
     Map,
     Bool,
     Symbol,
+    StringBuilder,
+    Array,
+    PMap,
+    PVector,
     Type,
     Nil,
     true,
@@ -22,7 +28,7 @@ from .types import (
     nil,
 )
 
-from .types.scope import to_str
+from .types.scope import to_str, evaluators
 
 from .types.ast import (
     ast_node_type,
@@ -40,6 +46,8 @@ from .types.ast import (
     ASTUnquote,
     ASTBlock,
     model_to_ast,
+    ast_reducers,
+    ASTSemantics,
 )
 
 from .funs import (
@@ -60,14 +68,42 @@ from .funs import (
     int,
     float,
     bool,
-    # list,
+    list,
     # map,
     # tuple,
     # ast,
     string,
+    array,
 )
 
 
+def parse_module(source, path=None):
+    # `path` is where `source` was read from, so that a compiled .onc file
+    # next to it can be loaded instead of parsing
+    if path is not None:
+        try:
+            return onc.load_file(onc.compile_path(path), source)
+        except (OSError, onc.OncError):
+            pass
+    cached = cache.load('ast', source)
+    if cached is not None:
+        return cached
+    statements, source_map = parse_iter(source, semantics=ASTSemantics)
+    if cache.cache_dir is None:
+        return statements, source_map
+    return cache_statements(source, statements, source_map), source_map
+
+
+def cache_statements(source, statements, source_map):
+    # passes statements through as they are parsed, caching the module once
+    # all of it has been parsed
+    parsed = []
+    for statement in statements:
+        parsed.append(statement)
+        yield statement
+    cache.store('ast', source, (parsed, source_map), ast_reducers)
+
+
 class Import(PrimFun):
     def __init__(self):
         super().__init__('prim.import', ['path', 'name'])
@@ -77,7 +113,7 @@ class Import(PrimFun):
         self.typecheck_arg(name, String)
         with open(path.str, 'r') as f:
             source = f.read()
-        import_ast, source_map = parse(source)
+        import_ast, source_map = parse_module(source, path.str)
         return load_module(import_ast, source_map, name.str, {'prim': prim})
 
 
@@ -89,9 +125,13 @@ prim = Module('prim', attrs={
     'Module': Module.T,
     'Scope': Scope.T,
     'String': String.T,
+    'StringBuilder': StringBuilder.T,
+    'Array': Array.T,
     'List': List.T,
     'Tuple': Tuple.T,
     'Map': Map.T,
+    'PVector': PVector.T,
+    'PMap': PMap.T,
     'Int': Int.T,
     'Float': Float.T,
     'Symbol': Symbol.T,
@@ -168,7 +208,20 @@ prim.set('bool', Module('list', parent=prim, attrs={
 
 
 prim.set('list', Module('list', parent=prim, attrs={
-    # 'get': list.get,
+    'len': list.list_len,
+    'get': list.get,
+    'set': list.list_set,
+    'append': list.append,
+    'extend': list.extend,
+    'pop': list.pop,
+    'slice': list.list_slice,
+    'concat': list.concat,
+    'reverse': list.reverse,
+    'map': list.list_map,
+    'filter': list.list_filter,
+    'reduce': list.reduce,
+    'sort': list.sort,
+    'index_of': list.index_of,
 }))
 
 
@@ -187,6 +240,28 @@ prim.set('string', Module('string', parent=prim, attrs={
 }))
 
 
+prim.set('array', Module('array', parent=prim, attrs={
+    'from_list': array.from_list,
+    'int64': array.int64,
+    'float64': array.float64,
+    'to_list': array.to_list,
+    'add': array.add,
+    'sub': array.sub,
+    'mul': array.mul,
+    'div': array.div,
+    'eq': array.eq,
+    'lt': array.lt,
+    'lte': array.lte,
+    'gt': array.gt,
+    'gte': array.gte,
+    'sum': array.array_sum,
+    'min': array.array_min,
+    'max': array.array_max,
+    'mean': array.mean,
+    'dot': array.dot,
+}))
+
+
 builtin_vars = {
     'get_attr': get_attr,
     'set_attr': set_attr,
@@ -207,17 +282,21 @@ def load_prelude():
         fnm = os.path.join(dirname, '../prelude/prelude.on')
         with open(fnm, 'r') as f:
             source = f.read()
-        prelude_ast, source_map = parse(source)
+        prelude_ast, source_map = parse_module(source, fnm)
         prelude = load_module(prelude_ast, source_map,
                               'prelude', {'prim': prim})
         if prelude is None:
             raise Exception('Failed to load prelude')
 
 
-def load_module(statements, source_map, module_name, preload=None, include_prelude=False):
+def load_module(statements, source_map, module_name, preload=None, include_prelude=False,
+                evaluator='tree'):
+    if evaluator not in evaluators:
+        raise Exception('Unknown evaluator {}'.format(evaluator))
     if preload is None:
         preload = {}
     module = Module(module_name)
+    module.evaluator = evaluator
     for name, obj in builtin_vars.items():
         module.set(name, obj)
     for name, obj in preload.items():
@@ -236,9 +315,8 @@ def load_module(statements, source_map, module_name, preload=None, include_prelu
     except Panic as p:
         parseinfo = statement.parseinfo
         msg = p.msg
-        stack = p.stack
         print('=' * 10 + ' Panic: ' + '=' * 10)
-        for (fun, info) in reversed(stack):
+        for (fun, info) in reversed(p.stack):
             if isinstance(fun, PrimFun):
                 print('PrimFun `{}` panicked:'.format(
                     fun.name))
@@ -247,11 +325,12 @@ def load_module(statements, source_map, module_name, preload=None, include_prelu
                     fun.name_string(), info['statement_idx']))
                 print('    Statement: {}'.format(
                     to_str(module, info['statement'], panic=False)))
-            print('    Args: {}'.format(
-                ' '.join(to_str(module, a, panic=False) for a in info['args'])))
+            if info['args'] is not None:
+                print('    Args: {}'.format(
+                    ' '.join(to_str(module, a, panic=False) for a in info['args'])))
         if parseinfo is not None:
             print('Module `{}` panicked at line {}:'.format(
-                module_name, parseinfo.line + 1))
+                module_name, source_map.line(parseinfo) + 1))
         else:
             print('Module `{}` panicked:')
         if isinstance(statement, Object):
@@ -25,3 +25,6 @@ from . import module
 from . import scope
 from . import symbol
 from . import type
+from . import array
+from . import pmap
+from . import pvector
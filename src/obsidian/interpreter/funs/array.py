@@ -0,0 +1,244 @@
+import operator
+from array import array
+from itertools import repeat
+
+from ..types import (
+    PrimFun,
+    Panic,
+    Array,
+    List,
+    Tuple,
+    Int,
+    Float,
+    Symbol,
+    String,
+    make_int,
+    type_name,
+)
+
+typecode_names = {'q': 'int64', 'd': 'float64'}
+
+
+def box(typecode, val):
+    return make_int(val) if typecode == 'q' else Float(val)
+
+
+def unbox(fun, typecode, num):
+    if typecode == 'q':
+        fun.typecheck_arg(num, Int)
+        return num.int
+    fun.typecheck_arg(num, (Int, Float))
+    return num.int if isinstance(num, Int) else num.float
+
+
+def make_array(fun, typecode, nums):
+    try:
+        return Array(array(typecode, (unbox(fun, typecode, num) for num in nums)))
+    except OverflowError:
+        raise Panic('Element of `{}` is out of range for an `int64` `Array`'.format(fun.name))
+
+
+def check_index(arr, idx):
+    if not -len(arr.elems) <= idx.int < len(arr.elems):
+        raise Panic('Index `{}` out of range (len = `{}`)'.format(
+            idx.int, len(arr.elems)))
+
+
+class ArrayFromList(PrimFun):
+    # an `Array` of the numbers in a List or Tuple, with `typecode` 'q' or
+    # 'd', or with None, 'd' if any of them is a Float and 'q' otherwise
+    def __init__(self, name, typecode=None):
+        super().__init__(name, ['list'])
+        self.typecode = typecode
+
+    def fun(self, lst):
+        self.typecheck_arg(lst, (List, Tuple))
+        typecode = self.typecode
+        if typecode is None:
+            typecode = 'd' if any(isinstance(num, Float) for num in lst.elems) else 'q'
+        return make_array(self, typecode, lst.elems)
+
+
+class ArrayToList(PrimFun):
+    def __init__(self):
+        super().__init__('Array.to_list', ['array'])
+
+    def fun(self, arr):
+        self.typecheck_arg(arr, Array)
+        typecode = arr.elems.typecode
+        return List([box(typecode, val) for val in arr.elems])
+
+
+class ArrayToStr(PrimFun):
+    def __init__(self):
+        super().__init__('Array.to_str', ['array'])
+
+    def fun(self, arr):
+        self.typecheck_arg(arr, Array)
+        return String('{}[{}]'.format(typecode_names[arr.elems.typecode],
+                                      ', '.join(str(val) for val in arr.elems)))
+
+
+class ArrayLen(PrimFun):
+    def __init__(self):
+        super().__init__('Array.len', ['array'])
+
+    def fun(self, arr):
+        self.typecheck_arg(arr, Array)
+        return make_int(len(arr.elems))
+
+
+class ArrayGet(PrimFun):
+    def __init__(self):
+        super().__init__('Array.get', ['array', 'idx'])
+
+    def fun(self, arr, idx):
+        self.typecheck_arg(arr, Array)
+        self.typecheck_arg(idx, Int)
+        check_index(arr, idx)
+        return box(arr.elems.typecode, arr.elems[idx.int])
+
+
+class ArraySet(PrimFun):
+    def __init__(self):
+        super().__init__('Array.set', ['array', 'idx', 'val'])
+
+    def fun(self, arr, idx, val):
+        self.typecheck_arg(arr, Array)
+        self.typecheck_arg(idx, Int)
+        check_index(arr, idx)
+        try:
+            arr.elems[idx.int] = unbox(self, arr.elems.typecode, val)
+        except OverflowError:
+            raise Panic('`{}` is out of range for an `int64` `Array`'.format(val.int))
+
+
+class ArrayOp(PrimFun):
+    # `op` applied to the elements of two `Array`s of the same length, or of
+    # an `Array` and a number; comparisons give an int64 `Array` of 1s and
+    # 0s, and `div` always gives a float64 one
+    def __init__(self, name, op, precedence, associativity, typecode=None):
+        super().__init__(name, ['a', 'b'])
+        self.set('precedence', Int(precedence))
+        self.set('associativity', Symbol(associativity))
+        self.op = op
+        self.typecode = typecode
+
+    def fun(self, a, b):
+        self.typecheck_arg(a, (Array, Int, Float))
+        self.typecheck_arg(b, (Array, Int, Float))
+        if not isinstance(a, Array) and not isinstance(b, Array):
+            raise Panic('PrimFun `{}` needs an `Array`, not `{}` and `{}`'.format(
+                self.name, type_name(a), type_name(b)))
+        n = len(a.elems) if isinstance(a, Array) else len(b.elems)
+        typecode = self.typecode
+        if typecode is None:
+            typecode = 'd' if 'd' in [self.operand_typecode(a), self.operand_typecode(b)] else 'q'
+        try:
+            return Array(array(typecode, map(self.op, self.operand(a, n), self.operand(b, n))))
+        except ZeroDivisionError:
+            raise Panic('Division by zero in `{}`'.format(self.name))
+        except OverflowError:
+            raise Panic('Result of `{}` is out of range for an `int64` `Array`'.format(self.name))
+
+    def operand_typecode(self, x):
+        if isinstance(x, Array):
+            return x.elems.typecode
+        return 'q' if isinstance(x, Int) else 'd'
+
+    def operand(self, x, n):
+        if isinstance(x, Array):
+            if len(x.elems) != n:
+                raise Panic('`Array`s passed to `{}` must have the same length, not `{}` and `{}`'.format(
+                    self.name, n, len(x.elems)))
+            return x.elems
+        return repeat(x.int if isinstance(x, Int) else x.float, n)
+
+
+class ArraySum(PrimFun):
+    def __init__(self):
+        super().__init__('Array.sum', ['array'])
+
+    def fun(self, arr):
+        self.typecheck_arg(arr, Array)
+        return box(arr.elems.typecode, sum(arr.elems))
+
+
+class ArrayMin(PrimFun):
+    def __init__(self):
+        super().__init__('Array.min', ['array'])
+
+    def fun(self, arr):
+        self.typecheck_arg(arr, Array)
+        if not arr.elems:
+            raise Panic('`Array.min` of an empty `Array`')
+        return box(arr.elems.typecode, min(arr.elems))
+
+
+class ArrayMax(PrimFun):
+    def __init__(self):
+        super().__init__('Array.max', ['array'])
+
+    def fun(self, arr):
+        self.typecheck_arg(arr, Array)
+        if not arr.elems:
+            raise Panic('`Array.max` of an empty `Array`')
+        return box(arr.elems.typecode, max(arr.elems))
+
+
+class ArrayMean(PrimFun):
+    def __init__(self):
+        super().__init__('Array.mean', ['array'])
+
+    def fun(self, arr):
+        self.typecheck_arg(arr, Array)
+        if not arr.elems:
+            raise Panic('`Array.mean` of an empty `Array`')
+        return Float(sum(arr.elems) / len(arr.elems))
+
+
+class ArrayDot(PrimFun):
+    def __init__(self):
+        super().__init__('Array.dot', ['a', 'b'])
+
+    def fun(self, a, b):
+        self.typecheck_arg(a, Array)
+        self.typecheck_arg(b, Array)
+        if len(a.elems) != len(b.elems):
+            raise Panic('`Array`s passed to `Array.dot` must have the same length, not `{}` and `{}`'.format(
+                len(a.elems), len(b.elems)))
+        typecode = 'd' if 'd' in [a.elems.typecode, b.elems.typecode] else 'q'
+        return box(typecode, sum(map(operator.mul, a.elems, b.elems)))
+
+
+to_list = ArrayToList()
+array_sum = ArraySum()
+array_min = ArrayMin()
+array_max = ArrayMax()
+mean = ArrayMean()
+dot = ArrayDot()
+
+Array.T.set('call', ArrayFromList('Array'))
+Array.T.get('methods').set('to_str', ArrayToStr())
+Array.T.get('methods').set('to_list', to_list)
+Array.T.get('methods').set('len', ArrayLen())
+Array.T.get('methods').set('get', ArrayGet())
+Array.T.get('methods').set('set', ArraySet())
+Array.T.get('methods').set('sum', array_sum)
+Array.T.get('methods').set('min', array_min)
+Array.T.get('methods').set('max', array_max)
+Array.T.get('methods').set('mean', mean)
+Array.T.get('methods').set('dot', dot)
+
+from_list = ArrayFromList('array.from_list')
+int64 = ArrayFromList('array.int64', 'q')
+float64 = ArrayFromList('array.float64', 'd')
+add = ArrayOp('array.add', operator.add, 6, 'left')
+sub = ArrayOp('array.sub', operator.sub, 6, 'left')
+mul = ArrayOp('array.mul', operator.mul, 7, 'left')
+div = ArrayOp('array.div', operator.truediv, 7, 'left', 'd')
+eq = ArrayOp('array.eq', operator.eq, 4, 'none', 'q')
+lt = ArrayOp('array.lt', operator.lt, 4, 'none', 'q')
+lte = ArrayOp('array.lte', operator.le, 4, 'none', 'q')
+gt = ArrayOp('array.gt', operator.gt, 4, 'none', 'q')
+gte = ArrayOp('array.gte', operator.ge, 4, 'none', 'q')
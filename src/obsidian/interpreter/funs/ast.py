@@ -1,5 +1,6 @@
 from ..types import (
     PrimFun,
+    PrimMethod,
     Panic,
     String,
     Int,
@@ -106,12 +107,11 @@ class ASTStringConstructor(PrimFun):
         return ASTString(string, sigil)
 
 
-class ASTStringToStr(PrimFun):
+class ASTStringToStr(PrimMethod):
     def __init__(self):
         super().__init__('ast.String.to_str', ['ast'])
 
-    def macro(self, scope, ast):
-        ast = scope.eval(ast)
+    def method_macro(self, scope, ast):
         self.typecheck_arg(ast, ASTString)
         return String(ast_to_str(scope, scope.preprocess(ast)))
 
@@ -125,12 +125,11 @@ class ASTIdentConstructor(PrimFun):
         return ASTIdent(ident)
 
 
-class ASTIdentToStr(PrimFun):
+class ASTIdentToStr(PrimMethod):
     def __init__(self):
         super().__init__('ast.Ident.to_str', ['ast'])
 
-    def macro(self, scope, ast):
-        ast = scope.eval(ast)
+    def method_macro(self, scope, ast):
         self.typecheck_arg(ast, ASTIdent)
         return String(ast_to_str(scope, scope.preprocess(ast)))
 
@@ -144,12 +143,11 @@ class ASTCallConstructor(PrimFun):
         return ASTCall(callable_expr, args)
 
 
-class ASTCallToStr(PrimFun):
+class ASTCallToStr(PrimMethod):
     def __init__(self):
         super().__init__('ast.Call.to_str', ['ast'])
 
-    def macro(self, scope, ast):
-        ast = scope.eval(ast)
+    def method_macro(self, scope, ast):
         self.typecheck_arg(ast, ASTCall)
         # TODO: treat infix ops differently
         # fn_name = ast.get('callable').get('name')
@@ -167,12 +165,11 @@ class ASTInterpolatedStringConstructor(PrimFun):
         return ASTInterpolatedString(body)
 
 
-class ASTInterpolatedStringToStr(PrimFun):
+class ASTInterpolatedStringToStr(PrimMethod):
     def __init__(self):
         super().__init__('ast.InterpolatedString.to_str', ['ast'])
 
-    def macro(self, scope, ast):
-        ast = scope.eval(ast)
+    def method_macro(self, scope, ast):
         if not isinstance(ast, ASTInterpolatedString):
             raise Panic('Argument must be an ast.InterpolatedString')
         return String(ast_to_str(scope, scope.preprocess(ast)))
@@ -188,12 +185,11 @@ class ASTIntConstructor(PrimFun):
         return ASTInt(val, sigil)
 
 
-class ASTIntToStr(PrimFun):
+class ASTIntToStr(PrimMethod):
     def __init__(self):
         super().__init__('ast.Int.to_str', ['ast'])
 
-    def macro(self, scope, ast):
-        ast = scope.eval(ast)
+    def method_macro(self, scope, ast):
         self.typecheck_arg(ast, ASTInt)
         return String(ast_to_str(scope, scope.preprocess(ast)))
 
@@ -208,12 +204,11 @@ class ASTFloatConstructor(PrimFun):
         return ASTFloat(val, sigil)
 
 
-class ASTFloatToStr(PrimFun):
+class ASTFloatToStr(PrimMethod):
     def __init__(self):
         super().__init__('ast.Float.to_str', ['ast'])
 
-    def macro(self, scope, ast):
-        ast = scope.eval(ast)
+    def method_macro(self, scope, ast):
         self.typecheck_arg(ast, ASTFloat)
         return String(ast_to_str(scope, scope.preprocess(ast)))
 
@@ -227,12 +222,11 @@ class ASTSymbolConstructor(PrimFun):
         return ASTSymbol(symbol)
 
 
-class ASTSymbolToStr(PrimFun):
+class ASTSymbolToStr(PrimMethod):
     def __init__(self):
         super().__init__('ast.Symbol.to_str', ['ast'])
 
-    def macro(self, scope, ast):
-        ast = scope.eval(ast)
+    def method_macro(self, scope, ast):
         self.typecheck_arg(ast, ASTSymbol)
         return String(ast_to_str(scope, scope.preprocess(ast)))
 
@@ -246,12 +240,11 @@ class ASTListConstructor(PrimFun):
         return ASTList(lst, List)
 
 
-class ASTListToStr(PrimFun):
+class ASTListToStr(PrimMethod):
     def __init__(self):
         super().__init__('ast.List.to_str', ['ast'])
 
-    def macro(self, scope, ast):
-        ast = scope.eval(ast)
+    def method_macro(self, scope, ast):
         self.typecheck_arg(ast, ASTList)
         return String(ast_to_str(scope, scope.preprocess(ast)))
 
@@ -265,12 +258,11 @@ class ASTTupleConstructor(PrimFun):
         return ASTTuple(tup)
 
 
-class ASTTupleToStr(PrimFun):
+class ASTTupleToStr(PrimMethod):
     def __init__(self):
         super().__init__('ast.Tuple.to_str', ['ast'])
 
-    def macro(self, scope, ast):
-        ast = scope.eval(ast)
+    def method_macro(self, scope, ast):
         self.typecheck_arg(ast, ASTTuple)
         return String(ast_to_str(scope, scope.preprocess(ast)))
 
@@ -284,12 +276,11 @@ class ASTMapConstructor(PrimFun):
         return ASTMap(lst)
 
 
-class ASTMapToStr(PrimFun):
+class ASTMapToStr(PrimMethod):
     def __init__(self):
         super().__init__('ast.Map.to_str', ['ast'])
 
-    def macro(self, scope, ast):
-        ast = scope.eval(ast)
+    def method_macro(self, scope, ast):
         self.typecheck_arg(ast, ASTMap)
         return String(ast_to_str(scope, scope.preprocess(ast)))
 
@@ -303,12 +294,11 @@ class ASTBlockConstructor(PrimFun):
         return ASTBlock(statements)
 
 
-class ASTBlockToStr(PrimFun):
+class ASTBlockToStr(PrimMethod):
     def __init__(self):
         super().__init__('ast.Block.to_str', ['ast'])
 
-    def macro(self, scope, ast):
-        ast = scope.eval(ast)
+    def method_macro(self, scope, ast):
         self.typecheck_arg(ast, ASTBlock)
         return String(ast_to_str(scope, scope.preprocess(ast)))
 
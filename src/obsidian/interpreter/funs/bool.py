@@ -7,6 +7,7 @@ from ..types import (
     true,
     false,
 )
+from .map import native_keys
 
 
 class BoolToStr(PrimFun):
@@ -18,6 +19,25 @@ class BoolToStr(PrimFun):
         return String('true' if bool.bool else 'false')
 
 
+class BoolHash(PrimFun):
+    def __init__(self):
+        super().__init__('Bool.hash', ['bool'])
+
+    def fun(self, bool):
+        self.typecheck_arg(bool, Bool)
+        return Int(hash(bool.bool))
+
+
+class BoolEq(PrimFun):
+    def __init__(self):
+        super().__init__('Bool.eq', ['a', 'b'])
+
+    def fun(self, a, b):
+        self.typecheck_arg(a, Bool)
+        self.typecheck_arg(b, Bool)
+        return true if a.bool == b.bool else false
+
+
 class And(PrimFun):
     def __init__(self):
         super().__init__('bool.and', ['a', 'b'])
@@ -51,5 +71,8 @@ class Or(PrimFun):
 
 
 Bool.T.get('methods').set('to_str', BoolToStr())
+Bool.T.get('methods').set('hash', BoolHash())
+Bool.T.get('methods').set('eq', BoolEq())
+native_keys[Bool] = (Bool.T.get('methods').get('hash'), Bool.T.get('methods').get('eq'), 'bool')
 and_fn = And()
 or_fn = Or()
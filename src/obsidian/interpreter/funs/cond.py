@@ -9,10 +9,18 @@ from ..types.ast import ASTTuple, ASTList
 
 
 class Cond(PrimFun):
+    tails = True
+
     def __init__(self):
         super().__init__('prim.cond', variadic=True)
 
     def macro(self, scope, *clauses):
+        expr = self.tail(scope, *clauses)
+        if expr is None:
+            return nil
+        return scope.eval(expr)
+
+    def tail(self, scope, *clauses):
         if len(clauses) == 0:
             raise Panic('PrimFun `prim.cond` needs at least one clause')
         for clause in clauses:
@@ -28,8 +36,8 @@ class Cond(PrimFun):
                 raise Panic(
                     'PrimFun `prim.cond` needs conditions to return `Bool`s, not `{}`'.format(type_name(condition)))
             if condition.bool:
-                return scope.eval(expr)
-        return nil
+                return expr
+        return None
 
 
 cond = Cond()
@@ -3,12 +3,13 @@ from ..types import (
     Int,
     Float,
     Symbol,
-    Map,
+    Sigils,
     String,
     true,
     false,
 )
 from ..types.ast import ASTString, ASTFloat
+from ..types.scope import save_literal
 from .get_attr import get_attr
 
 
@@ -22,7 +23,7 @@ class FloatConstructor(PrimFun):
         float = Float(ast.get('float').float)
         sigil = ast.get('sigil')
         if sigil.str == '':
-            return float
+            return save_literal(ast, float)
         constructors = Float.T.get('sigils')
         constructor = get_attr.fun(
             constructors, String('get')).call(scope, [ASTString(sigil)])
@@ -235,7 +236,7 @@ Float.T.set('call', FloatConstructor())
 Float.T.get('methods').set('to_str', FloatToStr())
 Float.T.get('methods').set('eq', FloatEq())
 Float.T.get('methods').set('hash', FloatHash())
-Float.T.set('sigils', Map({}))
+Float.T.set('sigils', Sigils({}))
 add = Add()
 sub = Sub()
 mul = Mul()
@@ -1,14 +1,17 @@
 from ..types import (
     PrimFun,
     Int,
+    make_int,
     String,
     Symbol,
-    Map,
+    Sigils,
     true,
     false,
 )
 from ..types.ast import ASTString, ASTInt
+from ..types.scope import save_literal
 from .get_attr import get_attr
+from .map import native_keys
 
 
 class IntConstructor(PrimFun):
@@ -21,7 +24,7 @@ class IntConstructor(PrimFun):
         sigil = ast.get('sigil')
         int = Int(ast.get('int').int)
         if sigil.str == '':
-            return int
+            return save_literal(ast, int)
         constructors = Int.T.get('sigils')
         constructor = get_attr.fun(
             constructors, String('get')).call(scope, [ASTString(sigil)])
@@ -53,7 +56,7 @@ class IntHash(PrimFun):
 
     def fun(self, int):
         self.typecheck_arg(int, Int)
-        return Int(hash(int.int))
+        return make_int(hash(int.int))
 
 
 class Add(PrimFun):
@@ -65,7 +68,7 @@ class Add(PrimFun):
     def fun(self, a, b):
         self.typecheck_arg(a, Int)
         self.typecheck_arg(b, Int)
-        return Int(a.int + b.int)
+        return make_int(a.int + b.int)
 
 
 class Sub(PrimFun):
@@ -77,7 +80,7 @@ class Sub(PrimFun):
     def fun(self, a, b):
         self.typecheck_arg(a, Int)
         self.typecheck_arg(b, Int)
-        return Int(a.int - b.int)
+        return make_int(a.int - b.int)
 
 
 class Mul(PrimFun):
@@ -89,7 +92,7 @@ class Mul(PrimFun):
     def fun(self, a, b):
         self.typecheck_arg(a, Int)
         self.typecheck_arg(b, Int)
-        return Int(a.int * b.int)
+        return make_int(a.int * b.int)
 
 
 class FloorDiv(PrimFun):
@@ -101,7 +104,7 @@ class FloorDiv(PrimFun):
     def fun(self, a, b):
         self.typecheck_arg(a, Int)
         self.typecheck_arg(b, Int)
-        return Int(a.int // b.int)
+        return make_int(a.int // b.int)
 
 
 class Mod(PrimFun):
@@ -113,7 +116,7 @@ class Mod(PrimFun):
     def fun(self, a, b):
         self.typecheck_arg(a, Int)
         self.typecheck_arg(b, Int)
-        return Int(a.int % b.int)
+        return make_int(a.int % b.int)
 
 
 class Pow(PrimFun):
@@ -125,7 +128,7 @@ class Pow(PrimFun):
     def fun(self, a, b):
         self.typecheck_arg(a, Int)
         self.typecheck_arg(b, Int)
-        return Int(a.int ** b.int)
+        return make_int(a.int ** b.int)
 
 
 class Eq(PrimFun):
@@ -222,7 +225,8 @@ Int.T.set('call', IntConstructor())
 Int.T.get('methods').set('to_str', IntToStr())
 Int.T.get('methods').set('eq', IntEq())
 Int.T.get('methods').set('hash', IntHash())
-Int.T.set('sigils', Map({}))
+Int.T.set('sigils', Sigils({}))
+native_keys[Int] = (Int.T.get('methods').get('hash'), Int.T.get('methods').get('eq'), 'int')
 
 add = Add()
 sub = Sub()
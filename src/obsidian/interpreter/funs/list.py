@@ -1,16 +1,63 @@
 from ..types import (
     PrimFun,
+    PrimMethod,
     Panic,
     List,
+    Tuple,
     Int,
+    make_int,
     String,
+    Bool,
     Scope,
+    type_name,
 )
 from ..types.scope import to_str, call_method
 from ..types.ast import ASTList, ASTIdent
 from .get_attr import get_attr
 
 
+def changing(lst):
+    # called before `lst` is changed in place
+    if lst.in_ast:
+        Scope.ast_generation += 1
+
+
+class Callback:
+    # calls an Obsidian callable from Python with values rather than ASTs,
+    # by binding them in a new scope for each call, since the callable may
+    # hold on to its caller's scope and evaluate the args later
+    def __init__(self, scope, fun, n_args):
+        self.parent = scope
+        self.fun = fun
+        self.names = ['__arg{}__'.format(i) for i in range(n_args)]
+        self.args = [ASTIdent(String(name)) for name in self.names]
+
+    def __call__(self, *vals):
+        scope = Scope(self.parent)
+        for name, val in zip(self.names, vals):
+            scope.set(name, val)
+        return self.fun.call(scope, self.args)
+
+    def test(self, fun_name, *vals):
+        # `__call__`, for callbacks that must return a `Bool`
+        res = self(*vals)
+        if not isinstance(res, Bool):
+            raise Panic('Functions passed to `{}` must return `Bool`s, not `{}`'.format(
+                fun_name, type_name(res)))
+        return res.bool
+
+
+class SortKey:
+    __slots__ = ('obj', 'less')
+
+    def __init__(self, obj, less):
+        self.obj = obj
+        self.less = less
+
+    def __lt__(self, other):
+        return self.less.test('List.sort', self.obj, other.obj)
+
+
 class ListConstructor(PrimFun):
     def __init__(self):
         super().__init__('List', ['ast'])
@@ -22,12 +69,11 @@ class ListConstructor(PrimFun):
         return List([scope.eval(elem) for elem in elems.elems])
 
 
-class ListToStr(PrimFun):
+class ListToStr(PrimMethod):
     def __init__(self):
         super().__init__('List.to_str', ['list'])
 
-    def macro(self, scope, lst):
-        lst = scope.eval(lst)
+    def method_macro(self, scope, lst):
         self.typecheck_arg(lst, List)
         strs = [to_str(scope, elem) for elem in lst.elems]
         return String('[' + ', '.join(strs) + ']')
@@ -56,6 +102,7 @@ class ListSet(PrimFun):
         if idx.int >= len(lst.elems):
             raise Panic('Index `{}` out of range (len = `{}`)'.format(
                 idx.int, len(lst.elems)))
+        changing(lst)
         lst.elems[idx.int] = val
 
 
@@ -65,16 +112,152 @@ class ListLen(PrimFun):
 
     def fun(self, lst):
         self.typecheck_arg(lst, List)
-        return Int(len(lst.elems))
+        return make_int(len(lst.elems))
+
+
+class ListAppend(PrimFun):
+    def __init__(self):
+        super().__init__('List.append', ['list', 'val'])
+
+    def fun(self, lst, val):
+        self.typecheck_arg(lst, List)
+        changing(lst)
+        lst.elems.append(val)
+
+
+class ListExtend(PrimFun):
+    def __init__(self):
+        super().__init__('List.extend', ['list', 'other'])
+
+    def fun(self, lst, other):
+        self.typecheck_arg(lst, List)
+        self.typecheck_arg(other, (List, Tuple))
+        changing(lst)
+        lst.elems.extend(other.elems)
+
+
+class ListPop(PrimFun):
+    def __init__(self):
+        super().__init__('List.pop', ['list'])
+
+    def fun(self, lst):
+        self.typecheck_arg(lst, List)
+        if not lst.elems:
+            raise Panic('Cannot pop from an empty `List`')
+        changing(lst)
+        return lst.elems.pop()
+
+
+class ListSlice(PrimFun):
+    def __init__(self):
+        super().__init__('List.slice', ['list', 'start', 'end'])
+
+    def fun(self, lst, start, end):
+        self.typecheck_arg(lst, List)
+        self.typecheck_arg(start, Int)
+        self.typecheck_arg(end, Int)
+        return List(lst.elems[start.int:end.int])
+
+
+class ListConcat(PrimFun):
+    def __init__(self):
+        super().__init__('List.concat', ['list', 'other'])
+
+    def fun(self, lst, other):
+        self.typecheck_arg(lst, List)
+        self.typecheck_arg(other, (List, Tuple))
+        return List(lst.elems + list(other.elems))
+
+
+class ListReverse(PrimFun):
+    def __init__(self):
+        super().__init__('List.reverse', ['list'])
+
+    def fun(self, lst):
+        self.typecheck_arg(lst, List)
+        changing(lst)
+        lst.elems.reverse()
+
+
+class ListMap(PrimMethod):
+    def __init__(self):
+        super().__init__('List.map', ['list', 'fun'])
+
+    def method_macro(self, scope, lst, fun):
+        self.typecheck_arg(lst, List)
+        callback = Callback(scope, scope.eval(fun), 1)
+        return List([callback(elem) for elem in lst.elems])
+
+
+class ListFilter(PrimMethod):
+    def __init__(self):
+        super().__init__('List.filter', ['list', 'fun'])
+
+    def method_macro(self, scope, lst, fun):
+        self.typecheck_arg(lst, List)
+        callback = Callback(scope, scope.eval(fun), 1)
+        return List([elem for elem in lst.elems if callback.test(self.name, elem)])
 
 
-class ListDot(PrimFun):
+class ListReduce(PrimMethod):
+    def __init__(self):
+        super().__init__('List.reduce', ['list', 'fun', 'init'])
+
+    def method_macro(self, scope, lst, fun, init):
+        self.typecheck_arg(lst, List)
+        callback = Callback(scope, scope.eval(fun), 2)
+        res = scope.eval(init)
+        for elem in lst.elems:
+            res = callback(res, elem)
+        return res
+
+
+class ListSort(PrimMethod):
+    # sorts the List in place, stably, by a `less` function of two elements
+    def __init__(self):
+        super().__init__('List.sort', ['list', 'less'])
+
+    def method_macro(self, scope, lst, less):
+        self.typecheck_arg(lst, List)
+        callback = Callback(scope, scope.eval(less), 2)
+        keys = [SortKey(elem, callback) for elem in lst.elems]
+        keys.sort()
+        changing(lst)
+        lst.elems[:] = [key.obj for key in keys]
+
+
+class ListIndexOf(PrimMethod):
+    # the index of the first element `eq` to `val`, or -1; elements of
+    # another type than `val` never are
+    def __init__(self):
+        super().__init__('List.index_of', ['list', 'val'])
+
+    def method_macro(self, scope, lst, val):
+        self.typecheck_arg(lst, List)
+        val = scope.eval(val)
+        val_type = val.get('meta').get('type')
+        eq_scope = Scope(scope)
+        eq_scope.set('__other__', val)
+        other = [ASTIdent(String('__other__'))]
+        for i, elem in enumerate(lst.elems):
+            if elem is val:
+                return make_int(i)
+            if elem.get('meta').get('type') is not val_type:
+                continue
+            res = call_method(eq_scope, elem, 'eq', other)
+            if not isinstance(res, Bool):
+                raise Panic('`eq` for `{}` must return a `Bool`'.format(type_name(elem)))
+            if res.bool:
+                return make_int(i)
+        return make_int(-1)
+
+
+class ListDot(PrimMethod):
     def __init__(self):
         super().__init__('List.dot', ['list', 'scope', 'attr'])
 
-    def macro(self, scope, lst, eval_scope, attr):
+    def method_macro(self, scope, lst, eval_scope, attr):
         # print(scope)
-        lst = scope.eval(lst)
         attr = scope.eval(attr)
         eval_scope = scope.eval(eval_scope)
         self.typecheck_arg(lst, List)
@@ -92,9 +275,35 @@ class ListDot(PrimFun):
             return call_method(eval_scope, lst, 'get', [attr.elems_list()[0]])
 
 
+list_len = ListLen()
+get = ListGet()
+list_set = ListSet()
+append = ListAppend()
+extend = ListExtend()
+pop = ListPop()
+list_slice = ListSlice()
+concat = ListConcat()
+reverse = ListReverse()
+list_map = ListMap()
+list_filter = ListFilter()
+reduce = ListReduce()
+sort = ListSort()
+index_of = ListIndexOf()
+
 List.T.set('call', ListConstructor())
-List.T.get('methods').set('len', ListLen())
-List.T.get('methods').set('get', ListGet())
-List.T.get('methods').set('set', ListSet())
+List.T.get('methods').set('len', list_len)
+List.T.get('methods').set('get', get)
+List.T.get('methods').set('set', list_set)
 List.T.get('methods').set('to_str', ListToStr())
 List.T.get('methods').set('dot', ListDot())
+List.T.get('methods').set('append', append)
+List.T.get('methods').set('extend', extend)
+List.T.get('methods').set('pop', pop)
+List.T.get('methods').set('slice', list_slice)
+List.T.get('methods').set('concat', concat)
+List.T.get('methods').set('reverse', reverse)
+List.T.get('methods').set('map', list_map)
+List.T.get('methods').set('filter', list_filter)
+List.T.get('methods').set('reduce', reduce)
+List.T.get('methods').set('sort', sort)
+List.T.get('methods').set('index_of', index_of)
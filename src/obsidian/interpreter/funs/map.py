@@ -2,7 +2,10 @@ from ..types import (
     Map,
     Tuple,
     String,
+    Value,
+    AttrTable,
     PrimFun,
+    PrimMethod,
     Panic,
     Scope,
 )
@@ -12,21 +15,74 @@ from ..types.scope import (
     obj_eq,
     type_name,
     call_method,
+    type_attr,
 )
 from ..types.ast import ASTMap, ASTIdent, ASTList
 from .get_attr import get_attr
 
+# the built-in key types that are hashed and compared as Python values for
+# as long as their `hash` and `eq` methods are the built-in ones, by class:
+# those (hash, eq) PrimFuns and the Python attr holding the value (None for
+# Tuples, whose elements are keys themselves)
+native_keys = {}
+native_types = (None, set())  # (AttrTable.generation, classes still native)
+
+
+def native_classes():
+    global native_types
+    if native_types[0] != AttrTable.generation:
+        classes = set()
+        for cls, (hash_fun, eq_fun, attr) in native_keys.items():
+            found_hash = type_attr(cls.T, 'hash')
+            found_eq = type_attr(cls.T, 'eq')
+            if found_hash is not None and found_hash[1] is hash_fun and \
+                    found_eq is not None and found_eq[1] is eq_fun:
+                classes.add(cls)
+        native_types = (AttrTable.generation, classes)
+    return native_types[1]
+
+
+def native_key(key, classes):
+    # the (value, hash) `key` is compared and hashed by, where the hash is
+    # the one its `hash` method would give, or None if it has to go through
+    # its methods
+    cls = type(key)
+    if cls not in classes or key.attrs is not Value.shared_attrs[cls]:
+        return None
+    attr = native_keys[cls][2]
+    if attr is not None:
+        value = getattr(key, attr)
+        return (cls, value), hash(value)
+    elems = []
+    for elem in key.elems:
+        native = native_key(elem, classes)
+        if native is None:
+            return None
+        elems.append(native)
+    return (cls, tuple(value for value, code in elems)), hash(tuple(code for value, code in elems))
+
 
 class MapKey:
+    __slots__ = ('key', 'scope', 'native', 'hash')
+
     def __init__(self, key, scope):
         self.key = key
         self.scope = scope
+        native = native_key(key, native_classes())
+        if native is None:
+            self.native = self.hash = None
+        else:
+            self.native, self.hash = native
 
     def __hash__(self):
-        return hash_obj(self.scope, self.key)
+        if self.hash is None:
+            self.hash = hash_obj(self.scope, self.key)
+        return self.hash
 
     def __eq__(self, other):
-        return obj_eq(self.scope, self.key, other)
+        if self.native is not None and other.native is not None:
+            return self.native == other.native
+        return obj_eq(self.scope, self.key, other.key)
 
 
 class MapConstructor(PrimFun):
@@ -52,12 +108,11 @@ class MapConstructor(PrimFun):
         return Map(dictionary)
 
 
-class MapGet(PrimFun):
+class MapGet(PrimMethod):
     def __init__(self):
         super().__init__('Map.get', ['map', 'key'])
 
-    def macro(self, scope, map, key):
-        map = scope.eval(map)
+    def method_macro(self, scope, map, key):
         self.typecheck_arg(map, Map)
         key = scope.eval(key)
         map_key = MapKey(key, scope)
@@ -66,25 +121,22 @@ class MapGet(PrimFun):
         return map.elems[map_key]
 
 
-class MapSet(PrimFun):
+class MapSet(PrimMethod):
     def __init__(self):
         super().__init__('Map.set', ['map', 'key', 'val'])
 
-    def macro(self, scope, map, key, val):
-        map = scope.eval(map)
+    def method_macro(self, scope, map, key, val):
         self.typecheck_arg(map, Map)
         key = scope.eval(key)
         val = scope.eval(val)
-        key = MapKey(key, scope)
-        map.elems[key] = val
+        map.set_elem(MapKey(key, scope), val)
 
 
-class MapToStr(PrimFun):
+class MapToStr(PrimMethod):
     def __init__(self):
         super().__init__('Map.to_str', ['map'])
 
-    def macro(self, scope, map):
-        map = scope.eval(map)
+    def method_macro(self, scope, map):
         self.typecheck_arg(map, Map)
         strs = [(to_str(scope, map_key.key), to_str(scope, val))
                 for map_key, val in map.elems.items()]
@@ -93,12 +145,11 @@ class MapToStr(PrimFun):
                       + '}')
 
 
-class MapDot(PrimFun):
+class MapDot(PrimMethod):
     def __init__(self):
         super().__init__('Map.dot', ['map', 'scope', 'attr'])
 
-    def macro(self, scope, map, eval_scope, attr):
-        map = scope.eval(map)
+    def method_macro(self, scope, map, eval_scope, attr):
         eval_scope = scope.eval(eval_scope)
         attr = scope.eval(attr)
         self.typecheck_arg(map, Map)
@@ -0,0 +1,171 @@
+from ..types import (
+    PMap,
+    Map,
+    String,
+    PrimFun,
+    PrimMethod,
+    Panic,
+    Scope,
+    make_int,
+    true,
+    false,
+)
+from ..types.scope import (
+    to_str,
+    call_method,
+)
+from ..types.ast import ASTIdent, ASTList
+from .get_attr import get_attr
+from .map import MapKey
+
+missing = object()
+
+
+class PMapConstructor(PrimFun):
+    # an empty PMap, or one with the entries of a Map or PMap
+    def __init__(self):
+        super().__init__('PMap', variadic=True)
+
+    def fun(self, *args):
+        if not args:
+            return PMap()
+        if len(args) != 1:
+            raise Panic('PrimFun `PMap` takes 0 or 1 arguments, not {}'.format(len(args)))
+        entries, = args
+        self.typecheck_arg(entries, (Map, PMap))
+        if isinstance(entries, PMap):
+            return entries.snapshot()
+        pmap = PMap().transient()
+        for map_key, val in entries.elems.items():
+            pmap.assoc(map_key, val)
+        return pmap.persistent()
+
+
+class PMapGet(PrimMethod):
+    def __init__(self):
+        super().__init__('PMap.get', ['pmap', 'key'])
+
+    def method_macro(self, scope, pmap, key):
+        self.typecheck_arg(pmap, PMap)
+        key = scope.eval(key)
+        val = pmap.find(MapKey(key, scope), missing)
+        if val is missing:
+            raise Panic('No such key `{}` in `PMap`'.format(to_str(scope, key)))
+        return val
+
+
+class PMapHas(PrimMethod):
+    def __init__(self):
+        super().__init__('PMap.has', ['pmap', 'key'])
+
+    def method_macro(self, scope, pmap, key):
+        self.typecheck_arg(pmap, PMap)
+        key = scope.eval(key)
+        return false if pmap.find(MapKey(key, scope), missing) is missing else true
+
+
+class PMapSet(PrimMethod):
+    # the PMap with `key` set to `val`, which is the same PMap, changed, if
+    # it's transient
+    def __init__(self):
+        super().__init__('PMap.set', ['pmap', 'key', 'val'])
+
+    def method_macro(self, scope, pmap, key, val):
+        self.typecheck_arg(pmap, PMap)
+        key = scope.eval(key)
+        val = scope.eval(val)
+        return pmap.assoc(MapKey(key, scope), val)
+
+
+class PMapRemove(PrimMethod):
+    def __init__(self):
+        super().__init__('PMap.remove', ['pmap', 'key'])
+
+    def method_macro(self, scope, pmap, key):
+        self.typecheck_arg(pmap, PMap)
+        key = scope.eval(key)
+        return pmap.dissoc(MapKey(key, scope))
+
+
+class PMapLen(PrimFun):
+    def __init__(self):
+        super().__init__('PMap.len', ['pmap'])
+
+    def fun(self, pmap):
+        self.typecheck_arg(pmap, PMap)
+        return make_int(pmap.len)
+
+
+class PMapTransient(PrimFun):
+    def __init__(self):
+        super().__init__('PMap.transient', ['pmap'])
+
+    def fun(self, pmap):
+        self.typecheck_arg(pmap, PMap)
+        return pmap.transient()
+
+
+class PMapPersistent(PrimFun):
+    def __init__(self):
+        super().__init__('PMap.persistent', ['pmap'])
+
+    def fun(self, pmap):
+        self.typecheck_arg(pmap, PMap)
+        return pmap.persistent()
+
+
+class PMapToMap(PrimFun):
+    def __init__(self):
+        super().__init__('PMap.to_map', ['pmap'])
+
+    def fun(self, pmap):
+        self.typecheck_arg(pmap, PMap)
+        return Map(dict(pmap.items()))
+
+
+class PMapToStr(PrimMethod):
+    def __init__(self):
+        super().__init__('PMap.to_str', ['pmap'])
+
+    def method_macro(self, scope, pmap):
+        self.typecheck_arg(pmap, PMap)
+        strs = [(to_str(scope, map_key.key), to_str(scope, val))
+                for map_key, val in pmap.items()]
+        return String('PMap{' + ', '.join('{} -> {}'.format(key_str, val_str)
+                                          for key_str, val_str in strs)
+                      + '}')
+
+
+class PMapDot(PrimMethod):
+    def __init__(self):
+        super().__init__('PMap.dot', ['pmap', 'scope', 'attr'])
+
+    def method_macro(self, scope, pmap, eval_scope, attr):
+        eval_scope = scope.eval(eval_scope)
+        attr = scope.eval(attr)
+        self.typecheck_arg(pmap, PMap)
+        self.typecheck_arg(eval_scope, Scope)
+        self.typecheck_arg(attr, (ASTIdent, ASTList))
+        attr.validate()
+        if isinstance(attr, ASTIdent):
+            return get_attr.fun(pmap, attr.get('ident'))
+        else:
+            elems = attr.elems_list()
+            if not len(elems) == 1:
+                raise Panic(
+                    'PrimFun `PMap.dot` needs exactly `1` element in its attribute list, not `{}`'
+                    .format(len(elems)))
+            return call_method(eval_scope, pmap, 'get', [attr.elems_list()[0]])
+
+
+PMap.T.set('call', PMapConstructor())
+PMap.T.get('methods').set('to_str', PMapToStr())
+PMap.T.get('methods').set('get', PMapGet())
+PMap.T.get('methods').set('set', PMapSet())
+PMap.T.get('methods').set('dot', PMapDot())
+PMap.T.get('methods').set('has', PMapHas())
+PMap.T.get('methods').set('remove', PMapRemove())
+PMap.T.get('methods').set('len', PMapLen())
+PMap.T.get('methods').set('transient', PMapTransient())
+PMap.T.get('methods').set('persistent', PMapPersistent())
+PMap.T.get('methods').set('to_map', PMapToMap())
@@ -0,0 +1,164 @@
+from ..types import (
+    PVector,
+    List,
+    Tuple,
+    Int,
+    String,
+    PrimFun,
+    PrimMethod,
+    Panic,
+    Scope,
+    make_int,
+)
+from ..types.scope import to_str, call_method
+from ..types.ast import ASTIdent, ASTList
+from .get_attr import get_attr
+
+
+def check_index(vec, idx, end):
+    if not 0 <= idx.int < end:
+        raise Panic('Index `{}` out of range (len = `{}`)'.format(
+            idx.int, vec.len))
+
+
+class PVectorConstructor(PrimFun):
+    # an empty PVector, or one with the elements of a List, Tuple or PVector
+    def __init__(self):
+        super().__init__('PVector', variadic=True)
+
+    def fun(self, *args):
+        if not args:
+            return PVector()
+        if len(args) != 1:
+            raise Panic('PrimFun `PVector` takes 0 or 1 arguments, not {}'.format(len(args)))
+        elems, = args
+        self.typecheck_arg(elems, (List, Tuple, PVector))
+        if isinstance(elems, PVector):
+            return elems.snapshot()
+        return PVector.from_list(elems.elems)
+
+
+class PVectorGet(PrimFun):
+    def __init__(self):
+        super().__init__('PVector.get', ['pvector', 'idx'])
+
+    def fun(self, vec, idx):
+        self.typecheck_arg(vec, PVector)
+        self.typecheck_arg(idx, Int)
+        check_index(vec, idx, vec.len)
+        return vec.nth(idx.int)
+
+
+class PVectorSet(PrimFun):
+    # the PVector with element `idx` set to `val`, where `idx` can also be
+    # the length, to append; it's the same PVector, changed, if transient
+    def __init__(self):
+        super().__init__('PVector.set', ['pvector', 'idx', 'val'])
+
+    def fun(self, vec, idx, val):
+        self.typecheck_arg(vec, PVector)
+        self.typecheck_arg(idx, Int)
+        check_index(vec, idx, vec.len + 1)
+        return vec.assoc(idx.int, val)
+
+
+class PVectorAppend(PrimFun):
+    def __init__(self):
+        super().__init__('PVector.append', ['pvector', 'val'])
+
+    def fun(self, vec, val):
+        self.typecheck_arg(vec, PVector)
+        return vec.append(val)
+
+
+class PVectorPop(PrimFun):
+    # the PVector without its last element
+    def __init__(self):
+        super().__init__('PVector.pop', ['pvector'])
+
+    def fun(self, vec):
+        self.typecheck_arg(vec, PVector)
+        if not vec.len:
+            raise Panic('Cannot pop from an empty `PVector`')
+        return vec.pop()
+
+
+class PVectorLen(PrimFun):
+    def __init__(self):
+        super().__init__('PVector.len', ['pvector'])
+
+    def fun(self, vec):
+        self.typecheck_arg(vec, PVector)
+        return make_int(vec.len)
+
+
+class PVectorTransient(PrimFun):
+    def __init__(self):
+        super().__init__('PVector.transient', ['pvector'])
+
+    def fun(self, vec):
+        self.typecheck_arg(vec, PVector)
+        return vec.transient()
+
+
+class PVectorPersistent(PrimFun):
+    def __init__(self):
+        super().__init__('PVector.persistent', ['pvector'])
+
+    def fun(self, vec):
+        self.typecheck_arg(vec, PVector)
+        return vec.persistent()
+
+
+class PVectorToList(PrimFun):
+    def __init__(self):
+        super().__init__('PVector.to_list', ['pvector'])
+
+    def fun(self, vec):
+        self.typecheck_arg(vec, PVector)
+        return List(list(vec))
+
+
+class PVectorToStr(PrimMethod):
+    def __init__(self):
+        super().__init__('PVector.to_str', ['pvector'])
+
+    def method_macro(self, scope, vec):
+        self.typecheck_arg(vec, PVector)
+        strs = [to_str(scope, elem) for elem in vec]
+        return String('PVector[' + ', '.join(strs) + ']')
+
+
+class PVectorDot(PrimMethod):
+    def __init__(self):
+        super().__init__('PVector.dot', ['pvector', 'scope', 'attr'])
+
+    def method_macro(self, scope, vec, eval_scope, attr):
+        attr = scope.eval(attr)
+        eval_scope = scope.eval(eval_scope)
+        self.typecheck_arg(vec, PVector)
+        self.typecheck_arg(eval_scope, Scope)
+        self.typecheck_arg(attr, (ASTIdent, ASTList))
+        attr.validate()
+        if isinstance(attr, ASTIdent):
+            return get_attr.fun(vec, attr.get('ident'))
+        else:
+            elems = attr.elems_list()
+            if not len(elems) == 1:
+                raise Panic(
+                    'PrimFun `PVector.dot` needs exactly `1` element in its attribute list, not `{}`'
+                    .format(len(elems)))
+            return call_method(eval_scope, vec, 'get', [attr.elems_list()[0]])
+
+
+PVector.T.set('call', PVectorConstructor())
+PVector.T.get('methods').set('len', PVectorLen())
+PVector.T.get('methods').set('get', PVectorGet())
+PVector.T.get('methods').set('set', PVectorSet())
+PVector.T.get('methods').set('to_str', PVectorToStr())
+PVector.T.get('methods').set('dot', PVectorDot())
+PVector.T.get('methods').set('append', PVectorAppend())
+PVector.T.get('methods').set('pop', PVectorPop())
+PVector.T.get('methods').set('transient', PVectorTransient())
+PVector.T.get('methods').set('persistent', PVectorPersistent())
+PVector.T.get('methods').set('to_list', PVectorToList())
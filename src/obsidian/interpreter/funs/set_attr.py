@@ -1,4 +1,5 @@
-from ..types import String, PrimFun
+from ..types import String, PrimFun, Scope, AttrTable
+from ..types.ast import ast_nodes, owned
 
 
 class SetAttr(PrimFun):
@@ -7,6 +8,13 @@ class SetAttr(PrimFun):
 
     def fun(self, obj, attr, val):
         self.typecheck_arg(attr, String)
+        if isinstance(obj, ast_nodes):
+            # what's saved on ASTs may depend on this one
+            Scope.ast_generation += 1
+            owned(val)
+        if attr.str in ['parent', 'meta', 'methods', 'statics']:
+            # the attrs `get_attr` saved on Types may have gone through it
+            AttrTable.generation += 1
         return obj.set(attr.str, val)
 
 
@@ -1,14 +1,22 @@
 from ..types import (
     PrimFun,
+    PrimMethod,
+    Panic,
     String,
+    StringBuilder,
+    List,
+    Tuple,
     Map,
+    Sigils,
     Int,
+    make_int,
     Scope,
     true,
     false,
 )
 from ..types.ast import ASTString
-from .map import MapKey
+from ..types.scope import save_literal, to_str
+from .map import MapKey, native_keys
 from .get_attr import get_attr
 
 import re
@@ -24,6 +32,8 @@ ESCAPE_SEQUENCE_RE = re.compile(r'''
     | \\[\\'"abfnrtv]  # Single-character escapes
     )''', re.UNICODE | re.VERBOSE)
 
+FORMAT_FIELD_RE = re.compile(r'{{|}}|{}')  # see `StringFormat`
+
 
 def decode_escapes(s):
     def decode_match(match):
@@ -41,11 +51,14 @@ class StringConstructor(PrimFun):
         string = ast.get('str')
         sigil = ast.get('sigil')
         if sigil.str == 'r':
-            return String(string.str)
+            return save_literal(ast, String(string.str))
         constructors = String.T.get('sigils')
         constructor = get_attr.fun(
             constructors, String('get')).call(scope, [ASTString(sigil, String('r'))])
-        return constructor.call(scope, [ASTString(string, String('r'))])
+        res = constructor.call(scope, [ASTString(string, String('r'))])
+        if isinstance(constructor, StringDefaultConstructor) and isinstance(constructors, Sigils):
+            save_literal(ast, res, constructors)
+        return res
 
 
 class StringDefaultConstructor(PrimFun):
@@ -62,7 +75,12 @@ class StringHash(PrimFun):
 
     def fun(self, string):
         self.typecheck_arg(string, String)
-        return Int(hash(string.str))
+        try:
+            return string.hash_int
+        except AttributeError:
+            # Strings don't change, so neither does their hash
+            string.hash_int = make_int(hash(string.str))
+            return string.hash_int
 
 
 class StringEq(PrimFun):
@@ -80,17 +98,161 @@ class Concat(PrimFun):
         super().__init__('String.get', variadic=True)
 
     def fun(self, *strings):
-        catted_string = ''
         for string in strings:
             self.typecheck_arg(string, String)
-            catted_string += string.str
-        return String(catted_string)
+        return String(''.join(string.str for string in strings))
+
+
+class StringLen(PrimFun):
+    def __init__(self):
+        super().__init__('String.len', ['string'])
+
+    def fun(self, string):
+        self.typecheck_arg(string, String)
+        return make_int(len(string.str))
+
+
+class StringSplit(PrimFun):
+    def __init__(self):
+        super().__init__('String.split', ['string', 'sep'])
+
+    def fun(self, string, sep):
+        self.typecheck_arg(string, String)
+        self.typecheck_arg(sep, String)
+        if sep.str == '':
+            raise Panic('Separator passed to `String.split` must not be empty')
+        return List([String(part) for part in string.str.split(sep.str)])
+
+
+class StringJoin(PrimFun):
+    def __init__(self):
+        super().__init__('String.join', ['sep', 'strings'])
+
+    def fun(self, sep, strings):
+        self.typecheck_arg(sep, String)
+        self.typecheck_arg(strings, (List, Tuple))
+        for string in strings.elems:
+            self.typecheck_arg(string, String)
+        return String(sep.str.join(string.str for string in strings.elems))
+
+
+class StringFind(PrimFun):
+    def __init__(self):
+        super().__init__('String.find', ['string', 'sub'])
+
+    def fun(self, string, sub):
+        self.typecheck_arg(string, String)
+        self.typecheck_arg(sub, String)
+        return make_int(string.str.find(sub.str))
+
+
+class StringReplace(PrimFun):
+    def __init__(self):
+        super().__init__('String.replace', ['string', 'old', 'new'])
+
+    def fun(self, string, old, new):
+        self.typecheck_arg(string, String)
+        self.typecheck_arg(old, String)
+        self.typecheck_arg(new, String)
+        return String(string.str.replace(old.str, new.str))
+
+
+class StringSlice(PrimFun):
+    def __init__(self):
+        super().__init__('String.slice', ['string', 'start', 'end'])
+
+    def fun(self, string, start, end):
+        self.typecheck_arg(string, String)
+        self.typecheck_arg(start, Int)
+        self.typecheck_arg(end, Int)
+        return String(string.str[start.int:end.int])
+
+
+class StringStartsWith(PrimFun):
+    def __init__(self):
+        super().__init__('String.starts_with', ['string', 'prefix'])
+
+    def fun(self, string, prefix):
+        self.typecheck_arg(string, String)
+        self.typecheck_arg(prefix, String)
+        return true if string.str.startswith(prefix.str) else false
+
+
+class StringFormat(PrimMethod):
+    # fills in each `{}` with the `to_str` of the next arg; `{{` and `}}`
+    # stand for braces
+    def __init__(self):
+        super().__init__('String.format', variadic=True)
+
+    def method_macro(self, scope, string, *args):
+        self.typecheck_arg(string, String)
+        strs = [to_str(scope, scope.eval(arg)) for arg in args]
+        fields = FORMAT_FIELD_RE.findall(string.str).count('{}')
+        if fields != len(strs):
+            raise Panic('Format string has `{}` fields, but got `{}` args'.format(
+                fields, len(strs)))
+        strs.reverse()
+
+        def fill(match):
+            field = match.group()
+            return strs.pop() if field == '{}' else field[0]
+        return String(FORMAT_FIELD_RE.sub(fill, string.str))
+
+
+class StringBuilderConstructor(PrimFun):
+    def __init__(self):
+        super().__init__('StringBuilder', [])
+
+    def fun(self):
+        return StringBuilder()
+
+
+class StringBuilderAppend(PrimFun):
+    def __init__(self):
+        super().__init__('StringBuilder.append', ['builder', 'string'])
+
+    def fun(self, builder, string):
+        self.typecheck_arg(builder, StringBuilder)
+        self.typecheck_arg(string, String)
+        builder.append(string.str)
+        return builder
+
+
+class StringBuilderLen(PrimFun):
+    def __init__(self):
+        super().__init__('StringBuilder.len', ['builder'])
+
+    def fun(self, builder):
+        self.typecheck_arg(builder, StringBuilder)
+        return make_int(builder.len)
+
+
+class StringBuilderToStr(PrimFun):
+    def __init__(self):
+        super().__init__('StringBuilder.to_str', ['builder'])
+
+    def fun(self, builder):
+        self.typecheck_arg(builder, StringBuilder)
+        return String(builder.build())
 
 
 String.T.set('call', StringConstructor())
 String.T.get('methods').set('hash', StringHash())
 String.T.get('methods').set('eq', StringEq())
-String.T.set('sigils', Map({
+native_keys[String] = (String.T.get('methods').get('hash'), String.T.get('methods').get('eq'), 'str')
+String.T.set('sigils', Sigils({
     MapKey(String(''), Scope()): StringDefaultConstructor(),
 }))
+String.T.get('methods').set('len', StringLen())
+String.T.get('methods').set('split', StringSplit())
+String.T.get('methods').set('join', StringJoin())
+String.T.get('methods').set('find', StringFind())
+String.T.get('methods').set('replace', StringReplace())
+String.T.get('methods').set('slice', StringSlice())
+String.T.get('methods').set('starts_with', StringStartsWith())
+String.T.get('methods').set('format', StringFormat())
+StringBuilder.T.set('call', StringBuilderConstructor())
+StringBuilder.T.get('methods').set('append', StringBuilderAppend())
+StringBuilder.T.get('methods').set('len', StringBuilderLen())
+StringBuilder.T.get('methods').set('to_str', StringBuilderToStr())
 concat = Concat()
@@ -7,6 +7,8 @@ from ..types import (
     false,
 )
 from ..types.ast import ASTSymbol
+from ..types.scope import save_literal
+from .map import native_keys
 
 
 class SymbolHash(PrimFun):
@@ -44,10 +46,11 @@ class SymbolConstructor(PrimFun):
     def macro(self, scope, ast):
         self.typecheck_arg(ast, ASTSymbol)
         ast.validate()
-        return Symbol(ast.get('symbol').symbol)
+        return save_literal(ast, Symbol(ast.get('symbol').symbol))
 
 
 Symbol.T.get('methods').set('eq', SymbolEq())
 Symbol.T.get('methods').set('hash', SymbolHash())
 Symbol.T.get('methods').set('to_str', SymbolToStr())
 Symbol.T.set('call', SymbolConstructor())
+native_keys[Symbol] = (Symbol.T.get('methods').get('hash'), Symbol.T.get('methods').get('eq'), 'symbol')
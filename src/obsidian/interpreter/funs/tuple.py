@@ -1,13 +1,18 @@
 from ..types import (
     PrimFun,
+    PrimMethod,
     Panic,
     Tuple,
     Int,
+    make_int,
     String,
     Scope,
+    true,
+    false,
 )
 from .get_attr import get_attr
-from ..types.scope import to_str, call_method
+from .map import native_keys
+from ..types.scope import to_str, call_method, hash_obj, obj_eq
 from ..types.ast import ASTTuple, ASTIdent, ASTList
 
 
@@ -21,25 +26,39 @@ class TupleConstructor(PrimFun):
         return Tuple([scope.eval(elem) for elem in ast.elems_list()])
 
 
-class TupleToStr(PrimFun):
+class TupleToStr(PrimMethod):
     def __init__(self):
         super().__init__('Tuple.to_str', ['tuple'])
 
-    def macro(self, scope, tup):
-        tup = scope.eval(tup)
+    def method_macro(self, scope, tup):
         self.typecheck_arg(tup, Tuple)
         strs = [to_str(scope, elem) for elem in tup.elems]
         return String('(' + ', '.join(strs) + ')')
 
 
-class TupleHash(PrimFun):
+class TupleHash(PrimMethod):
     def __init__(self):
         super().__init__('Tuple.hash', ['tuple'])
 
-    def macro(self, scope, tuple):
-        tuple = scope.eval(tuple)
-        self.typecheck_arg(tuple, Tuple)
-        return Int(hash(tuple(get_attr.fun(elem, 'hash').call(scope) for elem in tuple.elems)))
+    def method_macro(self, scope, tup):
+        self.typecheck_arg(tup, Tuple)
+        return Int(hash(tuple(hash_obj(scope, elem) for elem in tup.elems)))
+
+
+class TupleEq(PrimMethod):
+    def __init__(self):
+        super().__init__('Tuple.eq', ['a', 'b'])
+
+    def method_macro(self, scope, a, b):
+        b = scope.eval(b)
+        self.typecheck_arg(a, Tuple)
+        self.typecheck_arg(b, Tuple)
+        if len(a.elems) != len(b.elems):
+            return false
+        for elem, other in zip(a.elems, b.elems):
+            if not obj_eq(scope, elem, other):
+                return false
+        return true
 
 
 class TupleGet(PrimFun):
@@ -61,16 +80,15 @@ class TupleLen(PrimFun):
 
     def fun(self, tup):
         self.typecheck_arg(tup, Tuple)
-        return Int(len(tup.elems))
+        return make_int(len(tup.elems))
 
 
-class TupleDot(PrimFun):
+class TupleDot(PrimMethod):
     def __init__(self):
         super().__init__('Tuple.dot', ['tuple', 'scope', 'attr'])
 
-    def macro(self, scope, tup, eval_scope, attr):
+    def method_macro(self, scope, tup, eval_scope, attr):
         # print(scope)
-        tup = scope.eval(tup)
         attr = scope.eval(attr)
         eval_scope = scope.eval(eval_scope)
         self.typecheck_arg(tup, Tuple)
@@ -92,5 +110,7 @@ Tuple.T.set('call', TupleConstructor())
 Tuple.T.get('methods').set('get', TupleGet())
 Tuple.T.get('methods').set('to_str', TupleToStr())
 Tuple.T.get('methods').set('hash', TupleHash())
+Tuple.T.get('methods').set('eq', TupleEq())
 Tuple.T.get('methods').set('len', TupleLen())
 Tuple.T.get('methods').set('dot', TupleDot())
+native_keys[Tuple] = (Tuple.T.get('methods').get('hash'), Tuple.T.get('methods').get('eq'), None)
@@ -0,0 +1,305 @@
+import hashlib
+import mmap
+import struct
+import sys
+from array import array
+
+from ..positions import PositionTable
+from .types import Int, Float, Symbol, List, Tuple
+from .types.ast import (
+    ASTIdent,
+    ASTString,
+    ASTInterpolatedString,
+    ASTInt,
+    ASTFloat,
+    ASTList,
+    ASTTuple,
+    ASTMap,
+    ASTCall,
+    ASTBinarySlurp,
+    ASTSymbol,
+    ASTUnquote,
+    ASTBlock,
+    model_to_ast,
+    name_string,
+)
+
+# A binary format for compiled modules (.onc files). Everything lives in flat
+# arrays of fixed-size items, so loading is a matter of casting slices of the
+# file (memory-mapped or not) and building the AST objects in one pass:
+#
+#     header     magic, format version, byte order, sha256 of the source, and
+#                the (offset, count) of each section
+#     strings    start offsets ('q') of the strings in `blob`, plus the end
+#     blob       the utf-8 encoded strings
+#     ints       int constants ('q')
+#     floats     float constants ('d')
+#     nodes      five 'i' per node: kind, offset (-1 for none), a, b, c
+#     children   node ids ('i') of the elements of List-like nodes
+#     statements node ids ('i') of the module's statements
+#     positions  the `PositionTable` arrays ('q')
+#
+# Nodes are written children first, so every node only refers to nodes
+# before it.
+
+magic = b'ONC\0'
+onc_format = 1
+sections = ['strings', 'blob', 'ints', 'floats', 'nodes', 'children',
+            'statements', 'line_starts', 'injected_at', 'injected_lens']
+section_types = {
+    'strings': 'q',
+    'blob': 'B',
+    'ints': 'q',
+    'floats': 'd',
+    'nodes': 'i',
+    'children': 'i',
+    'statements': 'i',
+    'line_starts': 'q',
+    'injected_at': 'q',
+    'injected_lens': 'q',
+}
+header_struct = struct.Struct('<4sHBx32s' + 'QQ' * len(sections))
+byteorders = {'little': 0, 'big': 1}
+
+IDENT, STRING, INTERPOLATED_STRING, INT, BIG_INT, FLOAT, SYMBOL, LIST, TUPLE, \
+    MAP, CALL, BINARY_SLURP, UNQUOTE, BLOCK = range(14)
+
+# the attr holding the elements of each List-like node
+element_kinds = {
+    ASTInterpolatedString: (INTERPOLATED_STRING, 'body'),
+    ASTList: (LIST, 'elems'),
+    ASTTuple: (TUPLE, 'elems'),
+    ASTMap: (MAP, 'elems'),
+    ASTBinarySlurp: (BINARY_SLURP, 'slurp'),
+    ASTBlock: (BLOCK, 'statements'),
+}
+
+
+class OncError(Exception):
+    pass
+
+
+def source_digest(source):
+    return hashlib.sha256(source.encode('utf-8', 'surrogatepass')).digest()
+
+
+class Writer:
+    def __init__(self):
+        self.strings = {}
+        self.string_list = []
+        self.ints = array('q')
+        self.floats = array('d')
+        self.nodes = array('i')
+        self.children = array('i')
+
+    def string(self, string):
+        index = self.strings.get(string)
+        if index is None:
+            index = self.strings[string] = len(self.string_list)
+            self.string_list.append(string)
+        return index
+
+    def node(self, kind, ast, a=0, b=0, c=0):
+        pos = ast.parseinfo
+        self.nodes.extend((kind, -1 if pos is None else pos, a, b, c))
+        return len(self.nodes) // 5 - 1
+
+    def elements(self, elems):
+        ids = [self.add(elem) for elem in elems]
+        start = len(self.children)
+        self.children.extend(ids)
+        return start, len(ids)
+
+    def add(self, ast):
+        ast = model_to_ast(ast)
+        if isinstance(ast, ASTIdent):
+            return self.node(IDENT, ast, self.string(ast.get('ident').str))
+        elif isinstance(ast, ASTString):
+            return self.node(STRING, ast, self.string(ast.get('str').str),
+                             self.string(ast.get('sigil').str))
+        elif isinstance(ast, ASTInt):
+            val = ast.get('int').int
+            sigil = self.string(ast.get('sigil').str)
+            if -(1 << 63) <= val < (1 << 63):
+                self.ints.append(val)
+                return self.node(INT, ast, len(self.ints) - 1, sigil)
+            return self.node(BIG_INT, ast, self.string(str(val)), sigil)
+        elif isinstance(ast, ASTFloat):
+            self.floats.append(ast.get('float').float)
+            return self.node(FLOAT, ast, len(self.floats) - 1,
+                             self.string(ast.get('sigil').str))
+        elif isinstance(ast, ASTSymbol):
+            return self.node(SYMBOL, ast, self.string(ast.get('symbol').symbol))
+        elif isinstance(ast, ASTCall):
+            callable_id = self.add(ast.get('callable'))
+            start, count = self.elements(ast.args_list())
+            return self.node(CALL, ast, callable_id, start, count)
+        elif isinstance(ast, ASTUnquote):
+            return self.node(UNQUOTE, ast, self.add(ast.get('expr')))
+        elif type(ast) in element_kinds:
+            kind, attr = element_kinds[type(ast)]
+            start, count = self.elements(ast.get(attr).elems)
+            return self.node(kind, ast, 0, start, count)
+        raise OncError('Cannot compile AST node {}'.format(ast))
+
+    def dumps(self, statements, source_map, source):
+        statement_ids = array('i', [self.add(statement) for statement in statements])
+        blobs = [string.encode('utf-8', 'surrogatepass') for string in self.string_list]
+        string_starts = array('q', [0])
+        for blob in blobs:
+            string_starts.append(string_starts[-1] + len(blob))
+        contents = {
+            'strings': string_starts,
+            'blob': array('B', b''.join(blobs)),
+            'ints': self.ints,
+            'floats': self.floats,
+            'nodes': self.nodes,
+            'children': self.children,
+            'statements': statement_ids,
+            'line_starts': array('q', source_map.line_starts),
+            'injected_at': array('q', source_map.injected_at),
+            'injected_lens': array('q', source_map.injected_lens),
+        }
+        body = bytearray()
+        layout = []
+        for name in sections:
+            body.extend(b'\0' * (-(header_struct.size + len(body)) % 8))
+            layout += [header_struct.size + len(body), len(contents[name])]
+            body.extend(contents[name].tobytes())
+        digest = b'\0' * 32 if source is None else source_digest(source)
+        header = header_struct.pack(magic, onc_format, byteorders[sys.byteorder],
+                                    digest, *layout)
+        return header + bytes(body)
+
+
+def dumps(statements, source_map, source=None):
+    # `source` is recorded so that `load` can tell if the file is stale
+    return Writer().dumps(statements, source_map, source)
+
+
+def dump(statements, source_map, f, source=None):
+    f.write(dumps(statements, source_map, source))
+
+
+def section(buffer, layout, name):
+    offset, count = layout[name]
+    typecode = section_types[name]
+    size = array(typecode).itemsize
+    if offset + count * size > len(buffer):
+        raise OncError('Truncated .onc section `{}`'.format(name))
+    return buffer[offset:offset + count * size].cast(typecode)
+
+
+def load(buffer, source=None):
+    # returns the (statements, source_map) dumped to `buffer`, anything
+    # supporting the buffer protocol, like a bytes object or an mmap
+    buffer = memoryview(buffer).cast('B')
+    if len(buffer) < header_struct.size:
+        raise OncError('Not a .onc file')
+    fields = header_struct.unpack_from(buffer)
+    file_magic, version, byteorder, digest = fields[:4]
+    if file_magic != magic:
+        raise OncError('Not a .onc file')
+    if version != onc_format:
+        raise OncError('Unsupported .onc format {}'.format(version))
+    if byteorder != byteorders[sys.byteorder]:
+        raise OncError('.onc file was written with a different byte order')
+    if source is not None and digest != source_digest(source):
+        raise OncError('.onc file is out of date')
+    layout = dict(zip(sections, zip(fields[4::2], fields[5::2])))
+    try:
+        return decode(buffer, layout)
+    except (IndexError, ValueError, TypeError) as e:
+        # a corrupt file, whose offsets or strings don't make sense
+        raise OncError('Corrupt .onc file: {}'.format(e))
+
+
+def decode(buffer, layout):
+    string_starts = section(buffer, layout, 'strings')
+    blob = section(buffer, layout, 'blob')
+    strings = [name_string(str(blob[string_starts[i]:string_starts[i + 1]], 'utf-8', 'surrogatepass'))
+               for i in range(len(string_starts) - 1)]
+    ints = section(buffer, layout, 'ints')
+    floats = section(buffer, layout, 'floats')
+    nodes = section(buffer, layout, 'nodes')
+    children = section(buffer, layout, 'children')
+    statement_ids = section(buffer, layout, 'statements')
+    # nodes only hold indices, which mustn't wrap around if they're negative
+    if min(min(nodes[2::5], default=0), min(nodes[3::5], default=0), min(nodes[4::5], default=0),
+           min(children, default=0), min(statement_ids, default=0)) < 0:
+        raise OncError('Corrupt .onc file: negative index')
+
+    objs = []
+    for i in range(0, len(nodes), 5):
+        kind, pos, a, b, c = nodes[i:i + 5]
+        pos = None if pos < 0 else pos
+        if kind == IDENT:
+            obj = ASTIdent(strings[a], parseinfo=pos)
+        elif kind == STRING:
+            obj = ASTString(strings[a], strings[b], parseinfo=pos)
+        elif kind == INT:
+            obj = ASTInt(Int(ints[a]), strings[b], parseinfo=pos)
+        elif kind == BIG_INT:
+            obj = ASTInt(Int(int(strings[a].str)), strings[b], parseinfo=pos)
+        elif kind == FLOAT:
+            obj = ASTFloat(Float(floats[a]), strings[b], parseinfo=pos)
+        elif kind == SYMBOL:
+            obj = ASTSymbol(Symbol(strings[a].str), parseinfo=pos)
+        elif kind == CALL:
+            obj = ASTCall(objs[a], List([objs[j] for j in children[b:b + c]]), parseinfo=pos)
+        elif kind == UNQUOTE:
+            obj = ASTUnquote(objs[a], parseinfo=pos)
+        else:
+            elems = [objs[j] for j in children[b:b + c]]
+            if kind == INTERPOLATED_STRING:
+                obj = ASTInterpolatedString(List(elems), parseinfo=pos)
+            elif kind == LIST:
+                obj = ASTList(List(elems), parseinfo=pos)
+            elif kind == TUPLE:
+                obj = ASTTuple(Tuple(elems), parseinfo=pos)
+            elif kind == MAP:
+                obj = ASTMap(List(elems), parseinfo=pos)
+            elif kind == BINARY_SLURP:
+                obj = ASTBinarySlurp(List(elems), parseinfo=pos)
+            elif kind == BLOCK:
+                obj = ASTBlock(List(elems), parseinfo=pos)
+            else:
+                raise OncError('Unknown .onc node kind {}'.format(kind))
+        objs.append(obj)
+
+    statements = [objs[i] for i in statement_ids]
+    source_map = PositionTable.from_arrays(section(buffer, layout, 'line_starts'),
+                                           section(buffer, layout, 'injected_at'),
+                                           section(buffer, layout, 'injected_lens'))
+    return statements, source_map
+
+
+def load_file(path, source=None):
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise OncError('Not a .onc file')  # empty files can't be mapped
+    # the loaded module doesn't keep references into the mapping, so it can be
+    # closed straight away (if loading fails, the traceback still holds views
+    # of it and it's left to be collected)
+    statements, source_map = load(mapped, source)
+    mapped.close()
+    return statements, source_map
+
+
+def compile_path(path):
+    return path + 'c'
+
+
+def compile_file(path):
+    # writes the compiled form of the module at `path` to `path` + 'c'
+    from ..parser import parse
+    from .types.ast import ASTSemantics
+    with open(path, 'r') as f:
+        source = f.read()
+    statements, source_map = parse(source, use_cache=False, semantics=ASTSemantics)
+    with open(compile_path(path), 'wb') as f:
+        dump(statements, source_map, f, source)
+    return compile_path(path)
+
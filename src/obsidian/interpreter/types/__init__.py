@@ -7,12 +7,16 @@ from .scope import (
     call_method,
 )
 from .module import Module
-from .int import Int
+from .int import Int, make_int
 from .float import Float
 from .list import List
 from .tuple import Tuple
-from .map import Map
+from .map import Map, Sigils
 from .symbol import Symbol
+from .string_builder import StringBuilder
+from .array import Array
+from .pmap import PMap
+from .pvector import PVector
 from .bool import (
     Bool,
     true,
@@ -22,8 +26,11 @@ from . import ast
 from ..bootstrap import (
     String,
     Object,
+    Value,
     Type,
+    AttrTable,
     PrimFun,
+    PrimMethod,
     Panic,
     Nil,
     nil,
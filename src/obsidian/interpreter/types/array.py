@@ -0,0 +1,19 @@
+from ..bootstrap import (
+    Object,
+    Value,
+    Type,
+)
+
+
+class Array(Value):
+    # a List of numbers that are all Ints or all Floats, unboxed in an
+    # `array.array` with typecode 'q' (int64) or 'd' (float64)
+    __slots__ = ('elems',)
+    T = Type('Array', Object.T)
+
+    def __init__(self, elems):
+        super().__init__()
+        self.elems = elems
+
+    def __repr__(self):
+        return 'Array({})'.format(self.elems)
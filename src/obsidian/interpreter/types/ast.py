@@ -1,3 +1,5 @@
+import sys
+
 from ... import semantics as sem
 from ..bootstrap import (
     String,
@@ -14,6 +16,13 @@ from .symbol import Symbol
 ast_node_type = Type('ast.Node', Object.T)
 
 
+def owned(elems):
+    # marks a List an AST node holds as `in_ast`
+    if isinstance(elems, List):
+        elems.in_ast = True
+    return elems
+
+
 class ASTString(Object):
     T = Type('ast.String', ast_node_type)
 
@@ -37,7 +46,7 @@ class ASTInterpolatedString(Object):
 
     def __init__(self, body, parseinfo=None):
         self.parseinfo = parseinfo
-        super().__init__({'body': body})
+        super().__init__({'body': owned(body)})
         self.validate()
 
     def validate(self):
@@ -122,7 +131,7 @@ class ASTList(Object):
 
     def __init__(self, elems, parseinfo=None):
         self.parseinfo = parseinfo
-        super().__init__({'elems': elems})
+        super().__init__({'elems': owned(elems)})
         self.validate()
 
     def validate(self):
@@ -141,7 +150,7 @@ class ASTBlock(Object):
 
     def __init__(self, statements, parseinfo=None):
         self.parseinfo = parseinfo
-        super().__init__({'statements': statements})
+        super().__init__({'statements': owned(statements)})
         self.validate()
 
     def validate(self):
@@ -160,7 +169,7 @@ class ASTTuple(Object):
 
     def __init__(self, elems, parseinfo=None):
         self.parseinfo = parseinfo
-        super().__init__({'elems': elems})
+        super().__init__({'elems': owned(elems)})
         self.validate()
 
     def validate(self):
@@ -179,7 +188,7 @@ class ASTMap(Object):
 
     def __init__(self, elems, parseinfo=None):
         self.parseinfo = parseinfo
-        super().__init__({'elems': elems})
+        super().__init__({'elems': owned(elems)})
         self.validate()
 
     def validate(self):
@@ -198,7 +207,7 @@ class ASTCall(Object):
 
     def __init__(self, callable_expr, args, parseinfo=None):
         self.parseinfo = parseinfo
-        super().__init__({'callable': callable_expr, 'args': args})
+        super().__init__({'callable': callable_expr, 'args': owned(args)})
         self.validate()
 
     def validate(self):
@@ -224,7 +233,7 @@ class ASTBinarySlurp(Object):
 
     def __init__(self, slurp, parseinfo=None):
         self.parseinfo = parseinfo
-        super().__init__({'slurp': slurp})
+        super().__init__({'slurp': owned(slurp)})
         self.validate()
 
     def validate(self):
@@ -245,14 +254,44 @@ class ASTUnquote(Object):
         return 'Unquote({})'.format(self.get('expr'))
 
 
+ast_nodes = (
+    ASTString,
+    ASTInterpolatedString,
+    ASTIdent,
+    ASTInt,
+    ASTFloat,
+    ASTSymbol,
+    ASTList,
+    ASTBlock,
+    ASTTuple,
+    ASTMap,
+    ASTCall,
+    ASTBinarySlurp,
+    ASTUnquote,
+)
+
+
+def interned(string):
+    # strings that could be names, interned: names get looked up in attrs
+    # dicts over and over, and an interned str is found there by identity
+    return sys.intern(string) if string.isidentifier() else string
+
+
+def name_string(string):
+    return String(interned(string))
+
+
 def model_to_ast(model):
+    if isinstance(model, Object):
+        # already translated, e.g. loaded from the parse cache
+        return model
     if isinstance(model, sem.Ident):
-        return ASTIdent(String(model.identifier), parseinfo=model.parseinfo)
+        return ASTIdent(String(sys.intern(model.identifier)), parseinfo=model.parseinfo)
     elif isinstance(model, sem.Call):
         return ASTCall(model_to_ast(model.callable_expr), List([model_to_ast(arg) for arg in model.args]),
                        parseinfo=model.parseinfo)
     elif isinstance(model, sem.String):
-        return ASTString(String(model.string), String(model.sigil), parseinfo=model.parseinfo)
+        return ASTString(String(interned(model.string)), String(model.sigil), parseinfo=model.parseinfo)
     elif isinstance(model, sem.InterpolatedString):
         return ASTInterpolatedString(List([model_to_ast(elem) for elem in model.body]),
                                      parseinfo=model.parseinfo)
@@ -287,6 +326,140 @@ def model_to_ast(model):
             'Translation of model node {} to AST not implemented'.format(model))
 
 
+class ASTSemantics:
+    # semantic actions that build the interpreter AST while parsing, giving
+    # the same trees as running `model_to_ast` over the `semantics.Semantics`
+    # model without building the model first
+    def identifier(info):
+        return ASTIdent(String(sys.intern(info['ident'])), parseinfo=info.parseinfo)
+
+    def binary_identifier(info):
+        return ASTIdent(String(sys.intern(info['ident'])), parseinfo=info.parseinfo)
+
+    def op(info):
+        return ASTIdent(String(sys.intern(info['op'])), parseinfo=info.parseinfo)
+
+    def integer(info):
+        sigil = '' if info['sigil'] is None else info['sigil']
+        return ASTInt(Int(int(float(info['val'].replace('_', '')))), String(sigil),
+                      parseinfo=info.parseinfo)
+
+    def float(info):
+        sigil = '' if info['sigil'] is None else info['sigil']
+        return ASTFloat(Float(float(info['val'].replace('_', ''))), String(sigil),
+                        parseinfo=info.parseinfo)
+
+    def interpolated_string(info):
+        bodies = info['bodies']
+        sigil = '' if info['sigil'] is None else info['sigil']
+        if len(bodies) == 0:
+            return ASTString(String(''), String(sigil), parseinfo=info.parseinfo)
+        if len(bodies) == 1 and isinstance(bodies[0], sem.StringBody):
+            return ASTString(String(interned(bodies[0].string)), String(sigil), parseinfo=info.parseinfo)
+        bodies = [ASTString(String(interned(body.string)), String(sigil), parseinfo=body.parseinfo)
+                  if isinstance(body, sem.StringBody) else body
+                  for body in bodies]
+        return ASTInterpolatedString(List(bodies), parseinfo=info.parseinfo)
+
+    triple_interpolated_string = interpolated_string
+
+    def STRING_BODY(info):
+        return sem.StringBody(sem.clean_string(info['body'], '"$'), parseinfo=info.parseinfo)
+
+    TSTRING_BODY = STRING_BODY
+
+    def single_string(info):
+        sigil = '' if info['sigil'] is None else info['sigil']
+        return ASTString(String(interned(sem.clean_string(info['val'][1: -1], "'"))), String(sigil),
+                         parseinfo=info.parseinfo)
+
+    def triple_single_string(info):
+        sigil = '' if info['sigil'] is None else info['sigil']
+        return ASTString(String(interned(sem.clean_string(info['val'][3: -3], "'"))), String(sigil),
+                         parseinfo=info.parseinfo)
+
+    def symbol(info):
+        return ASTSymbol(Symbol(info['symbol']), parseinfo=info.parseinfo)
+
+    def tuple(info):
+        if info.get('first') is None:
+            return ASTTuple(Tuple([]))
+        rest = info['rest'] if info['rest'] is not None else []
+        return ASTTuple(Tuple([info['first']] + rest), parseinfo=info.parseinfo)
+
+    def map(info):
+        if info.get('first') is None:
+            return ASTMap(List([]))
+        rest = info['rest'] if info['rest'] is not None else []
+        return ASTMap(List([info['first']] + rest), parseinfo=info.parseinfo)
+
+    def list(info):
+        if info['contents'] is None:
+            return ASTList(List([]))
+        return ASTList(List(list(info['contents'])), parseinfo=info.parseinfo)
+
+    def binary_slurp(info):
+        slurp = info['slurp']
+        if len(slurp) == 1:
+            return slurp[0]
+        return ASTBinarySlurp(List(list(slurp)), parseinfo=info.parseinfo)
+
+    block_slurp = binary_slurp
+
+    def block(info):
+        return ASTBlock(List(info['statements']), parseinfo=info.parseinfo)
+
+    def statement(info):
+        if len(info['args']) == 0:
+            return info['head']
+        return ASTCall(info['head'], List(list(info['args'])), parseinfo=info.parseinfo)
+
+    def call_expression(info):
+        return ASTCall(info['head'], List(list(info['args'])), parseinfo=info.parseinfo)
+
+    def unquote_expression(info):
+        return ASTUnquote(info, parseinfo=info.parseinfo)
+
+    def curly_expression(info):
+        exprs = info['exprs']
+        if len(exprs) == 1:
+            return exprs[0]
+        return ASTBlock(List(list(exprs)), parseinfo=info.parseinfo)
+
+    def statement_list(info):
+        # with no statements, `first` holds the parser's leftovers
+        statements = []
+        if isinstance(info['first'], Object):
+            statements.append(info['first'])
+        statements += info['rest']
+        return statements
+
+
+# pickle reductions that rebuild AST objects through their constructors, so
+# that cached trees point at the live types instead of copies of them
+ast_reducers = {
+    String: lambda s: (name_string, (s.str,)),
+    Int: lambda i: (Int, (i.int,)),
+    Float: lambda f: (Float, (f.float,)),
+    Symbol: lambda s: (Symbol, (s.symbol,)),
+    List: lambda l: (List, (l.elems,)),
+    Tuple: lambda t: (Tuple, (t.elems,)),
+    ASTIdent: lambda ast: (ASTIdent, (ast.get('ident'), ast.parseinfo)),
+    ASTString: lambda ast: (ASTString, (ast.get('str'), ast.get('sigil'), ast.parseinfo)),
+    ASTInterpolatedString: lambda ast: (ASTInterpolatedString, (ast.get('body'), ast.parseinfo)),
+    ASTInt: lambda ast: (ASTInt, (ast.get('int'), ast.get('sigil'), ast.parseinfo)),
+    ASTFloat: lambda ast: (ASTFloat, (ast.get('float'), ast.get('sigil'), ast.parseinfo)),
+    ASTSymbol: lambda ast: (ASTSymbol, (ast.get('symbol'), ast.parseinfo)),
+    ASTList: lambda ast: (ASTList, (ast.get('elems'), ast.parseinfo)),
+    ASTTuple: lambda ast: (ASTTuple, (ast.get('elems'), ast.parseinfo)),
+    ASTMap: lambda ast: (ASTMap, (ast.get('elems'), ast.parseinfo)),
+    ASTBlock: lambda ast: (ASTBlock, (ast.get('statements'), ast.parseinfo)),
+    ASTCall: lambda ast: (ASTCall, (ast.get('callable'), ast.get('args'), ast.parseinfo)),
+    ASTBinarySlurp: lambda ast: (ASTBinarySlurp, (ast.get('slurp'), ast.parseinfo)),
+    ASTUnquote: lambda ast: (ASTUnquote, (ast.get('expr'), ast.parseinfo)),
+}
+
+
 # ASTString.T = Type('ast.String', ast_node_type)
 # ASTInterpolatedString.T = Type('ast.InterpolatedString', ast_node_type)
 # ASTIdent.T = Type('ast.Ident', ast_node_type)
@@ -1,14 +1,16 @@
 from ..bootstrap import (
     Object,
+    Value,
     Type,
 )
 
 
-class Bool(Object):
+class Bool(Value):
+    __slots__ = ('bool',)
     T = Type('Bool', Object.T)
 
     def __init__(self, val):
-        super().__init__({})
+        super().__init__()
         self.bool = val
 
     def __repr__(self):
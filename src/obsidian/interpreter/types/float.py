@@ -1,14 +1,16 @@
 from ..bootstrap import (
     Object,
+    Value,
     Type,
 )
 
 
-class Float(Object):
+class Float(Value):
+    __slots__ = ('float',)
     T = Type('Float', Object.T)
 
     def __init__(self, val):
-        super().__init__({})
+        super().__init__()
         self.float = val
 
     def __repr__(self):
@@ -4,8 +4,10 @@ from ..bootstrap import (
     Type,
     PrimFun,
     String,
+    nil,
 )
-from .scope import Scope
+from .scope import Scope, leaf_nodes
+from .ast import ASTCall, ASTIdent
 from .list import List
 
 
@@ -20,30 +22,70 @@ class Fun(Object):
         # print(f'Created fun with body {body}')
 
     def call(self, caller_scope, args=None):
+        # Statements run through the scope's evaluator, except that `return x`
+        # returns without raising and, in the last statement, a call to
+        # `prim.cond` or `prim.do` is followed to the expr it ends up
+        # evaluating, and a call to another Fun replaces this one in the same
+        # loop, so that tail calls run in constant Python stack space. Other
+        # evaluators only have callables that are names looked at beforehand,
+        # since looking them up has no side effects
         if args is None:
             args = []
-        scope = Scope(self.get('definer'))
-        scope.get('meta').set('args', List(args))
-        scope.get('meta').set('caller', caller_scope)
-        scope.get('meta').set('fun', self)
-        scope.set('return', ret)
-        self.typecheck_attr('body', List)
-        body = self.get('body')
-        if not len(body.elems) > 0:
-            raise Panic('Funs must have at least one body statement')
-        try:
-            for statement_idx, statement in enumerate(body.elems[:-1]):
-                scope.eval(statement)
-            statement = body.elems[-1]
-            statement_idx = len(body.elems) - 1
-            return scope.eval(statement)
-        except ReturnException as e:  # hack to use Python's function stack instead of building our own
-            return e.obj
-        except Panic as p:
-            raise Panic(p.msg, stack=p.stack +
-                        [(self, {'args': args,
-                                 'statement': statement,
-                                 'statement_idx': statement_idx})])
+        fun = self
+        while True:
+            scope = Scope(fun.get('definer'))
+            scope.get('meta').set('args', List(args))
+            scope.get('meta').set('caller', caller_scope)
+            scope.get('meta').set('fun', fun)
+            scope.set('return', ret)
+            fun.typecheck_attr('body', List)
+            body = fun.get('body')
+            if not len(body.elems) > 0:
+                raise Panic('Funs must have at least one body statement')
+            tail_prims = []  # the (PrimFun, args) of the calls being followed
+            try:
+                for statement_idx, statement in enumerate(body.elems):
+                    last = statement_idx == len(body.elems) - 1
+                    expr = statement
+                    while True:
+                        if isinstance(expr, leaf_nodes):
+                            res = scope.eval(expr)
+                            break
+                        expr = scope.preprocessed(expr)
+                        callable = tail_callable(scope, expr, last)
+                        if callable is None:
+                            res = scope.eval_preprocessed(expr)
+                            break
+                        call_args = expr.get('args').elems
+                        if callable is ret and len(call_args) == 1:
+                            return scope.eval(call_args[0])
+                        if last and isinstance(callable, PrimFun) and callable.tails:
+                            tail_prims.append((callable, call_args))
+                            expr = callable.tail(scope, *call_args)
+                            if expr is None:
+                                res = nil
+                                break
+                        elif last and type(callable) is Fun:
+                            res = None
+                            break
+                        elif scope.evaluator == 'tree':
+                            res = callable.call(scope, call_args)
+                            break
+                        else:
+                            res = scope.eval_preprocessed(expr)
+                            break
+                if res is not None:
+                    return res
+                fun, args, caller_scope = callable, call_args, scope
+            except ReturnException as e:  # from `return`s in nested calls
+                return e.obj
+            except Panic as p:
+                for prim, prim_args in reversed(tail_prims):
+                    p.push_call(prim, prim_args)
+                p.push(fun, {'args': args if Panic.capture_args else None,
+                             'statement': statement,
+                             'statement_idx': statement_idx})
+                raise
 
     def name_string(self):
         name = self.get('name')
@@ -56,6 +98,24 @@ class Fun(Object):
         # return 'Fun({})'.format(self.get('body'))
 
 
+def tail_callable(scope, expr, last):
+    # what `Fun.call` might have to handle itself in the call `expr`: the
+    # callable, if it's a name, and it's the last statement or the name is
+    # `return`; the tree walker would evaluate the callable first anyway, so
+    # for it that's any callable
+    if not isinstance(expr, ASTCall):
+        return None
+    callable_ast = expr.get('callable')
+    if scope.evaluator == 'tree':
+        return scope.eval(callable_ast)
+    if not isinstance(callable_ast, ASTIdent):
+        return None
+    name = callable_ast.get('ident')
+    if not isinstance(name, String) or not (last or name.str == 'return'):
+        return None
+    return scope.resolve(name.str, callable_ast)
+
+
 class ReturnException(Exception):
     def __init__(self, obj):
         super().__init__()
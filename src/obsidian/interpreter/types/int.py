@@ -1,15 +1,33 @@
 from ..bootstrap import (
     Object,
+    Value,
     Type,
 )
 
 
-class Int(Object):
+class Int(Value):
+    __slots__ = ('int',)
     T = Type('Int', Object.T)
 
     def __init__(self, val):
-        super().__init__({})
+        super().__init__()
         self.int = val
 
     def __repr__(self):
         return 'Int({})'.format(str(self.int))
+
+
+# the Ints from -5 to 256, made once and handed out by `make_int`
+small_ints = [Int(val) for val in range(-5, 257)]
+
+
+def make_int(val):
+    # an Int for `val`, which for small ones is the same Int every time, like
+    # Python's own, for as long as nothing's been set on it
+    if -5 <= val <= 256:
+        int = small_ints[val + 5]
+        if int.attrs is Value.shared_attrs[Int]:
+            return int
+        int = small_ints[val + 5] = Int(val)
+        return int
+    return Int(val)
@@ -1,14 +1,19 @@
 from ..bootstrap import (
     Object,
+    Value,
     Type,
 )
 
 
-class List(Object):
+class List(Value):
+    __slots__ = ('elems',)
     T = Type('List', Object.T)
+    # set on Lists that are part of an AST, so that changing them in place
+    # invalidates what's been saved from ASTs
+    in_ast = False
 
     def __init__(self, elems):
-        super().__init__({})
+        super().__init__()
         self.elems = elems
 
     def __repr__(self):
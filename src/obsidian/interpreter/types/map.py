@@ -1,15 +1,35 @@
 from ..bootstrap import (
     Object,
+    Value,
     Type,
 )
 
 
-class Map(Object):
+class Map(Value):
+    __slots__ = ('elems',)
     T = Type('Map', Object.T)
 
     def __init__(self, elems):
-        super().__init__({})
+        super().__init__()
         self.elems = elems
 
+    def set_elem(self, key, val):
+        self.elems[key] = val
+
     def __repr__(self):
         return str(self.elems)
+
+
+class Sigils(Map):
+    # a Type's Map of literal constructors by sigil, with a `version` that
+    # goes up whenever one's set, so that literals saved on ASTs can tell
+    # whether the constructor they were made with has changed
+    __slots__ = ('version',)
+
+    def __init__(self, elems):
+        super().__init__(elems)
+        self.version = 0
+
+    def set_elem(self, key, val):
+        super().set_elem(key, val)
+        self.version += 1
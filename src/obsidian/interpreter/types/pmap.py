@@ -0,0 +1,258 @@
+from ..bootstrap import (
+    Object,
+    Value,
+    Type,
+)
+
+# A hash array mapped trie: every node uses 5 more bits of the (64-bit) key
+# hash to pick one of 32 slots, and only keeps the slots in use, in order,
+# along with a bitmap of which ones they are. A slot holds either a key and
+# its value or, with None for a key, the node below it. Keys whose hashes
+# are the same all the way down share a `CollisionNode`.
+#
+# Updates copy the nodes on the path to the key and share everything else.
+# Nodes made while a map is transient are tagged with its `edit` token and
+# are changed in place by later updates to the same map.
+
+SHIFT = 5
+MASK = 31
+HASH_MASK = (1 << 64) - 1
+
+
+def popcount(bits):
+    return bin(bits).count('1')
+
+
+def key_hash(key):
+    return hash(key) & HASH_MASK
+
+
+class BitmapNode:
+    __slots__ = ('bitmap', 'array', 'edit')
+
+    def __init__(self, bitmap, array, edit):
+        self.bitmap = bitmap
+        self.array = array  # key, val, key, val, ...
+        self.edit = edit
+
+    def editable(self, edit):
+        # the node to change for `edit`: this one if it's owned by `edit`,
+        # else a copy that is
+        if edit is not None and self.edit is edit:
+            return self
+        return BitmapNode(self.bitmap, self.array[:], edit)
+
+    def find(self, shift, h, key, default):
+        bit = 1 << ((h >> shift) & MASK)
+        if not self.bitmap & bit:
+            return default
+        i = 2 * popcount(self.bitmap & (bit - 1))
+        k, v = self.array[i], self.array[i + 1]
+        if k is None:
+            return v.find(shift + SHIFT, h, key, default)
+        if key == k:
+            return v
+        return default
+
+    def assoc(self, edit, shift, h, key, val, added):
+        bit = 1 << ((h >> shift) & MASK)
+        i = 2 * popcount(self.bitmap & (bit - 1))
+        if not self.bitmap & bit:
+            added[0] = True
+            node = self.editable(edit)
+            node.array[i:i] = [key, val]
+            node.bitmap |= bit
+            return node
+        k, v = self.array[i], self.array[i + 1]
+        if k is None:
+            child = v.assoc(edit, shift + SHIFT, h, key, val, added)
+            if child is v:
+                return self
+            node = self.editable(edit)
+            node.array[i + 1] = child
+            return node
+        if key == k:
+            if v is val:
+                return self
+            node = self.editable(edit)
+            node.array[i + 1] = val
+            return node
+        added[0] = True
+        node = self.editable(edit)
+        node.array[i] = None
+        node.array[i + 1] = pair_node(edit, shift + SHIFT, key_hash(k), k, v, h, key, val)
+        return node
+
+    def dissoc(self, edit, shift, h, key, removed):
+        # the node without `key`, or None if that leaves it empty
+        bit = 1 << ((h >> shift) & MASK)
+        if not self.bitmap & bit:
+            return self
+        i = 2 * popcount(self.bitmap & (bit - 1))
+        k, v = self.array[i], self.array[i + 1]
+        if k is None:
+            child = v.dissoc(edit, shift + SHIFT, h, key, removed)
+            if child is v:
+                return self
+            if child is not None:
+                node = self.editable(edit)
+                node.array[i + 1] = child
+                return node
+        elif key == k:
+            removed[0] = True
+        else:
+            return self
+        if self.bitmap == bit:
+            return None
+        node = self.editable(edit)
+        del node.array[i:i + 2]
+        node.bitmap ^= bit
+        return node
+
+    def items(self):
+        array = self.array
+        for i in range(0, len(array), 2):
+            if array[i] is None:
+                yield from array[i + 1].items()
+            else:
+                yield array[i], array[i + 1]
+
+
+class CollisionNode:
+    __slots__ = ('hash', 'array', 'edit')
+
+    def __init__(self, h, array, edit):
+        self.hash = h
+        self.array = array
+        self.edit = edit
+
+    def editable(self, edit):
+        if edit is not None and self.edit is edit:
+            return self
+        return CollisionNode(self.hash, self.array[:], edit)
+
+    def index(self, key):
+        for i in range(0, len(self.array), 2):
+            if key == self.array[i]:
+                return i
+        return -1
+
+    def find(self, shift, h, key, default):
+        if h != self.hash:
+            return default
+        i = self.index(key)
+        return default if i < 0 else self.array[i + 1]
+
+    def assoc(self, edit, shift, h, key, val, added):
+        if h != self.hash:
+            node = BitmapNode(1 << ((self.hash >> shift) & MASK), [None, self], edit)
+            return node.assoc(edit, shift, h, key, val, added)
+        i = self.index(key)
+        if i >= 0:
+            if self.array[i + 1] is val:
+                return self
+            node = self.editable(edit)
+            node.array[i + 1] = val
+            return node
+        added[0] = True
+        node = self.editable(edit)
+        node.array += [key, val]
+        return node
+
+    def dissoc(self, edit, shift, h, key, removed):
+        i = self.index(key) if h == self.hash else -1
+        if i < 0:
+            return self
+        removed[0] = True
+        if len(self.array) == 2:
+            return None
+        node = self.editable(edit)
+        del node.array[i:i + 2]
+        return node
+
+    def items(self):
+        array = self.array
+        for i in range(0, len(array), 2):
+            yield array[i], array[i + 1]
+
+
+def pair_node(edit, shift, h1, k1, v1, h2, k2, v2):
+    # a node holding two different keys
+    if h1 == h2:
+        return CollisionNode(h1, [k1, v1, k2, v2], edit)
+    i1 = (h1 >> shift) & MASK
+    i2 = (h2 >> shift) & MASK
+    if i1 == i2:
+        return BitmapNode(1 << i1, [None, pair_node(edit, shift + SHIFT, h1, k1, v1, h2, k2, v2)], edit)
+    if i1 < i2:
+        return BitmapNode((1 << i1) | (1 << i2), [k1, v1, k2, v2], edit)
+    return BitmapNode((1 << i1) | (1 << i2), [k2, v2, k1, v1], edit)
+
+
+empty_node = BitmapNode(0, [], None)
+
+
+class PMap(Value):
+    # a persistent Map: `assoc` and `dissoc` leave the map as it was and
+    # return an updated one, unless it's transient (`edit` isn't None), when
+    # they update it in place
+    __slots__ = ('root', 'len', 'edit')
+    T = Type('PMap', Object.T)
+
+    def __init__(self, root=empty_node, length=0, edit=None):
+        super().__init__()
+        self.root = root
+        self.len = length
+        self.edit = edit
+
+    def find(self, key, default=None):
+        return self.root.find(0, key_hash(key), key, default)
+
+    def assoc(self, key, val):
+        added = [False]
+        root = self.root.assoc(self.edit, 0, key_hash(key), key, val, added)
+        if self.edit is not None:
+            self.root = root
+            self.len += added[0]
+            return self
+        if root is self.root:
+            return self
+        return PMap(root, self.len + added[0])
+
+    def dissoc(self, key):
+        removed = [False]
+        root = self.root.dissoc(self.edit, 0, key_hash(key), key, removed)
+        if root is None:
+            root = empty_node
+        if self.edit is not None:
+            self.root = root
+            self.len -= removed[0]
+            return self
+        if not removed[0]:
+            return self
+        return PMap(root, self.len - 1)
+
+    def transient(self):
+        # a copy that can be updated in place, sharing the nodes of this one
+        # until they change
+        return PMap(self.root, self.len, object())
+
+    def persistent(self):
+        # stops updating the map in place, returning it
+        self.edit = None
+        return self
+
+    def snapshot(self):
+        # a persistent map of the entries this one has now; a transient map
+        # takes a new `edit` token, so that it copies the nodes it shares
+        # with the snapshot rather than changing them
+        if self.edit is None:
+            return self
+        self.edit = object()
+        return PMap(self.root, self.len)
+
+    def items(self):
+        return self.root.items()
+
+    def __repr__(self):
+        return 'PMap({})'.format(dict(self.items()))
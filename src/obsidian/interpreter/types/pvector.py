@@ -0,0 +1,195 @@
+from ..bootstrap import (
+    Object,
+    Value,
+    Type,
+)
+
+# A 32-way trie of the elements, keyed by the bits of their index, 5 at a
+# time, with the last (up to 32) elements kept out of the trie in a `tail`
+# so that appending is usually just a copy of the tail. The trie is `shift`
+# bits deep, and its leaves are always full.
+#
+# As with `PMap`, updates copy only the path to the element they change,
+# and nodes tagged with a transient vector's `edit` token are changed in
+# place.
+
+SHIFT = 5
+MASK = 31
+WIDTH = 32
+
+
+class VectorNode:
+    __slots__ = ('array', 'edit')
+
+    def __init__(self, array, edit):
+        self.array = array
+        self.edit = edit
+
+    def editable(self, edit):
+        if edit is not None and self.edit is edit:
+            return self
+        return VectorNode(self.array[:], edit)
+
+
+empty_node = VectorNode([], None)
+
+
+def new_path(edit, level, node):
+    # `node` at the bottom of a branch `level` bits deep
+    while level > 0:
+        node = VectorNode([node], edit)
+        level -= SHIFT
+    return node
+
+
+class PVector(Value):
+    # a persistent List: `assoc`, `append` and `pop` return an updated
+    # vector, or update it in place while it's transient
+    __slots__ = ('len', 'shift', 'root', 'tail', 'edit')
+    T = Type('PVector', Object.T)
+
+    def __init__(self, length=0, shift=SHIFT, root=empty_node, tail=None, edit=None):
+        super().__init__()
+        self.len = length
+        self.shift = shift
+        self.root = root
+        self.tail = [] if tail is None else tail
+        self.edit = edit
+
+    @classmethod
+    def from_list(cls, elems):
+        vec = cls().transient()
+        for elem in elems:
+            vec.append(elem)
+        return vec.persistent()
+
+    def tail_offset(self):
+        return 0 if self.len < WIDTH else ((self.len - 1) >> SHIFT) << SHIFT
+
+    def leaf(self, i):
+        # the array holding element `i`
+        if i >= self.tail_offset():
+            return self.tail
+        node = self.root
+        for level in range(self.shift, 0, -SHIFT):
+            node = node.array[(i >> level) & MASK]
+        return node.array
+
+    def nth(self, i):
+        return self.leaf(i)[i & MASK]
+
+    def updated(self, length, shift, root, tail):
+        if self.edit is None:
+            return PVector(length, shift, root, tail)
+        self.len, self.shift, self.root, self.tail = length, shift, root, tail
+        return self
+
+    def assoc(self, i, val):
+        # sets element `i`, where `i` can be the length, to append
+        if i == self.len:
+            return self.append(val)
+        if i >= self.tail_offset():
+            tail = self.tail if self.edit is not None else self.tail[:]
+            tail[i & MASK] = val
+            return self.updated(self.len, self.shift, self.root, tail)
+        root = self.root.editable(self.edit)
+        node = root
+        for level in range(self.shift, 0, -SHIFT):
+            sub = (i >> level) & MASK
+            node.array[sub] = node.array[sub].editable(self.edit)
+            node = node.array[sub]
+        node.array[i & MASK] = val
+        return self.updated(self.len, self.shift, root, self.tail)
+
+    def append(self, val):
+        if self.len - self.tail_offset() < WIDTH:
+            tail = self.tail if self.edit is not None else self.tail[:]
+            tail.append(val)
+            return self.updated(self.len + 1, self.shift, self.root, tail)
+        # the tail is full, so it goes into the trie
+        tail_node = VectorNode(self.tail, self.edit)
+        shift = self.shift
+        if (self.len >> SHIFT) > (1 << self.shift):
+            root = VectorNode([self.root, new_path(self.edit, self.shift, tail_node)], self.edit)
+            shift += SHIFT
+        else:
+            root = self.push_tail(self.shift, self.root, tail_node)
+        return self.updated(self.len + 1, shift, root, [val])
+
+    def push_tail(self, level, parent, tail_node):
+        sub = ((self.len - 1) >> level) & MASK
+        node = parent.editable(self.edit)
+        if level == SHIFT:
+            child = tail_node
+        elif sub < len(parent.array):
+            child = self.push_tail(level - SHIFT, parent.array[sub], tail_node)
+        else:
+            child = new_path(self.edit, level - SHIFT, tail_node)
+        if sub < len(node.array):
+            node.array[sub] = child
+        else:
+            node.array.append(child)
+        return node
+
+    def pop(self):
+        # drops the last element, which there has to be
+        if self.len == 1:
+            return self.updated(0, SHIFT, empty_node, [])
+        if self.len - self.tail_offset() > 1:
+            tail = self.tail if self.edit is not None else self.tail[:]
+            tail.pop()
+            return self.updated(self.len - 1, self.shift, self.root, tail)
+        # the tail is emptied, so the last leaf of the trie becomes the tail
+        tail = self.leaf(self.len - 2)[:]
+        root = self.pop_tail(self.shift, self.root)
+        shift = self.shift
+        if root is None:
+            root = empty_node
+        if shift > SHIFT and len(root.array) == 1:
+            root = root.array[0]
+            shift -= SHIFT
+        return self.updated(self.len - 1, shift, root, tail)
+
+    def pop_tail(self, level, node):
+        # `node` without its last leaf, or None if that leaves it empty
+        sub = ((self.len - 2) >> level) & MASK
+        if level > SHIFT:
+            child = self.pop_tail(level - SHIFT, node.array[sub])
+            if child is None and sub == 0:
+                return None
+            node = node.editable(self.edit)
+            if child is None:
+                del node.array[sub:]
+            else:
+                node.array[sub] = child
+            return node
+        if sub == 0:
+            return None
+        node = node.editable(self.edit)
+        del node.array[sub:]
+        return node
+
+    def transient(self):
+        # a copy that can be updated in place; the tail is copied since it
+        # isn't tagged
+        return PVector(self.len, self.shift, self.root, self.tail[:], object())
+
+    def persistent(self):
+        self.edit = None
+        return self
+
+    def snapshot(self):
+        # a persistent vector of the elements this one has now; as with
+        # `PMap.snapshot`, a transient vector takes a new `edit` token, and
+        # the tail, which isn't tagged, is copied
+        if self.edit is None:
+            return self
+        self.edit = object()
+        return PVector(self.len, self.shift, self.root, self.tail[:])
+
+    def __iter__(self):
+        for start in range(0, self.len, WIDTH):
+            yield from self.leaf(start)
+
+    def __repr__(self):
+        return 'PVector({})'.format(list(self))
@@ -1,9 +1,11 @@
 from ..bootstrap import (
     Type,
     Object,
+    AttrTable,
     PrimFun,
     Panic,
     String,
+    Value,
     nil,
     type_name,
 )
@@ -31,11 +33,19 @@ from .symbol import Symbol
 from .bool import Bool
 
 
+leaf_nodes = (ASTIdent, ASTString, ASTInt, ASTFloat, ASTSymbol)
+
+
 class Scope(Object):
     T = Type('Scope', Object.T)
+    # bumped whenever an AST is changed, dropping everything saved on ASTs
+    # to speed up evaluating them
+    ast_generation = 0
 
     def __init__(self, parent=None):
         super().__init__({})
+        # child scopes evaluate the same way as their parents
+        self.evaluator = parent.evaluator if isinstance(parent, Scope) else 'tree'
         self.get('meta').set('eval', Eval(self))
         self.get('meta').set('scope', self)
         self.get('meta').set('parent', parent if parent is not None else nil)
@@ -86,7 +96,7 @@ class Scope(Object):
                     'Invalid associativity {}'.format(associativity))
         return pos, lhs
 
-    def parse_binary_slurp(self, slurp):
+    def parse_binary_slurp(self, slurp, deps=None):
         slurp = list(slurp)  # copy
         for i in range(1, len(slurp), 2):
             raw_op = slurp[i]
@@ -112,50 +122,76 @@ class Scope(Object):
                 if not associativity in ['left', 'none', 'right']:
                     raise Panic(
                         'Associativity must be either @left, @none, or @right')
+            if deps is not None:
+                deps.append((raw_op.get('ident').str, op,
+                             op.attrs.get('precedence'), op.attrs.get('associativity')))
             slurp[i] = (op, raw_op, precedence, associativity)
         pos, expr = self.parse_binary_subexpr(slurp, slurp[0])
         # print('Binary slurp:')
         # print(expr)
         return expr
 
-    def preprocess(self, ast):
+    def preprocess(self, ast, deps=None):
+        # `deps` collects the (name, op, precedence, associativity) of every
+        # operator the result depends on, or `None` if it can't be reused
         if isinstance(ast, ASTCall):
-            return ASTCall(self.preprocess(ast.get('callable')),
-                           List([self.preprocess(arg)
+            return ASTCall(self.preprocess(ast.get('callable'), deps),
+                           List([self.preprocess(arg, deps)
                                  for arg in ast.args_list()]),
                            parseinfo=ast.parseinfo)
         elif isinstance(ast, ASTList):
-            return ASTList(List([self.preprocess(elem) for elem in ast.elems_list()]),
+            return ASTList(List([self.preprocess(elem, deps) for elem in ast.elems_list()]),
                            parseinfo=ast.parseinfo)
         elif isinstance(ast, ASTTuple):
-            return ASTTuple(Tuple([self.preprocess(elem) for elem in ast.elems_list()]),
+            return ASTTuple(Tuple([self.preprocess(elem, deps) for elem in ast.elems_list()]),
                             parseinfo=ast.parseinfo)
         elif isinstance(ast, ASTMap):
-            return ASTMap(List([self.preprocess(elem) for elem in ast.elems_list()]),
+            return ASTMap(List([self.preprocess(elem, deps) for elem in ast.elems_list()]),
                           parseinfo=ast.parseinfo)
         elif isinstance(ast, ASTBlock):
-            return ASTBlock(List([self.preprocess(elem) for elem in ast.statements_list()]),
+            return ASTBlock(List([self.preprocess(elem, deps) for elem in ast.statements_list()]),
                             parseinfo=ast.parseinfo)
         elif isinstance(ast, ASTInterpolatedString):
-            return ASTInterpolatedString(List([self.preprocess(body) for body in ast.body_list()]))
-        elif isinstance(ast, (ASTIdent,
-                              ASTString,
-                              ASTInt,
-                              ASTFloat,
-                              ASTSymbol)):
-            # leaf nodes
+            return ASTInterpolatedString(List([self.preprocess(body, deps) for body in ast.body_list()]))
+        elif isinstance(ast, leaf_nodes):
             return ast
         elif isinstance(ast, ASTBinarySlurp):
             slurp = ast.get('slurp')
             if not isinstance(slurp, List):
                 raise Panic('Invalid binary slurp {}'.format(slurp))
-            return self.parse_binary_slurp(slurp.elems)
+            return self.parse_binary_slurp(slurp.elems, deps)
         elif isinstance(ast, ASTUnquote):
+            if deps is not None:
+                deps.append(None)  # evaluated on every preprocess
             return self.eval(self.preprocess(ast.get('expr')))
         else:
             raise NotImplementedError(
                 'Evaluation of node {} not implemented'.format(ast))
 
+    def preprocessed(self, ast):
+        # `preprocess`, reusing the result saved on `ast` the last time it was
+        # preprocessed for as long as its operators resolve to the same
+        # objects with the same precedence and associativity attrs, and no
+        # AST has been changed by `set_attr`
+        cached = getattr(ast, 'preprocessed', None)
+        if cached is not None and cached[0] == Scope.ast_generation:
+            for name, op, precedence, associativity in cached[1]:
+                try:
+                    if self.get_recursive(name) is not op:
+                        break
+                except Panic:
+                    break
+                if (op.attrs.get('precedence') is not precedence or
+                        op.attrs.get('associativity') is not associativity):
+                    break
+            else:
+                return cached[2]
+        deps = []
+        res = self.preprocess(ast, deps)
+        if None not in deps:
+            ast.preprocessed = (Scope.ast_generation, deps, res)
+        return res
+
     def get_recursive(self, name):
         if name in self.attrs:
             return self.get(name)
@@ -163,6 +199,40 @@ class Scope(Object):
             return self.get('meta').get('parent').get_recursive(name)
         raise Panic('No such object `{}`'.format(name))
 
+    def resolve(self, name, ast):
+        # `get_recursive` for the ASTIdent `ast`, saving how many parents up
+        # the name was found on it. Later lookups, from this scope or from
+        # others like it (such as those of calls to the same Fun), go
+        # straight up through the parents to at most that depth, without the
+        # checks and method calls of the full walk
+        attrs = self.attrs
+        if name in attrs:
+            return attrs[name]
+        saved = getattr(ast, 'resolved', None)
+        if saved is not None and saved[0] == name:
+            scope = self
+            for _ in range(saved[1]):
+                # anything unusual, like a missing meta or parent, is left
+                # to the full walk to report
+                meta = scope.attrs.get('meta')
+                scope = None if meta is None else meta.attrs.get('parent')
+                if not isinstance(scope, Scope):
+                    break
+                if name in scope.attrs:
+                    return scope.attrs[name]
+        scope = self
+        depth = 0
+        while name not in scope.attrs:
+            parent = scope.get('meta').get('parent')
+            if parent is nil:
+                raise Panic('No such object `{}`'.format(name))
+            if not isinstance(parent, Scope):
+                return parent.get_recursive(name)
+            scope = parent
+            depth += 1
+        ast.resolved = (name, depth)
+        return scope.attrs[name]
+
     def assign_recursive(self, name, val):
         if name in self.attrs:
             return self.set(name, val)
@@ -171,8 +241,36 @@ class Scope(Object):
         raise Panic('No such object `{}`'.format(name))
 
     def eval(self, ast):
-        ast = self.preprocess(ast)
-        return self._eval(ast)
+        if isinstance(ast, leaf_nodes):
+            # often made up on the spot, as with `MethodFun`, so not worth
+            # compiling
+            return self._eval(ast)
+        ast = self.preprocessed(ast)
+        if self.evaluator == 'tree':
+            return self._eval(ast)
+        return evaluators[self.evaluator](self, ast)
+
+    def eval_preprocessed(self, ast):
+        # `eval` for an AST that's already been through `preprocessed`
+        if self.evaluator == 'tree':
+            return self._eval(ast)
+        return evaluators[self.evaluator](self, ast)
+
+    def literal(self, ast, obj_type):
+        # the value of a literal, reusing the one its constructor saved with
+        # `save_literal` for as long as it still shares its type's attrs and
+        # meta (so nothing's been set on it and its meta hasn't been handed
+        # out), and the type's constructor and the sigils table it used are
+        # unchanged
+        saved = getattr(ast, 'value', None)
+        if saved is not None and saved[0] == Scope.ast_generation:
+            _, value, constructor, sigils, version = saved
+            attrs = obj_type.T.attrs
+            if (value.attrs is Value.shared_attrs.get(type(value)) and
+                    attrs.get('call') is constructor and
+                    (sigils is None or attrs.get('sigils') is sigils and sigils.version == version)):
+                return value
+        return obj_type.T.call(self, [ast])
 
     def name_string(self):
         name = self.get('meta').get('name')
@@ -185,20 +283,20 @@ class Scope(Object):
             return self._eval(ast.get('callable')).call(self, ast.get('args').elems)
         elif isinstance(ast, ASTIdent):
             ast.validate()
-            return self.get_recursive(ast.get('ident').str)
+            return self.resolve(ast.get('ident').str, ast)
         elif isinstance(ast, ASTString):
-            return String.T.call(self, [ast])
+            return self.literal(ast, String)
         elif isinstance(ast, ASTInterpolatedString):
             ast.validate()
-            strings = [get_attr.fun(self._eval(elem), String('to_str')).call(self)
+            strings = [call_method(self, self._eval(elem), 'to_str', [])
                        for elem in ast.body_list()]
             return String(''.join(s.str for s in strings))
         elif isinstance(ast, ASTInt):
-            return Int.T.call(self, [ast])
+            return self.literal(ast, Int)
         elif isinstance(ast, ASTFloat):
-            return Float.T.call(self, [ast])
+            return self.literal(ast, Float)
         elif isinstance(ast, ASTSymbol):
-            return Symbol.T.call(self, [ast])
+            return self.literal(ast, Symbol)
         elif isinstance(ast, ASTList):
             return List.T.call(self, [ast])
         elif isinstance(ast, ASTBlock):
@@ -216,19 +314,175 @@ class Scope(Object):
         return 'Scope({})'.format({k: v for k, v in self.attrs.items() if k != 'meta'})
 
 
+def save_literal(ast, value, sigils=None):
+    # for constructors of literals whose value depends on nothing but `ast`
+    # and the constructors themselves, so that `Scope.literal` can reuse it;
+    # `sigils` is the `Sigils` the constructor was looked up in, if any
+    version = None if sigils is None else sigils.version
+    ast.value = (Scope.ast_generation, value, value.T.attrs.get('call'), sigils, version)
+    return value
+
+
+def compile_ast(ast):
+    # the closure evaluating a preprocessed `ast` in the scope it's called
+    # with, as `Scope._eval` would; saved on `ast` until an AST changes
+    compiled = getattr(ast, 'compiled', None)
+    if compiled is not None and compiled[0] == Scope.ast_generation:
+        return compiled[1]
+    try:
+        fun = compile_node(ast)
+    except (Panic, NotImplementedError):
+        # fail when evaluated, like `_eval` does
+        def fun(scope):
+            return scope._eval(ast)
+    try:
+        ast.compiled = (Scope.ast_generation, fun)
+    except AttributeError:
+        pass  # not an AST at all, so `_eval` raises anyway
+    return fun
+
+
+def compile_node(ast):
+    if isinstance(ast, ASTCall):
+        callable_fun = compile_ast(ast.get('callable'))
+        args = ast.get('args').elems
+        # args are passed along unevaluated, for macros
+
+        def call(scope):
+            return callable_fun(scope).call(scope, args)
+        return call
+    elif isinstance(ast, ASTIdent):
+        ast.validate()
+        name = ast.get('ident').str
+
+        def ident(scope):
+            return scope.resolve(name, ast)
+        return ident
+    elif isinstance(ast, ASTInterpolatedString):
+        ast.validate()
+        elem_funs = [compile_ast(elem) for elem in ast.body_list()]
+
+        def interpolated_string(scope):
+            strings = [call_method(scope, elem_fun(scope), 'to_str', [])
+                       for elem_fun in elem_funs]
+            return String(''.join(s.str for s in strings))
+        return interpolated_string
+    elif isinstance(ast, ASTBlock):
+        ast.validate()
+        statement_funs = [compile_ast(statement) for statement in ast.statements_list()]
+
+        def block(scope):
+            return List([statement_fun(scope) for statement_fun in statement_funs])
+        return block
+    for ast_type, obj_type in literal_types:
+        if isinstance(ast, ast_type):
+            def literal(scope):
+                return scope.literal(ast, obj_type)
+            return literal
+    raise NotImplementedError(
+        'Evaluation of node {} not implemented'.format(ast))
+
+
+# literal ASTs and the types they're passed to when evaluated
+literal_types = [
+    (ASTString, String),
+    (ASTInt, Int),
+    (ASTFloat, Float),
+    (ASTSymbol, Symbol),
+    (ASTList, List),
+    (ASTTuple, Tuple),
+    (ASTMap, Map),
+]
+
+
+# how a scope evaluates preprocessed ASTs, by name: walking them in `_eval`,
+# or running the closures `compile_ast` turns them into; experimental ones,
+# like the VM in `vm.py`, add themselves here when they're imported
+evaluators = {
+    'tree': lambda scope, ast: scope._eval(ast),
+    'closure': lambda scope, ast: compile_ast(ast)(scope),
+}
+
+
 class MethodFun(PrimFun):
     def __init__(self, obj, method):
         super().__init__('method_fun', variadic=True)
         self.obj = obj
         self.method = method
+        # whether it's still as `bound_method` made it, with nothing set on
+        # it and its meta not handed out, so that it can be handed out again
+        self.pristine = True
+
+    def own_meta(self):
+        self.pristine = False
+        return self.get('meta')
+
+    def set(self, name, obj):
+        self.pristine = False
+        super().set(name, obj)
 
     def macro(self, scope, *args):
-        scope.set('__self__', self.obj)
-        res = self.method.call(
-            scope, [ASTIdent(String('__self__'))] + list(args))
-        if '__self__' in scope.attrs:
-            del scope.attrs['__self__']
-        return res
+        if isinstance(self.method, PrimFun) and self.method.takes_receiver():
+            return self.method.call_method(scope, self.obj, list(args))
+        # anything else gets the receiver as an ASTIdent, bound in the
+        # caller's scope under a name no method call in progress is using
+        name = '__self__'
+        n = 0
+        while name in scope.attrs:
+            n += 1
+            name = '__self{}__'.format(n)
+        scope.set(name, self.obj)
+        try:
+            return self.method.call(scope, [ASTIdent(String(name))] + list(args))
+        finally:
+            scope.attrs.pop(name, None)
+
+
+def find_type_attr(obj_type, name):
+    # the ('method', fun) or ('static', obj) `name` is on `obj_type` or its
+    # parents, or None, and whether every Type looked in keeps its methods
+    # and statics in `AttrTable`s, so that changes to them are noticed
+    saveable = True
+    types = [obj_type]
+    seen_types = set()
+    while id(obj_type.get('parent')) not in seen_types:  # while not looping
+        obj_type = obj_type.get('parent')
+        seen_types.add(id(obj_type))
+        types.append(obj_type)
+    for obj_type in types:
+        methods = obj_type.get('methods')
+        statics = obj_type.get('statics')
+        if not isinstance(methods, AttrTable) or not isinstance(statics, AttrTable):
+            saveable = False
+        if methods.has(name):
+            return ('method', methods.get(name)), saveable
+        if statics.has(name):
+            return ('static', statics.get(name)), saveable
+    return None, saveable
+
+
+def type_attr(obj_type, name):
+    # `find_type_attr`, saved in a table on `obj_type` until an `AttrTable`
+    # changes or a Type's methods, statics or parent are set
+    table = getattr(obj_type, 'attr_table', None)
+    if table is None or table[0] != AttrTable.generation:
+        table = obj_type.attr_table = (AttrTable.generation, {})
+    if name in table[1]:
+        return table[1][name]
+    found, saveable = find_type_attr(obj_type, name)
+    if saveable:
+        table[1][name] = found
+    return found
+
+
+def bound_method(obj, method):
+    # the `MethodFun` of `method` for `obj`; the last one made is kept on
+    # `method` rather than on the receiver, and reused for the same receiver
+    # for as long as it's pristine
+    fun = getattr(method, 'bound', None)
+    if fun is None or fun.obj is not obj or not fun.pristine:
+        fun = method.bound = MethodFun(obj, method)
+    return fun
 
 
 class GetAttr(PrimFun):
@@ -238,34 +492,36 @@ class GetAttr(PrimFun):
     def fun(self, obj, attr):
         self.typecheck_arg(attr, String)
         if not obj.has(attr.str):
-            obj_type = obj.get('meta').get('type')
-            if obj_type.get('methods').has(attr.str):
-                return MethodFun(obj, obj_type.get('methods').get(attr.str))
-            if obj_type.get('statics').has(attr.str):
-                return obj_type.get('statics').get(attr.str)
-            seen_types = set()
-            while id(obj_type.get('parent')) not in seen_types:  # while not looping
-                obj_type = obj_type.get('parent')
-                seen_types.add(id(obj_type))
-                if obj_type.get('methods').has(attr.str):
-                    return MethodFun(obj, obj_type.get('methods').get(attr.str))
-                if obj_type.get('statics').has(attr.str):
-                    return obj_type.get('statics').get(attr.str)
-            raise Panic('{} `{}` has no attribute `{}`'.format(
-                type_name(obj), to_str(Scope(), obj), attr.str))
+            found = type_attr(obj.get('meta').get('type'), attr.str)
+            if found is None:
+                raise Panic('{} `{}` has no attribute `{}`'.format(
+                    type_name(obj), to_str(Scope(), obj), attr.str))
+            kind, val = found
+            if kind == 'method':
+                return bound_method(obj, val)
+            return val
+        if attr.str == 'meta' and isinstance(obj, (Value, MethodFun)):
+            # which might be changed from here on
+            return obj.own_meta()
         return obj.get(attr.str)
 
 
 def call_method(scope, obj, name, args):
+    if name not in obj.attrs:
+        found = type_attr(obj.get('meta').get('type'), name)
+        if found is not None and found[0] == 'method' and \
+                isinstance(found[1], PrimFun) and found[1].takes_receiver():
+            # skipping the `MethodFun`
+            return found[1].call_method(scope, obj, args)
     return get_attr.fun(obj, String(name)).call(scope, args)
 
 
 def to_str(scope, obj, panic=True):
     if panic:
-        string = get_attr.fun(obj, String('to_str')).call(scope)
+        string = call_method(scope, obj, 'to_str', [])
     else:
         try:
-            string = get_attr.fun(obj, String('to_str')).call(scope)
+            string = call_method(scope, obj, 'to_str', [])
         except Panic as p:
             return "[`{}`'s `to_str` failed with message '{}']".format(type_name(obj), p.msg)
     if not isinstance(string, String):
@@ -281,18 +537,27 @@ def to_str(scope, obj, panic=True):
 
 
 def hash_obj(scope, obj):
-    code = get_attr.fun(obj, String('hash')).call(scope)
+    code = call_method(scope, obj, 'hash', [])
     if not isinstance(code, Int):
         raise Panic(
             '`hash` for `{}` must return an `Int`'.format(type_name(obj)))
     return code.int
 
 
-def obj_eq(parent_scope, obj, other):
-    scope = Scope(parent_scope)
-    scope.set('__other__', other.key)
-    code = get_attr.fun(obj, String('eq')).call(
-        scope, [ASTIdent(String('__other__'))])
+def obj_eq(scope, obj, other):
+    # `other` is passed to `eq` as an ASTIdent bound in `scope` for the call,
+    # under a name no comparison in progress is using, as `MethodFun` does
+    # with receivers, rather than in a new scope for every comparison
+    name = '__other__'
+    n = 0
+    while name in scope.attrs:
+        n += 1
+        name = '__other{}__'.format(n)
+    scope.set(name, other)
+    try:
+        code = call_method(scope, obj, 'eq', [ASTIdent(String(name))])
+    finally:
+        scope.attrs.pop(name, None)
     if not isinstance(code, Bool):
         raise Panic(
             '`eq` for `{}` must return a `Bool`'.format(type_name(obj)))
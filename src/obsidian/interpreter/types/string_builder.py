@@ -0,0 +1,26 @@
+from ..bootstrap import (
+    Object,
+    Type,
+)
+
+
+class StringBuilder(Object):
+    T = Type('StringBuilder', Object.T)
+
+    def __init__(self):
+        super().__init__({})
+        # the strs appended so far, joined only when the String is asked for
+        self.parts = []
+        self.len = 0
+
+    def append(self, string):
+        self.parts.append(string)
+        self.len += len(string)
+
+    def build(self):
+        if len(self.parts) != 1:
+            self.parts = [''.join(self.parts)]
+        return self.parts[0]
+
+    def __repr__(self):
+        return 'StringBuilder({!r})'.format(''.join(self.parts))
@@ -1,15 +1,46 @@
+import sys
+
 from ..bootstrap import (
     Object,
+    Value,
     Type,
 )
 
 
-class Symbol(Object):
+class Symbol(Value):
+    __slots__ = ('symbol',)
     T = Type('Symbol', Object.T)
+    # the Symbol for each name made so far, handed out again by `__new__`
+    # for as long as nothing's been set on it, like `make_int`'s Ints
+    symbols = {}
+
+    def __new__(cls, symbol):
+        obj = cls.symbols.get(symbol)
+        if obj is None:
+            obj = cls.symbols[symbol] = super().__new__(cls)
+            Value.__init__(obj)
+            obj.symbol = sys.intern(symbol)
+        return obj
+
+    # all done in `__new__`
+    __init__ = object.__init__
+
+    def uninterned(self):
+        # about to get attrs of its own, so Symbols made from here on with
+        # this name have to be new ones
+        if Symbol.symbols.get(self.symbol) is self:
+            del Symbol.symbols[self.symbol]
+
+    def own_meta(self):
+        self.uninterned()
+        return super().own_meta()
+
+    def set(self, name, obj):
+        self.uninterned()
+        super().set(name, obj)
 
-    def __init__(self, symbol):
-        super().__init__({})
-        self.symbol = symbol
+    def __reduce__(self):
+        return Symbol, (self.symbol,)
 
     def __repr__(self):
         return '@{}'.format(self.symbol)
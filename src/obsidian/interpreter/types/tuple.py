@@ -1,14 +1,16 @@
 from ..bootstrap import (
     Object,
+    Value,
     Type,
 )
 
 
-class Tuple(Object):
+class Tuple(Value):
+    __slots__ = ('elems',)
     T = Type('Tuple', Object.T)
 
     def __init__(self, elems):
-        super().__init__({})
+        super().__init__()
         self.elems = tuple(elems)
 
     def __repr__(self):
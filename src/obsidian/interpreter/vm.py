@@ -0,0 +1,313 @@
+from .types import (
+    Bool,
+    List,
+    Tuple,
+    String,
+    Panic,
+    nil,
+    type_name,
+)
+from .types.scope import Scope, evaluators, call_method, literal_types
+from .types.ast import (
+    ASTIdent,
+    ASTInterpolatedString,
+    ASTTuple,
+    ASTCall,
+    ASTBlock,
+    ASTBinarySlurp,
+    ASTUnquote,
+    ast_nodes,
+)
+from .funs import cond, while_fn, do
+
+# A stack-based bytecode for preprocessed ASTs. Code is a flat list of
+# (opcode, arg) pairs, where `arg` is usually an index into the code's
+# constants; `run` executes it in a scope and returns the value left on the
+# stack.
+#
+# Calls pass their arg ASTs along unevaluated, as with `Scope._eval`, so
+# macros work as usual. Calls to `prim.cond`, `prim.while` and `prim.do` are
+# compiled twice: once inline, with jumps instead of macro calls, and once as
+# a plain call, with a `GUARD` checking which to run once the callable has
+# been evaluated.
+#
+# The VM is experimental, and is only registered as the 'bytecode' evaluator
+# once this module is imported. It's a little faster than the tree walker on
+# loops at the top level, but slower on code that's mostly calls to Funs,
+# where each small expr a macro evaluates is run on its own and the setup of
+# `run` costs more than walking the tree would.
+
+LOAD_NAME = 0         # push the value of the (name, ASTIdent) `consts[arg]`
+LITERAL = 1           # push `scope.literal(ast, obj_type)` for `consts[arg]`
+CALL = 2              # call the popped callable with the arg ASTs `consts[arg]`
+EVAL = 3              # push `scope.eval(consts[arg])`
+EVAL_TREE = 4         # push `scope._eval(consts[arg])`
+POP = 5
+PUSH_NIL = 6
+TO_STR = 7            # replace the top of the stack with its `to_str`
+BUILD_STRING = 8      # join the top `arg` Strings
+BUILD_LIST = 9        # make a List of the top `arg` values
+JUMP = 10             # jump to `arg`
+GUARD = 11            # if the callable on top isn't the PrimFun `consts[arg][0]`,
+                      # jump to `consts[arg][1]`, else pop it and enter the PrimFun
+EXIT_PRIM = 12        # leave the innermost inlined PrimFun
+WHILE_TEST = 13       # pop a `prim.while` condition, jumping to `arg` if false
+COND_TEST = 14        # pop a `prim.cond` condition, jumping to `arg` if false
+RETURN = 15
+
+opnames = ['LOAD_NAME', 'LITERAL', 'CALL', 'EVAL', 'EVAL_TREE', 'POP', 'PUSH_NIL', 'TO_STR',
+           'BUILD_STRING', 'BUILD_LIST', 'JUMP', 'GUARD', 'EXIT_PRIM', 'WHILE_TEST',
+           'COND_TEST', 'RETURN']
+
+
+class Code:
+    def __init__(self, ops, consts):
+        self.ops = ops
+        self.consts = consts
+
+    def __repr__(self):
+        return 'Code({})'.format(', '.join(
+            '{} {}'.format(opnames[self.ops[i]], self.ops[i + 1])
+            for i in range(0, len(self.ops), 2)))
+
+
+def reevaluated(ast):
+    # whether `scope.eval` would change `ast` before evaluating it, which
+    # `_eval` on its own wouldn't
+    if isinstance(ast, (ASTBinarySlurp, ASTUnquote)) or not isinstance(ast, ast_nodes):
+        return True
+    for attr, val in ast.attrs.items():
+        if attr != 'meta' and isinstance(val, (List, Tuple)) and any(
+                reevaluated(elem) for elem in val.elems):
+            return True
+        if attr in ['callable', 'expr'] and reevaluated(val):
+            return True
+    return False
+
+
+class Compiler:
+    def __init__(self):
+        self.ops = []
+        self.consts = []
+
+    def emit(self, op, arg=0):
+        self.ops += [op, arg]
+        return len(self.ops) - 1  # where to patch `arg`
+
+    def const(self, obj):
+        self.consts.append(obj)
+        return len(self.consts) - 1
+
+    def here(self):
+        return len(self.ops)
+
+    def patch(self, at, target):
+        self.ops[at] = target
+
+    def compile(self, ast):
+        self.node(ast)
+        self.emit(RETURN)
+        return Code(self.ops, self.consts)
+
+    def evaluated(self, ast):
+        # code for `scope.eval(ast)`
+        if reevaluated(ast):
+            self.emit(EVAL, self.const(ast))
+        else:
+            self.node(ast)
+
+    def node(self, ast):
+        # code for `scope._eval(ast)`
+        start = self.here()
+        try:
+            self.compile_node(ast)
+        except (Panic, NotImplementedError):
+            # fail when evaluated, like `_eval` does
+            del self.ops[start:]
+            self.emit(EVAL_TREE, self.const(ast))
+
+    def compile_node(self, ast):
+        if isinstance(ast, ASTCall):
+            self.call(ast)
+        elif isinstance(ast, ASTIdent):
+            ast.validate()
+            self.emit(LOAD_NAME, self.const((ast.get('ident').str, ast)))
+        elif isinstance(ast, ASTInterpolatedString):
+            ast.validate()
+            body = ast.body_list()
+            for elem in body:
+                self.node(elem)
+                self.emit(TO_STR)
+            self.emit(BUILD_STRING, len(body))
+        elif isinstance(ast, ASTBlock):
+            ast.validate()
+            statements = ast.statements_list()
+            for statement in statements:
+                self.node(statement)
+            self.emit(BUILD_LIST, len(statements))
+        else:
+            for ast_type, obj_type in literal_types:
+                if isinstance(ast, ast_type):
+                    self.emit(LITERAL, self.const((ast, obj_type)))
+                    return
+            raise NotImplementedError(
+                'Evaluation of node {} not implemented'.format(ast))
+
+    def call(self, ast):
+        callable_ast = ast.get('callable')
+        args = ast.get('args').elems
+        self.node(callable_ast)
+        inline = self.inline_fun(callable_ast, args)
+        if inline is not None:
+            fun, compile_inline = inline
+            guard = self.emit(GUARD, self.const(None))
+            compile_inline(args)
+            self.emit(EXIT_PRIM)
+            done = self.emit(JUMP)
+            self.consts[self.ops[guard]] = ((fun, args), self.here())
+            self.emit(CALL, self.const(args))
+            self.patch(done, self.here())
+        else:
+            self.emit(CALL, self.const(args))
+
+    def inline_fun(self, callable_ast, args):
+        # the PrimFun a call is likely to be to, going by the name it's
+        # called by (like `while` or `prim.while`), if the call can be inlined
+        if isinstance(callable_ast, ASTCall) and callable_ast.args_list():
+            callable_ast = callable_ast.args_list()[-1]
+        if not isinstance(callable_ast, ASTIdent) or not isinstance(callable_ast.get('ident'), String):
+            return None
+        name = callable_ast.get('ident').str
+        if name == 'cond' and len(args) >= 1 and all(
+                isinstance(clause, ASTTuple) and
+                isinstance(clause.get('elems'), Tuple) and
+                len(clause.get('elems').elems) == 2
+                for clause in args):
+            return cond, self.inline_cond
+        if name == 'while' and len(args) >= 2:
+            return while_fn, self.inline_while
+        if name == 'do' and len(args) >= 1:
+            return do, self.inline_do
+        return None
+
+    def inline_cond(self, clauses):
+        ends = []
+        for clause in clauses:
+            condition, expr = clause.get('elems').elems
+            self.evaluated(condition)
+            test = self.emit(COND_TEST)
+            self.evaluated(expr)
+            ends.append(self.emit(JUMP))
+            self.patch(test, self.here())
+        self.emit(PUSH_NIL)
+        for end in ends:
+            self.patch(end, self.here())
+
+    def inline_while(self, args):
+        condition, statements = args[0], args[1:]
+        self.emit(PUSH_NIL)
+        top = self.here()
+        self.evaluated(condition)
+        test = self.emit(WHILE_TEST)
+        self.emit(POP)
+        for i, statement in enumerate(statements):
+            if i > 0:
+                self.emit(POP)
+            self.evaluated(statement)
+        self.emit(JUMP, top)
+        self.patch(test, self.here())
+
+    def inline_do(self, body):
+        for i, expr in enumerate(body):
+            if i > 0:
+                self.emit(POP)
+            self.evaluated(expr)
+
+
+def compile_code(ast):
+    # the code for a preprocessed `ast`, saved on it until an AST changes
+    compiled = getattr(ast, 'bytecode', None)
+    if compiled is not None and compiled[0] == Scope.ast_generation:
+        return compiled[1]
+    code = Compiler().compile(ast)
+    if isinstance(ast, ast_nodes):
+        ast.bytecode = (Scope.ast_generation, code)
+    return code
+
+
+def run(code, scope):
+    ops = code.ops
+    consts = code.consts
+    stack = []
+    prims = []  # the (PrimFun, args) of the inlined PrimFuns being run
+    pc = 0
+    try:
+        while True:
+            op = ops[pc]
+            arg = ops[pc + 1]
+            pc += 2
+            if op == LOAD_NAME:
+                name, ast = consts[arg]
+                stack.append(scope.resolve(name, ast))
+            elif op == CALL:
+                stack.append(stack.pop().call(scope, consts[arg]))
+            elif op == LITERAL:
+                ast, obj_type = consts[arg]
+                stack.append(scope.literal(ast, obj_type))
+            elif op == POP:
+                stack.pop()
+            elif op == JUMP:
+                pc = arg
+            elif op == EVAL:
+                stack.append(scope.eval(consts[arg]))
+            elif op == WHILE_TEST:
+                res = stack.pop()
+                if not isinstance(res, Bool):
+                    raise Panic('Conditions passed to `prim.while` must return `Bool`s, not `{}`'.format(
+                        type_name(res)))
+                if not res.bool:
+                    pc = arg
+            elif op == COND_TEST:
+                condition = stack.pop()
+                if not isinstance(condition, Bool):
+                    raise Panic(
+                        'PrimFun `prim.cond` needs conditions to return `Bool`s, not `{}`'.format(type_name(condition)))
+                if not condition.bool:
+                    pc = arg
+            elif op == GUARD:
+                prim, generic = consts[arg]
+                if stack[-1] is prim[0]:
+                    stack.pop()
+                    prims.append(prim)
+                else:
+                    pc = generic
+            elif op == EXIT_PRIM:
+                prims.pop()
+            elif op == PUSH_NIL:
+                stack.append(nil)
+            elif op == TO_STR:
+                stack[-1] = call_method(scope, stack[-1], 'to_str', [])
+            elif op == BUILD_STRING:
+                strings = stack[len(stack) - arg:]
+                del stack[len(stack) - arg:]
+                stack.append(String(''.join(s.str for s in strings)))
+            elif op == BUILD_LIST:
+                elems = stack[len(stack) - arg:]
+                del stack[len(stack) - arg:]
+                stack.append(List(elems))
+            elif op == EVAL_TREE:
+                stack.append(scope._eval(consts[arg]))
+            elif op == RETURN:
+                return stack.pop()
+    except Panic as p:
+        # as if raised through the `PrimFun.call`s of the inlined PrimFuns
+        for fun, args in reversed(prims):
+            p.push_call(fun, args)
+        raise
+
+
+def run_ast(scope, ast):
+    return run(compile_code(ast), scope)
+
+
+evaluators['bytecode'] = run_ast
@@ -1,87 +1,315 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from tatsu.ast import AST
+from tatsu.infos import ParseInfo
+
+from . import cache
+from .descent import DescentParser, ParseError
 from .grammar import ObsidianParser
+from .positions import PositionTable
 from .semantics import Semantics
 
 indent_tok = '{-INDENT-}'
 dedent_tok = '{-DEDENT-}'
 
 parser = ObsidianParser()
+descent_parser = DescentParser()
+backends = ['descent', 'tatsu']
 
 
-def preprocess(text):
-    indentations = []
+brackets = [
+    ('parenthesis', '(', ')'),
+    ('curly brace', '{', '}'),
+    ('square bracket', '[', ']'),
+]
 
-    parens_depths = {
-        '(': 0,
-        '[': 0,
-        '{': 0,
-        '"': 0,
-        "'": 0
-    }
+# complete single-line literals and comments (tried in the same order as the
+# grammar) and runs of other code; deleting these leaves just the brackets on
+# each line, plus the quotes of multi-line strings and nested interpolations,
+# which are resolved line by line with `scan_line`
+skeleton_re = re.compile('|'.join([
+    r"'''(?:[^'\\\n]|\\.|'(?!''))*'''",
+    r"'(?!'')(?:[^'\\\n]|\\.)*'",
+    r'"""(?:[^"\\$\n]|\\.|"(?!"")|\$(?![(\[{\']))*"""',
+    r'"(?!"")(?:[^"\\$\n]|\\.|\$(?![(\[{\']))*"',
+    r'#.*',
+    r'[^()\[\]{}\n\'"#]+',
+]))
+code_stop_re = re.compile(r'''['"#]''')
+interpolation_stop_re = re.compile(r'''[()\[\]{}'"#]''')
+string_body_res = {
+    "'": re.compile(r"(?:[^'\\]|\\.)*"),
+    "'''": re.compile(r"(?:[^'\\]|\\.|'(?!''))*"),
+    '"': re.compile(r'(?:[^"\\$]|\\.|\$(?![(\[{\']))*'),
+    '"""': re.compile(r'(?:[^"\\$]|\\.|"(?!"")|\$(?![(\[{\']))*'),
+}
 
-    def not_in_parens():
-        return all(val == 0 for key, val in parens_depths.items())
 
-    indent_depth = 0
+def open_string(line, pos, stack):
+    quote = line[pos]
+    if line.startswith(quote * 3, pos):
+        stack.append(quote * 3)
+        return pos + 3
+    stack.append(quote)
+    return pos + 1
+
+
+def scan_line(line, stack):
+    # returns the top-level code on the line, leaving the strings and `$(...)`
+    # interpolations still open at the end of the line on `stack`
+    code = []
+    pos = 0
+    end = len(line)
+    while pos < end:
+        if not stack:
+            match = code_stop_re.search(line, pos)
+            stop = end if match is None else match.start()
+            code.append(line[pos:stop])
+            if match is None or line[stop] == '#':
+                break
+            pos = open_string(line, stop, stack)
+        elif isinstance(stack[-1], list):
+            match = interpolation_stop_re.search(line, pos)
+            if match is None:
+                break
+            char = line[match.start()]
+            pos = match.end()
+            if char == '#':
+                break
+            elif char in '([{':
+                stack[-1][0] += 1
+            elif char in ')]}':
+                stack[-1][0] -= 1
+                if stack[-1][0] == 0:
+                    stack.pop()
+            else:
+                pos = open_string(line, match.start(), stack)
+        else:
+            quote = stack[-1]
+            pos = string_body_res[quote].match(line, pos).end()
+            if pos >= end:
+                break  # the string continues on the next line
+            if line.startswith(quote, pos):
+                stack.pop()
+                pos += len(quote)
+            elif line[pos] == '$' and pos + 1 < end:
+                if line[pos + 1] == "'":
+                    pos = open_string(line, pos + 1, stack)
+                else:
+                    stack.append([1])
+                    pos += 2
+            else:
+                pos += 1
+    return ''.join(code)
+
+
+def preprocess(text, top_lines=None):
+    # if given, `top_lines` collects the lines that start at indent depth 0
+    # outside of any brackets or strings
+    injected = []
+    stack = []
+    parens = curlies = squares = 0
     indent_len = None
+    line_depth = 0
+    indent_depth = 0
     lines = text.split('\n')
+    skeletons = skeleton_re.sub('', text).split('\n')
+    deltas = {}
     for line_no, line in enumerate(lines):
-        stripped_len = len(line.lstrip())
-        indent = len(line) - stripped_len
-        if not_in_parens() and stripped_len > 0:
-            if indent > 0:
-                if indent_len is None:
-                    indent_len = indent
-                if indent % indent_len != 0:
+        if not (stack or parens or curlies or squares):
+            stripped_len = len(line.lstrip())
+            if stripped_len > 0:
+                indent = len(line) - stripped_len
+                if indent > 0:
+                    if indent_len is None:
+                        indent_len = indent
+                    if indent % indent_len != 0:
+                        raise Exception(
+                            'Invalid indentation at line {}'.format(line_no))
+                    line_depth = indent // indent_len
+                else:
+                    line_depth = 0
+                    if top_lines is not None:
+                        top_lines.append(line_no)
+        if line_depth != indent_depth:
+            if line_depth > indent_depth:
+                if line_depth - indent_depth > 1:
                     raise Exception(
-                        'Invalid indentation at line {}'.format(line_no))
-                indent_depth = indent // indent_len
+                        'Over-indentation at line {}'.format(line_no + 1))
+                lines[line_no] = indent_tok + line
+                injected.append((line_no, 0, len(indent_tok)))
             else:
-                indent_depth = 0
-        indentations.append(indent_depth)
-        for name, left, right in [
-                ('parenthesis', '(', ')'),
-                ('curly brace', '{', '}'),
-                ('square bracket', '[', ']')]:
-            parens_depths[left] += line.count(left) - line.count(right)
-            if parens_depths[left] < 0:
-                raise Exception(
-                    'Unmatched {} at line {}'.format(name, line_no + 1))
-        for quote in ["'", '"']:
-            parens_depths[quote] = (
-                parens_depths[quote] + line.count(quote)) % 2
-
-    # print(indentations)
-
-    source_map = {}
-    indent_depth = 0
-    for line_no, line in enumerate(lines):
-        if indentations[line_no] - indent_depth > 1:
-            raise Exception('Over-indentation at line {}'.format(line_no + 1))
-        if indentations[line_no] > indent_depth:
-            lines[line_no] = indent_tok + line
-            source_map[line_no] = {0: len(indent_tok)}
-        if indentations[line_no] < indent_depth:
-            num_dedents = (indent_depth - indentations[line_no])
-            prev_no = line_no - 1
-            map_delta = {len(lines[prev_no]): len(dedent_tok) * num_dedents}
-            if line_no - 1 in source_map:
-                source_map[prev_no].update(map_delta)
-            else:
-                source_map[prev_no] = map_delta
-            lines[prev_no] += dedent_tok * num_dedents
-        indent_depth = indentations[line_no]
+                num_dedents = indent_depth - line_depth
+                prev_no = line_no - 1
+                injected.append((prev_no, len(lines[prev_no]), len(dedent_tok) * num_dedents))
+                lines[prev_no] += dedent_tok * num_dedents
+            indent_depth = line_depth
+
+        skeleton = skeletons[line_no]
+        if stack or "'" in skeleton or '"' in skeleton:
+            code = scan_line(line, stack)
+            delta = (code.count('(') - code.count(')'),
+                     code.count('{') - code.count('}'),
+                     code.count('[') - code.count(']'))
+        elif not skeleton:
+            continue
+        else:
+            delta = deltas.get(skeleton)
+            if delta is None:
+                delta = deltas[skeleton] = (
+                    skeleton.count('(') - skeleton.count(')'),
+                    skeleton.count('{') - skeleton.count('}'),
+                    skeleton.count('[') - skeleton.count(']'))
+        parens += delta[0]
+        curlies += delta[1]
+        squares += delta[2]
+        if parens < 0 or curlies < 0 or squares < 0:
+            for (name, left, right), depth in zip(brackets, (parens, curlies, squares)):
+                if depth < 0:
+                    raise Exception(
+                        'Unmatched {} at line {}'.format(name, line_no + 1))
     if indent_depth > 0:
         line_no = len(lines) - 1
-        map_delta = {len(lines[-1]): len(dedent_tok) * indent_depth}
-        if line_no in source_map:
-            source_map[line_no].update(map_delta)
-        else:
-            source_map[line_no] = map_delta
-        lines[-1] += dedent_tok * indent_depth
-    return '\n'.join(lines), source_map
+        injected.append((line_no, len(lines[line_no]), len(dedent_tok) * indent_depth))
+        lines[line_no] += dedent_tok * indent_depth
+    return '\n'.join(lines), PositionTable(lines, injected)
+
 
+class OffsetSemantics:
+    # runs `semantics` on tatsu's nodes with their ParseInfo swapped for just
+    # the offset, which is all the descent parser gives nodes
+    def __init__(self, semantics):
+        self.semantics = semantics
 
-def parse(text, trace=False):
+    def __getattr__(self, name):
+        action = getattr(self.semantics, name)
+
+        def with_offset(node):
+            if isinstance(node, AST) and isinstance(node.parseinfo, ParseInfo):
+                node.set_parseinfo(node.parseinfo.pos)
+            return action(node)
+        return with_offset
+
+
+def parse(text, trace=False, use_cache=True, backend='descent', semantics=Semantics):
+    if backend not in backends:
+        raise Exception('Unknown parser backend {}'.format(backend))
+    if trace:
+        backend = 'tatsu'  # only the generated parser can trace
+    # only the default model is cached here, other semantics cache their own
+    use_cache = use_cache and not trace and semantics is Semantics
+    kind = 'model-' + backend
+    if use_cache:
+        cached = cache.load(kind, text)
+        if cached is not None:
+            return cached
+    source = text
     text, source_map = preprocess(text)
     # print(text)
-    return parser.parse(text, rule_name='program', semantics=Semantics, trace=trace), source_map
+    if backend == 'descent':
+        descent = descent_parser if semantics is Semantics else DescentParser(semantics)
+        res = descent.parse(text), source_map
+    else:
+        res = parser.parse(text, rule_name='program',
+                           semantics=OffsetSemantics(semantics), trace=trace), source_map
+    if use_cache:
+        cache.store(kind, source, res)
+    return res
+
+
+def parse_iter(text, semantics=Semantics):
+    # like `parse`, but the statements come from a generator that only parses
+    # each one when it is asked for
+    text, source_map = preprocess(text)
+    return DescentParser(semantics).parse_iter(text), source_map
+
+
+op_chars = '+-=/*&|^%!?<>.:'
+binary_identifier_end_re = re.compile(r'~[_a-zA-Z0-9]*[?!]?$')
+
+
+def ends_with_op(line):
+    while line.endswith(dedent_tok):
+        line = line[:-len(dedent_tok)]
+    if '#' in line:
+        if "'" in line or '"' in line:
+            return True  # can't tell a comment from a string cheaply
+        line = line[:line.index('#')]
+    line = line.rstrip()
+    return line != '' and (line[-1] in op_chars or
+                           binary_identifier_end_re.search(line) is not None)
+
+
+def statement_starts(lines, top_lines):
+    # the lines among `top_lines` that surely start a new top level statement:
+    # a statement carries on over line breaks through a binary operator, so
+    # lines that start with one, or follow a line that might end with one,
+    # are left out, as are lines that might hold no statement at all
+    starts = []
+    comments = set(line_no for line_no in top_lines if lines[line_no][0] == '#')
+    for line_no in top_lines:
+        first = lines[line_no][0]
+        if first in '#;~' or first in op_chars:
+            continue
+        prev_no = line_no - 1
+        while prev_no >= 0:
+            if prev_no not in comments and lines[prev_no].replace(dedent_tok, '').strip():
+                break
+            prev_no -= 1
+        if prev_no >= 0 and ends_with_op(lines[prev_no]):
+            continue
+        starts.append(line_no)
+    return starts
+
+
+def split_chunks(text, top_lines, chunk_size):
+    # (text, offset, line) chunks of at least `chunk_size` characters, each
+    # made of whole top level statements
+    lines = text.split('\n')
+    line_offsets = [0]
+    for line in lines:
+        line_offsets.append(line_offsets[-1] + len(line) + 1)
+    chunks = []
+    start_line = 0
+    # the first chunk takes in everything up to the second statement
+    for line_no in statement_starts(lines, top_lines)[1:]:
+        if line_offsets[line_no] - line_offsets[start_line] >= chunk_size:
+            chunks.append((text[line_offsets[start_line]:line_offsets[line_no]],
+                           line_offsets[start_line], start_line))
+            start_line = line_no
+    chunks.append((text[line_offsets[start_line]:], line_offsets[start_line], start_line))
+    return chunks
+
+
+def parse_chunk(chunk):
+    text, offset, line = chunk
+    return DescentParser().parse(text, offset, line)
+
+
+def parse_parallel(text, workers=None, chunk_size=1 << 16, use_cache=True):
+    # `parse` with the descent parser, splitting the file into runs of top
+    # level statements that are parsed in a pool of `workers` processes
+    if use_cache:
+        cached = cache.load('model-descent', text)
+        if cached is not None:
+            return cached
+    source = text
+    top_lines = []
+    text, source_map = preprocess(text, top_lines)
+    chunks = split_chunks(text, top_lines, chunk_size)
+    if len(chunks) < 2:
+        statements = descent_parser.parse(text)
+    else:
+        try:
+            with ProcessPoolExecutor(workers) as executor:
+                statements = [statement
+                              for chunk_statements in executor.map(parse_chunk, chunks)
+                              for statement in chunk_statements]
+        except ParseError:
+            # parse it all again to report the error the way `parse` would
+            statements = descent_parser.parse(text)
+    res = statements, source_map
+    if use_cache:
+        cache.store('model-descent', source, res)
+    return res
@@ -0,0 +1,74 @@
+from array import array
+from bisect import bisect_right
+
+
+class PositionTable:
+    # Where things are in a preprocessed source. Parsed nodes only keep their
+    # offset into the preprocessed text as their `parseinfo`; the table holds
+    # the offsets of the lines and of the tokens injected by the preprocessor,
+    # which is enough to work out lines and columns of the original source
+    # when an error has to be reported.
+    def __init__(self, lines=(), injected=()):
+        # `lines` are the lines of the preprocessed text and `injected` the
+        # (line, column, length) of every run of injected tokens, in order
+        self.line_starts = array('l')
+        offset = 0
+        for line in lines:
+            self.line_starts.append(offset)
+            offset += len(line) + 1
+        self.injected_at = array('l')
+        self.injected_lens = array('l')
+        self.injected_before = array('l')
+        total = 0
+        for line_no, col, length in injected:
+            self.injected_at.append(self.line_starts[line_no] + col)
+            self.injected_lens.append(length)
+            self.injected_before.append(total)
+            total += length
+
+    @classmethod
+    def from_arrays(cls, line_starts, injected_at, injected_lens):
+        # rebuilds a table from its saved `line_starts`, `injected_at` and
+        # `injected_lens`
+        table = cls()
+        table.line_starts.extend(line_starts)
+        table.injected_at.extend(injected_at)
+        table.injected_lens.extend(injected_lens)
+        total = 0
+        for length in injected_lens:
+            table.injected_before.append(total)
+            total += length
+        return table
+
+    def line(self, pos):
+        return max(bisect_right(self.line_starts, pos) - 1, 0)
+
+    def source_offset(self, pos):
+        # the offset in the original source, where a position inside an
+        # injected token maps to wherever the token was put in
+        i = bisect_right(self.injected_at, pos) - 1
+        if i < 0:
+            return pos
+        return pos - self.injected_before[i] - min(self.injected_lens[i], pos - self.injected_at[i])
+
+    def column(self, pos):
+        line_start = self.line_starts[self.line(pos)] if self.line_starts else 0
+        return self.source_offset(pos) - self.source_offset(line_start)
+
+    def injected(self):
+        # {line: {column: length}} of the injected tokens in the preprocessed text
+        res = {}
+        for at, length in zip(self.injected_at, self.injected_lens):
+            line = self.line(at)
+            res.setdefault(line, {})[at - self.line_starts[line]] = length
+        return res
+
+    def __eq__(self, other):
+        if type(other) is type(self):
+            return (self.line_starts == other.line_starts and
+                    self.injected_at == other.injected_at and
+                    self.injected_lens == other.injected_lens)
+        return False
+
+    def __repr__(self):
+        return 'PositionTable({} lines, {})'.format(len(self.line_starts), self.injected())
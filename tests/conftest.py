@@ -0,0 +1,14 @@
+import pytest
+
+from obsidian import cache
+from obsidian.interpreter import vm  # noqa: F401 (so the tests run the VM too)
+
+
+@pytest.fixture(autouse=True, scope='session')
+def isolated_cache(tmp_path_factory):
+    # keeps the suite's parse cache entries out of the user's cache dir
+    saved = cache.cache_dir
+    if saved is not None:
+        cache.set_cache_dir(str(tmp_path_factory.mktemp('cache')))
+    yield
+    cache.set_cache_dir(saved)
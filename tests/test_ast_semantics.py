@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+from obsidian import parser
+from obsidian.descent import ParseError
+from obsidian.interpreter import load_module, prim
+from obsidian.interpreter.types import Object, String, Int, Float, Symbol, List, Tuple
+from obsidian.interpreter.types.ast import ASTSemantics, ASTCall, model_to_ast
+from textwrap import dedent
+
+samples = [
+    '''
+    puts "Hello, World!"; puts 'Hi' r"raw" 1_000 2.5e3f
+    ''',
+    '''
+    let x = (1, 2,
+             3)
+    let y = {x, [1, 2, 3], @sym, $z}
+    f x.y + 3 ~add 4
+    ''',
+    '''
+    def (f x)
+        let z = "a $x b $(g x) c"
+        if z
+            do_this
+        else
+            """triple ""quoted"" $y"""
+    ''',
+    '''
+    ({.} x)
+    ()
+    {}
+    []
+    {x; y z}
+    ''',
+]
+
+
+def structure(obj):
+    if isinstance(obj, String):
+        return obj.str
+    if isinstance(obj, (Int, Float)):
+        return type(obj).__name__, obj.int if isinstance(obj, Int) else obj.float
+    if isinstance(obj, Symbol):
+        return 'Symbol', obj.symbol
+    if isinstance(obj, (List, Tuple)):
+        return type(obj).__name__, [structure(e) for e in obj.elems]
+    if isinstance(obj, Object):
+        return type(obj).__name__, getattr(obj, 'parseinfo', None), {
+            k: structure(v) for k, v in obj.attrs.items() if k != 'meta'}
+    return obj
+
+
+@pytest.mark.parametrize('backend', parser.backends)
+@pytest.mark.parametrize('source', samples)
+def test_matches_model_to_ast(source, backend):
+    source = dedent(source)
+    model, source_map = parser.parse(source, use_cache=False, backend=backend)
+    statements, ast_source_map = parser.parse(
+        source, use_cache=False, backend=backend, semantics=ASTSemantics)
+    assert [structure(s) for s in statements] == \
+        [structure(model_to_ast(s)) for s in model]
+    assert ast_source_map == source_map
+
+
+def test_prelude_matches_model_to_ast():
+    path = os.path.join(os.path.dirname(parser.__file__), 'prelude', 'prelude.on')
+    with open(path) as f:
+        source = f.read()
+    model, source_map = parser.parse(source, use_cache=False)
+    statements, source_map = parser.parse(source, use_cache=False, semantics=ASTSemantics)
+    assert [structure(s) for s in statements] == \
+        [structure(model_to_ast(s)) for s in model]
+
+
+def test_empty_module():
+    statements, source_map = parser.parse('# nothing\n', semantics=ASTSemantics)
+    assert statements == []
+
+
+def test_runs(capsys):
+    source = dedent('''
+    (get_attr prim 'let') 'x' 3
+    (get_attr prim 'puts') x
+    ''')
+    statements, source_map = parser.parse(source, semantics=ASTSemantics)
+    assert isinstance(statements[0], ASTCall)
+    load_module(statements, source_map, 'test', {'prim': prim})
+    out, err = capsys.readouterr()
+    assert out.splitlines() == ['3']
+
+
+def test_load_module_streams(capsys):
+    source = dedent('''
+    (get_attr prim 'puts') 'first'
+    (get_attr prim 'puts') x +
+    ''')
+    statements, source_map = parser.parse_iter(source, semantics=ASTSemantics)
+    with pytest.raises(ParseError):
+        load_module(statements, source_map, 'test', {'prim': prim})
+    out, err = capsys.readouterr()
+    assert out.splitlines() == ['first']
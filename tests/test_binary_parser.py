@@ -1,5 +1,12 @@
-from obsidian.interpreter.types import Scope, List
-from obsidian.interpreter.types.ast import ASTCall
+import gc
+import weakref
+
+import pytest
+
+from obsidian.interpreter.types import Scope, List, String, Int, Symbol, Sigils, Panic
+from obsidian.interpreter.types.ast import ASTCall, ASTBinarySlurp, ASTIdent, ASTInt, ASTString
+from obsidian.interpreter.funs import int
+from obsidian.interpreter.funs.set_attr import set_attr
 
 
 def test_simple():
@@ -88,3 +95,124 @@ def test_multi_no_assoc_precedence():
     pos, ast = scope.parse_binary_subexpr(slurp, slurp[0])
     assert ast == ASTCall('==', List(
         ['w', ASTCall('!=', List(['x', 'y'])), 'z']))
+
+
+def slurp_ast(*elems):
+    return ASTBinarySlurp(List([ASTIdent(String(elem)) if isinstance(elem, str) else ASTInt(Int(elem))
+                                for elem in elems]))
+
+
+def test_preprocess_cached():
+    scope = Scope()
+    scope.set('+', int.Add())
+    scope.set('*', int.Mul())
+    ast = slurp_ast(1, '+', 2, '*', 3)
+    assert scope.eval(ast).int == 7
+    assert scope.preprocessed(ast) is scope.preprocessed(ast)
+    # other scopes resolving to the same operators share the result
+    assert Scope(scope).preprocessed(ast) is scope.preprocessed(ast)
+
+
+def test_preprocess_invalidation():
+    scope = Scope()
+    scope.set('+', int.Add())
+    scope.set('*', int.Mul())
+    ast = slurp_ast(1, '+', 2, '*', 3)
+    assert scope.eval(ast).int == 7
+    scope.get('*').set('precedence', Int(5))
+    assert scope.eval(ast).int == 9
+    scope.get('*').set('associativity', Symbol('none'))
+    assert scope.eval(ast).int == 9
+    scope.set('*', int.Sub())
+    assert scope.eval(ast).int == 0
+    inner = Scope(scope)
+    inner.set('+', int.Mul())
+    assert inner.eval(ast).int == -1
+    assert scope.eval(ast).int == 0
+
+
+def test_literals_reused():
+    scope = Scope()
+    ast = ASTInt(Int(3), String(''))
+    assert scope.eval(ast) is scope.eval(ast)
+    string = ASTString(String('hi'), String(''))
+    assert scope.eval(string) is scope.eval(string)
+    # unless something was set on the value
+    value = scope.eval(ast)
+    value.set('tag', Int(1))
+    assert scope.eval(ast) is not value
+    assert 'tag' not in scope.eval(ast).attrs
+
+
+def test_literals_follow_constructors(monkeypatch):
+    scope = Scope()
+    ast = ASTInt(Int(3), String(''))
+    string = ASTString(String('hi'), String(''))
+    value, hi = scope.eval(ast), scope.eval(string)
+    # a `call` set on anything else leaves saved ASTs alone
+    generation = Scope.ast_generation
+    set_attr.fun(Scope(), String('call'), Int(1))
+    assert Scope.ast_generation == generation
+    assert scope.eval(ast) is value
+    # but a new constructor is used
+    monkeypatch.setitem(Int.T.attrs, 'call', int.IntConstructor())
+    assert scope.eval(ast) is not value
+    monkeypatch.undo()
+    # as is a new sigils table
+    sigils = String.T.get('sigils')
+    monkeypatch.setitem(String.T.attrs, 'sigils', Sigils(dict(sigils.elems)))
+    assert scope.eval(string) is not hi
+    assert scope.eval(string).str == 'hi'
+
+
+def test_names_resolved():
+    root = Scope()
+    root.set('x', Int(1))
+    middle = Scope(root)
+    scope = Scope(middle)
+    ast = ASTIdent(String('x'))
+    assert scope.eval(ast).int == 1
+    assert scope.eval(ast) is root.get('x')
+    root.set('x', Int(2))
+    assert scope.eval(ast).int == 2
+    # new bindings on the way shadow the saved one
+    middle.set('x', Int(3))
+    assert scope.eval(ast).int == 3
+    set_attr.fun(scope.get('meta'), String('parent'), root)
+    assert scope.eval(ast).int == 2
+
+
+def test_names_resolved_from_other_scopes():
+    root = Scope()
+    root.set('x', Int(1))
+    ast = ASTIdent(String('x'))
+    scope = Scope(Scope(root))
+    assert scope.eval(ast).int == 1
+    assert ast.resolved == ('x', 2)
+    # the scope isn't kept alive by the AST
+    ref = weakref.ref(scope)
+    del scope
+    gc.collect()
+    assert ref() is None
+    # other scopes the same depth down use the saved depth, but still see
+    # bindings on the way
+    assert Scope(Scope(root)).eval(ast).int == 1
+    middle = Scope(root)
+    middle.set('x', Int(2))
+    assert Scope(middle).eval(ast).int == 2
+
+
+def test_names_resolved_without_parent():
+    root = Scope()
+    root.set('x', Int(1))
+    ast = ASTIdent(String('x'))
+    assert Scope(root).eval(ast).int == 1
+    # a saved depth going through a scope with no parent, or no meta
+    scope = Scope(root)
+    del scope.get('meta').attrs['parent']
+    with pytest.raises(Panic):
+        scope.eval(ast)
+    scope = Scope(root)
+    del scope.attrs['meta']
+    with pytest.raises(Panic):
+        scope.eval(ast)
@@ -0,0 +1,142 @@
+import gc
+import os
+import weakref
+
+import pytest
+
+from obsidian import cache
+from obsidian.parser import parse
+from obsidian.semantics import Call, Ident
+from obsidian.interpreter import load_module, prim
+from obsidian.interpreter.core import parse_module
+from obsidian.interpreter.types.ast import ASTCall, ASTIdent, ASTString
+from textwrap import dedent
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'cache_dir', str(tmp_path))
+    return tmp_path
+
+
+def entries(cache_dir):
+    return sorted(f for f in os.listdir(str(cache_dir)) if f.endswith('.pickle'))
+
+
+def test_parse_cached(cache_dir):
+    source = 'puts "Hello, World!"\n'
+    ast, source_map = parse(source)
+    assert len(entries(cache_dir)) == 1
+    cached_ast, cached_source_map = parse(source)
+    assert cached_ast == ast
+    assert isinstance(cached_ast[0], Call)
+    assert isinstance(cached_ast[0].callable_expr, Ident)
+    assert cached_ast[0].callable_expr.identifier == 'puts'
+    assert cached_source_map.line(cached_ast[0].parseinfo) == 0
+    assert cached_source_map == source_map
+
+
+def test_parse_keyed_by_content(cache_dir):
+    parse('puts "Hello!"\n')
+    parse('puts "World!"\n')
+    assert len(entries(cache_dir)) == 2
+    ast, source_map = parse('puts "World!"\n')
+    assert ast[0].args[0].string == 'World!'
+
+
+def test_parse_without_cache(cache_dir):
+    parse('puts "Hello!"\n', use_cache=False)
+    assert entries(cache_dir) == []
+
+
+def test_corrupt_entry(cache_dir):
+    source = 'puts "Hello!"\n'
+    parse(source)
+    path = os.path.join(str(cache_dir), entries(cache_dir)[0])
+    with open(path, 'wb') as f:
+        f.write(b'not a pickle')
+    ast, source_map = parse(source)
+    assert ast[0].args[0].string == 'Hello!'
+    ast, source_map = parse(source)
+    assert ast[0].args[0].string == 'Hello!'
+
+
+def test_disabled(cache_dir, monkeypatch):
+    monkeypatch.setattr(cache, 'cache_dir', None)
+    parse('puts "Hello!"\n')
+    assert entries(cache_dir) == []
+
+
+def test_parse_module_cached(cache_dir):
+    source = "(get_attr prim 'puts') 'Hello, World!'\n"
+    statements, source_map = parse_module(source)
+    assert entries(cache_dir) == []
+    statements = list(statements)
+    assert len(entries(cache_dir)) == 1
+    cached_statements, cached_source_map = parse_module(source)
+    assert cached_statements is not statements
+    call = cached_statements[0]
+    assert isinstance(call, ASTCall)
+    assert call.get('meta').get('type') is ASTCall.T
+    assert isinstance(call.get('callable'), ASTCall)
+    assert isinstance(call.args_list()[0], ASTString)
+    assert cached_source_map.line(call.parseinfo) == 0
+
+
+def test_parse_module_runs(cache_dir, capsys):
+    source = dedent('''
+    (get_attr prim 'let') 'x' 3
+    (get_attr prim 'puts') x
+    ''')
+    statements, source_map = parse_module(source)
+    load_module(statements, source_map, 'test', {'prim': prim})
+    statements, source_map = parse_module(source)
+    assert isinstance(statements, list)
+    load_module(statements, source_map, 'test', {'prim': prim})
+    out, err = capsys.readouterr()
+    assert out.splitlines() == ['3', '3']
+
+
+def test_import_cached(cache_dir, tmpdir, capsys):
+    tmpfile = tmpdir.join('other.on')
+    tmpfile.write("(get_attr prim 'puts') 'hello from other'\n")
+    source = dedent('''
+    (get_attr prim 'import') '{}' 'other'
+    (get_attr prim 'import') '{}' 'other'
+    '''.format(tmpfile, tmpfile))
+    statements, source_map = parse(source)
+    load_module(statements, source_map, 'test', {'prim': prim})
+    out, err = capsys.readouterr()
+    assert out.splitlines() == ['hello from other', 'hello from other']
+    assert any(f.startswith('ast-') for f in entries(cache_dir))
+
+
+def test_tampered_entry(cache_dir):
+    source = 'puts "Hello!"\n'
+    parse(source)
+    path = os.path.join(str(cache_dir), entries(cache_dir)[0])
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(data[:-1] + bytes([data[-1] ^ 1]))
+    assert cache.load('model-descent', source) is None
+    assert entries(cache_dir) == []
+
+
+def test_untrusted_dir(cache_dir):
+    os.chmod(str(cache_dir), 0o777)
+    try:
+        parse('puts "Hello!"\n')
+        assert entries(cache_dir) == []
+    finally:
+        os.chmod(str(cache_dir), 0o700)
+
+
+def test_parse_module_streams_without_cache(monkeypatch):
+    monkeypatch.setattr(cache, 'cache_dir', None)
+    statements, source_map = parse_module("(get_attr prim 'puts') 1\n" * 3)
+    first = weakref.ref(next(statements))
+    next(statements)
+    gc.collect()
+    assert first() is None
+    assert len(list(statements)) == 1
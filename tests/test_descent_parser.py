@@ -0,0 +1,167 @@
+import os
+
+import pytest
+from tatsu.exceptions import FailedParse
+
+from obsidian import parser
+from obsidian.descent import ParseError
+from obsidian.semantics import Node, Call, Ident
+from textwrap import dedent
+
+samples = [
+    '''
+    puts "Hello, World!"; puts 'Hi' r"raw" 1_000 2.5e3f
+    ''',
+    '''
+    let x = (1, 2,
+             3)
+    let y = {x, [1, 2, 3], @sym, $z}
+    f x.y + 3 ~add 4
+    ''',
+    '''
+    def (f x)
+        # a comment
+        let z = "a $x b $(g x) c"
+        if z
+            do_this
+        else
+            """triple ""quoted"" $y"""
+    ''',
+    '''
+    ({.} x)
+    ()
+    {}
+    []
+    (+)
+    {x; y z}
+    ''',
+    '''
+    ''',
+]
+
+
+def structure(node):
+    if isinstance(node, Node):
+        return type(node).__name__, {k: structure(v) for k, v in node.__dict__.items()}
+    if isinstance(node, (list, tuple)):
+        return [structure(e) for e in node]
+    return node
+
+
+def assert_same(source):
+    ast, source_map = parser.parse(source, use_cache=False)
+    tatsu_ast, tatsu_source_map = parser.parse(source, use_cache=False, backend='tatsu')
+    assert structure(ast) == structure(tatsu_ast)
+    assert source_map == tatsu_source_map
+
+
+@pytest.mark.parametrize('source', samples)
+def test_matches_tatsu(source):
+    assert_same(dedent(source))
+
+
+def test_prelude_matches_tatsu():
+    path = os.path.join(os.path.dirname(parser.__file__), 'prelude', 'prelude.on')
+    with open(path) as f:
+        assert_same(f.read())
+
+
+def test_parseinfo():
+    ast, source_map = parser.parse('\nputs  x\n', use_cache=False)
+    call = ast[0]
+    assert isinstance(call, Call)
+    assert call.parseinfo == 1
+    assert isinstance(call.args[0], Ident)
+    assert call.args[0].parseinfo == 7
+    assert source_map.line(call.args[0].parseinfo) == 1
+    assert source_map.column(call.args[0].parseinfo) == 6
+
+
+def test_syntax_error():
+    with pytest.raises(ParseError):
+        parser.parse('puts (x\n', use_cache=False)
+
+
+def test_syntax_error_type():
+    # the same exception as the tatsu backend, for callers catching it
+    for source in ['puts (x\n', '(f x +)\n', 'let x = (\n']:
+        with pytest.raises(FailedParse) as descent:
+            parser.parse(source, use_cache=False)
+        with pytest.raises(FailedParse):
+            parser.parse(source, backend='tatsu', use_cache=False)
+        assert isinstance(descent.value, ParseError)
+
+
+def test_operator_commits():
+    # an operator must be followed by an operand, as with tatsu's cut
+    with pytest.raises(ParseError):
+        parser.parse('(f x +)\n', use_cache=False)
+
+
+def test_parse_iter():
+    source = dedent('''
+    puts "Hello!"
+    def (f x)
+        x
+    puts (f 3)
+    ''')
+    statements, source_map = parser.parse_iter(source)
+    ast, parsed_source_map = parser.parse(source, use_cache=False)
+    assert structure(list(statements)) == structure(ast)
+    assert source_map == parsed_source_map
+
+
+def test_parse_iter_is_lazy():
+    statements, source_map = parser.parse_iter('puts "Hello!"\nputs x +\n')
+    assert isinstance(next(statements), Call)
+    with pytest.raises(ParseError):
+        next(statements)
+
+
+def test_unknown_backend():
+    with pytest.raises(Exception):
+        parser.parse('puts x\n', backend='yacc')
+
+
+def test_parse_parallel():
+    source = dedent('''
+    # leading comment
+    puts "Hello!"
+    def (f x)
+        x +
+            1
+    let y = x
+    .foo
+    let z = 1 +
+
+    # between
+    2
+    puts """multi
+    line # not a comment
+    string"""
+    puts (f
+    3)
+    ''') * 20
+    ast, source_map = parser.parse(source, use_cache=False)
+    parallel_ast, parallel_source_map = parser.parse_parallel(
+        source, workers=2, chunk_size=1, use_cache=False)
+    assert len(parallel_ast) == len(ast)
+    assert structure(parallel_ast) == structure(ast)
+    assert parallel_source_map == source_map
+
+
+def test_split_chunks():
+    source = 'a\nb +\nc\nd\n'
+    top_lines = []
+    text, source_map = parser.preprocess(source, top_lines)
+    chunks = parser.split_chunks(text, top_lines, 1)
+    assert chunks == [('a\n', 0, 0), ('b +\nc\n', 2, 1), ('d\n', 8, 3)]
+
+
+def test_parse_parallel_error():
+    source = 'puts x\n' * 10 + 'puts x +\n'
+    with pytest.raises(ParseError) as serial:
+        parser.parse(source, use_cache=False)
+    with pytest.raises(ParseError) as parallel:
+        parser.parse_parallel(source, workers=2, chunk_size=1, use_cache=False)
+    assert str(parallel.value) == str(serial.value)
@@ -1,13 +1,24 @@
+import pytest
+
 from obsidian.parser import parse
 from obsidian.interpreter import load_module, prim
+from obsidian.interpreter.types import String, Int, Symbol, Tuple, PMap, PVector, Panic, make_int
+from obsidian.interpreter.types.scope import Scope, evaluators, get_attr, call_method
+from obsidian.interpreter.funs.map import MapKey, native_key, native_classes
 from textwrap import dedent
 
 
 def get_output(source, capsys):
+    # runs `source` with every evaluator, which must all print the same
     ast, source_map = parse(dedent(source))
-    load_module(ast, source_map, 'test', {'prim': prim})
-    out, err = capsys.readouterr()
-    return out.splitlines()
+    outputs = []
+    for evaluator in evaluators:
+        load_module(ast, source_map, 'test', {'prim': prim}, evaluator=evaluator)
+        out, err = capsys.readouterr()
+        outputs.append(out.splitlines())
+    for output in outputs[1:]:
+        assert output == outputs[0]
+    return outputs[0]
 
 
 def test_hello(capsys):
@@ -1781,3 +1792,749 @@ def test_methods(capsys):
     '''
     target = ['Woof Jim!']
     assert get_output(source, capsys) == target
+
+
+def test_preprocess_ast_changes(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'puts' (get_attr prim 'puts')
+    let 'Fun' (get_attr prim 'Fun')
+    let '+' (get_attr (get_attr prim 'int') 'add')
+    let '-' (get_attr (get_attr prim 'int') 'sub')
+    let 'ast' (get_attr prim 'ast')
+    let 'f' (Fun 'f' (puts x + 1))
+    let 'x' 1
+    (f)
+    let 'statement' ((get_attr (get_attr f 'body') 'get') 0)
+    let 'sum' ((get_attr (get_attr statement 'args') 'get') 0)
+    set_attr sum 'callable' ((get_attr ast 'Ident') '-')
+    (f)
+    '''
+    target = ['2', '0']
+    assert get_output(source, capsys) == target
+
+
+def test_unknown_evaluator():
+    ast, source_map = parse("(get_attr prim 'puts') 'hi'\n")
+    with pytest.raises(Exception):
+        load_module(ast, source_map, 'test', {'prim': prim}, evaluator='jit')
+
+
+def test_literal_meta_changed(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'puts' (get_attr prim 'puts')
+    let 'attrs' (get_attr prim 'attrs')
+    let 'while' (get_attr prim 'while')
+    let 'assign' (get_attr prim 'assign')
+    let '+' (get_attr (get_attr prim 'int') 'add')
+    let '<' (get_attr (get_attr prim 'int') 'lt')
+    let 'i' 0
+    while i < 2 (let 'x' 300) (puts (attrs (get_attr x 'meta'))) (set_attr (get_attr x 'meta') 'a' 'b') (assign 'i' i + 1)
+    '''
+    target = ['[type, meta]', '[type, meta]']
+    assert get_output(source, capsys) == target
+
+
+def test_literal_sigils_change(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'puts' (get_attr prim 'puts')
+    let 'Fun' (get_attr prim 'Fun')
+    let 'f' (Fun 'f' (puts 'hi'))
+    (f)
+    let 'sigils' (get_attr (get_attr prim 'String') 'sigils')
+    let 'default' ((get_attr sigils 'get') '')
+    (get_attr sigils 'set') '' (Fun 'shout' r'HI')
+    (f)
+    (get_attr sigils r'set') r'' default
+    (f)
+    '''
+    target = ['hi', 'HI', 'hi']
+    assert get_output(source, capsys) == target
+
+
+def test_shadowing_cached_names(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'puts' (get_attr prim 'puts')
+    let 'Fun' (get_attr prim 'Fun')
+    let 'while' (get_attr prim 'while')
+    let 'do' (get_attr prim 'do')
+    let 'assign' (get_attr prim 'assign')
+    let '+' (get_attr (get_attr prim 'int') 'add')
+    let '<' (get_attr (get_attr prim 'int') 'lt')
+    let 'x' 'outer'
+    let 'i' 0
+    let 'f' (Fun 'f' (while i < 2 (do (puts x) (let 'x' 'inner') (assign 'i' i + 1))))
+    (f)
+    puts x
+    '''
+    target = ['outer', 'inner', 'outer']
+    assert get_output(source, capsys) == target
+
+
+def test_methods_change(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'puts' (get_attr prim 'puts')
+    let 'Fun' (get_attr prim 'Fun')
+    let 'Object' (get_attr prim 'Object')
+    let 'Type' (get_attr prim 'Type')
+    let 'Dog' (Type 'Dog' Object)
+    let 'Cat' (Type 'Cat' Object)
+    let 'Puppy' (Type 'Puppy' Dog)
+    set_attr (get_attr Dog 'methods') 'greet' (Fun 'greet' (puts 'woof'))
+    set_attr (get_attr Cat 'methods') 'greet' (Fun 'greet' (puts 'meow'))
+    let 'rex' (Object Puppy)
+    ((get_attr rex 'greet'))
+    set_attr (get_attr Dog 'methods') 'greet' (Fun 'greet' (puts 'arf'))
+    ((get_attr rex 'greet'))
+    set_attr Puppy 'parent' Cat
+    ((get_attr rex 'greet'))
+    set_attr (get_attr Puppy 'statics') 'greet' (Fun 'greet' (puts 'static'))
+    ((get_attr rex 'greet'))
+    '''
+    target = ['woof', 'arf', 'meow', 'static']
+    assert get_output(source, capsys) == target
+
+
+def test_bound_methods_reused():
+    string = String('hi')
+    to_str = get_attr.fun(string, String('to_str'))
+    assert get_attr.fun(string, String('to_str')) is to_str
+    # which is kept on the method, not on the receiver
+    assert vars(string) == {}
+    assert get_attr.fun(String('ho'), String('to_str')) is not to_str
+    to_str = get_attr.fun(string, String('to_str'))
+    to_str.set('tag', String('tagged'))
+    assert get_attr.fun(string, String('to_str')) is not to_str
+    # or its meta was handed out and changed
+    to_str = get_attr.fun(string, String('to_str'))
+    assert get_attr.fun(string, String('to_str')) is to_str
+    get_attr.fun(to_str, String('meta')).set('a', String('b'))
+    assert get_attr.fun(string, String('to_str')) is not to_str
+    assert not get_attr.fun(string, String('to_str')).get('meta').has('a')
+
+
+def test_nested_method_calls(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'puts' (get_attr prim 'puts')
+    let 'Fun' (get_attr prim 'Fun')
+    let 'Object' (get_attr prim 'Object')
+    let 'Type' (get_attr prim 'Type')
+    let 'Dog' (Type 'Dog' Object)
+    set_attr (get_attr Dog 'methods') 'follow' (Fun 'follow'
+        (let 'eval' (get_attr (get_attr (get_attr meta 'caller') 'meta') 'eval'))
+        (eval ((get_attr (get_attr meta 'args') 'get') 1))
+        (let 'dog' (eval ((get_attr (get_attr meta 'args') 'get') 0)))
+        (puts (get_attr dog 'name')))
+    let 'rex' (Object Dog)
+    set_attr rex 'name' 'Rex'
+    let 'fido' (Object Dog)
+    set_attr fido 'name' 'Fido'
+    ((get_attr rex 'follow') ((get_attr fido 'follow') 'nobody'))
+    '''
+    target = ['Fido', 'Rex']
+    assert get_output(source, capsys) == target
+
+
+def test_prim_fun_arity(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'add' (get_attr (get_attr prim 'int') 'add')
+    (get_attr prim 'puts') (add 1 2)
+    (add 1 2 3)
+    '''
+    target = ['3',
+              '========== Panic: ==========',
+              'Module `test` panicked at line 5:',
+              '    Statement: (add 1 2 3)',
+              '    Panic: PrimFun `int.add` takes 2 arguments, not 3']
+    assert get_output(source, capsys) == target
+
+
+def test_panic_without_args(capsys, monkeypatch):
+    monkeypatch.setattr(Panic, 'capture_args', False)
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    (let 'Fun' (get_attr prim 'Fun'))
+    (let 'panic' (get_attr prim 'panic'))
+    let 'danger' (Fun 'danger' (panic 'error'))
+    (danger 3)
+    '''
+    target = ['========== Panic: ==========',
+              'Fun `danger` panicked at statement 0:',
+              "    Statement: (panic 'error')",
+              'PrimFun `prim.panic` panicked:',
+              'Module `test` panicked at line 6:',
+              '    Statement: (danger 3)',
+              '    Panic: error']
+    assert get_output(source, capsys) == target
+
+
+def test_tail_calls(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'puts' (get_attr prim 'puts')
+    let 'Fun' (get_attr prim 'Fun')
+    let 'cond' (get_attr prim 'cond')
+    let 'do' (get_attr prim 'do')
+    let 'assign' (get_attr prim 'assign')
+    let '-' (get_attr (get_attr prim 'int') 'sub')
+    let '==' (get_attr (get_attr prim 'int') 'eq')
+    let 'n' 5000
+    let 'count' (Fun 'count'
+        (assign 'n' n - 1)
+        (cond (n == 0, 'done') (true, (do n (count)))))
+    puts (count)
+    let 'first' (Fun 'first'
+        (return 1)
+        (puts 'unreachable'))
+    puts (first)
+    '''
+    target = ['done', '1']
+    assert get_output(source, capsys) == target
+
+
+def test_panic_in_tail_call(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'Fun' (get_attr prim 'Fun')
+    let 'cond' (get_attr prim 'cond')
+    let 'panic' (get_attr prim 'panic')
+    let 'danger' (Fun 'danger' (cond (true, (panic 'error'))))
+    (danger)
+    '''
+    target = ['========== Panic: ==========',
+              'Fun `danger` panicked at statement 0:',
+              "    Statement: (cond (true, (panic 'error')))",
+              '    Args: ',
+              'PrimFun `prim.cond` panicked:',
+              "    Args: {(true, (panic 'error'))}",
+              'PrimFun `prim.panic` panicked:',
+              "    Args: {'error'}",
+              'Module `test` panicked at line 7:',
+              '    Statement: (danger)',
+              '    Panic: error']
+    assert get_output(source, capsys) == target
+
+
+def test_value_metas(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    (let 'puts' (get_attr prim 'puts'))
+    (let 'attrs' (get_attr prim 'attrs'))
+    let 'x' 3
+    let 'y' 4
+    (set_attr (get_attr x 'meta') 'a' 'b')
+    puts (attrs (get_attr x 'meta'))
+    puts (attrs (get_attr y 'meta'))
+    puts (attrs 5)
+    '''
+    target = ['[type, meta, a]', '[type, meta]', '[meta]']
+    assert get_output(source, capsys) == target
+
+
+def test_values_share_meta():
+    x, y = Int(3), Int(4)
+    assert x.attrs is y.attrs
+    with pytest.raises(Panic):
+        x.get('meta').set('a', String('b'))
+    x.set('a', String('b'))
+    assert x.attrs is not y.attrs
+    assert not y.has('a')
+    assert x.get('meta') is y.get('meta')
+
+
+def test_interned_values(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    (let 'puts' (get_attr prim 'puts'))
+    (let 'attrs' (get_attr prim 'attrs'))
+    let '+' (get_attr (get_attr prim 'int') 'add')
+    let 'x' 1 + 2
+    (set_attr x 'a' 'b')
+    puts (attrs x)
+    puts (attrs 2 + 1)
+    puts ((get_attr @sym 'eq') @sym)
+    puts ((get_attr @sym 'eq') @other)
+    puts ((get_attr {(@sym, 1), (@other, 2)} 'get') @other)
+    '''
+    target = ['[meta, a]', '[meta]', 'true', 'false', '2']
+    assert get_output(source, capsys) == target
+
+
+def test_small_ints_shared():
+    assert make_int(3) is make_int(3)
+    assert make_int(1000) is not make_int(1000)
+    x = make_int(3)
+    x.set('a', String('b'))
+    assert make_int(3) is not x
+    assert not make_int(3).has('a')
+    assert Symbol('left') is Symbol('left')
+
+
+def test_symbol_attrs_not_shared(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'puts' (get_attr prim 'puts')
+    let 'Fun' (get_attr prim 'Fun')
+    let 'a' @foo
+    set_attr a 'tag' 1
+    puts (has_attr a 'tag')
+    puts (has_attr @foo 'tag')
+    let 'f' (Fun 'f' (has_attr @foo 'tag'))
+    puts (f)
+    puts ((get_attr a 'eq') @foo)
+    puts ((get_attr {(@foo, 1), (@bar, 2)} 'get') a)
+    '''
+    target = ['true', 'false', 'false', 'true', '1']
+    assert get_output(source, capsys) == target
+    assert not Symbol('foo').has('tag')
+
+
+def test_map_native_keys(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'puts' (get_attr prim 'puts')
+    let 'm' {((1, 'a'), 'tuple'), (@b, 'symbol'), (1, 'int'), (true, 'bool'), ('s', 'string')}
+    let 'get' (get_attr m 'get')
+    puts (get (1, 'a'))
+    puts (get @b)
+    puts (get 1)
+    puts (get true)
+    puts (get 's')
+    let 'x' 1
+    (set_attr x 'a' 'b')
+    puts (get x)
+    puts (get (x, 'a'))
+    (get_attr m 'set') 1.5 'float'
+    puts (get 1.5)
+    puts ((get_attr (1, 2) 'eq') (1, 2))
+    puts ((get_attr (1, 2) 'eq') (1, 3))
+    puts (get (1, 'b'))
+    '''
+    target = ['tuple',
+              'symbol',
+              'int',
+              'bool',
+              'string',
+              'int',
+              'tuple',
+              'float',
+              'true',
+              'false',
+              '========== Panic: ==========',
+              'PrimFun `prim.puts` panicked:',
+              "    Args: (get (1, 'b'))",
+              'PrimFun `method_fun` panicked:',
+              "    Args: {(1, 'b')}",
+              'PrimFun `Map.get` panicked:',
+              "    Args: {(1, a) -> tuple, @b -> symbol, 1 -> int, true -> bool, s -> string, 1.5 -> float} {(1, 'b')}",
+              'Module `test` panicked at line 19:',
+              "    Statement: (puts (get (1, 'b')))",
+              '    Panic: No such key `(1, b)` in `Map`']
+    assert get_output(source, capsys) == target
+
+
+def test_map_native_keys_follow_methods():
+    methods = Int.T.get('methods')
+    eq = methods.get('eq')
+    assert native_key(Int(3), native_classes()) is not None
+    methods.set('eq', methods.get('hash'))
+    try:
+        assert Int not in native_classes()
+        assert native_key(Tuple([Int(3), String('a')]), native_classes()) is None
+    finally:
+        methods.set('eq', eq)
+    assert Int in native_classes()
+
+
+def test_map_keys_compared_in_caller_scope(monkeypatch):
+    scope = Scope()
+    # keys with their own attrs go through their `hash` and `eq` methods
+    keys = [Int(n) for n in range(3)]
+    for key in keys:
+        key.set('tag', Int(1))
+    table = {MapKey(key, scope): key for key in keys}
+    created = []
+    init = Scope.__init__
+    monkeypatch.setattr(Scope, '__init__', lambda self, *args: created.append(self) or init(self, *args))
+    for _ in range(10):
+        for key in keys:
+            other = Int(key.int)
+            other.set('tag', Int(2))
+            assert table[MapKey(other, scope)] is key
+    assert created == []
+    assert not any(name.startswith('__other') for name in scope.attrs)
+
+
+def test_string_methods(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'puts' (get_attr prim 'puts')
+    let 's' 'a,b,c'
+    puts ((get_attr s 'split') ',')
+    puts ((get_attr '-' 'join') ((get_attr s 'split') ','))
+    puts ((get_attr s 'find') 'b')
+    puts ((get_attr s 'find') 'd')
+    puts ((get_attr s 'replace') ',' ';')
+    puts ((get_attr s 'slice') 1 3)
+    puts ((get_attr s 'starts_with') 'a,')
+    puts ((get_attr s 'len'))
+    puts ((get_attr '{} + {} = {{{}}}' 'format') 1 @two [3])
+    ((get_attr '{}' 'format'))
+    '''
+    target = ['[a, b, c]', 'a-b-c', '2', '-1', 'a;b;c', ',b', 'true', '5',
+              '1 + @two = {[3]}',
+              '========== Panic: ==========',
+              'PrimFun `method_fun` panicked:',
+              '    Args: ',
+              'PrimFun `String.format` panicked:',
+              '    Args: {}',
+              'Module `test` panicked at line 14:',
+              "    Statement: ((get_attr '{}' 'format'))",
+              '    Panic: Format string has `1` fields, but got `0` args']
+    assert get_output(source, capsys) == target
+
+
+def test_string_builder(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'puts' (get_attr prim 'puts')
+    let 'while' (get_attr prim 'while')
+    let 'assign' (get_attr prim 'assign')
+    let '+' (get_attr (get_attr prim 'int') 'add')
+    let '<' (get_attr (get_attr prim 'int') 'lt')
+    let 'builder' ((get_attr prim 'StringBuilder'))
+    let 'i' 0
+    while i < 5
+        (get_attr builder 'append') ((get_attr i 'to_str'))
+        assign 'i' i + 1
+    puts builder
+    puts ((get_attr builder 'len'))
+    puts ((get_attr ((get_attr builder 'append') '!') 'to_str'))
+    '''
+    target = ['01234', '5', '01234!']
+    assert get_output(source, capsys) == target
+
+
+def test_string_hash_saved():
+    string = String('abc')
+    code = call_method(Scope(), string, 'hash', [])
+    assert code.int == hash('abc')
+    assert call_method(Scope(), string, 'hash', []) is code
+
+
+def test_arrays(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'puts' (get_attr prim 'puts')
+    let 'array' (get_attr prim 'array')
+    let '+' (get_attr array 'add')
+    let '*' (get_attr array 'mul')
+    let '/' (get_attr array 'div')
+    let '<' (get_attr array 'lt')
+    let 'a' ((get_attr array 'int64') [1, 2, 3])
+    let 'b' ((get_attr prim 'Array') [0.5, 1, 2])
+    puts a
+    puts b
+    puts a + b * 2
+    puts a / 2
+    puts a < 2
+    puts ((get_attr a 'sum'))
+    puts ((get_attr b 'mean'))
+    puts ((get_attr a 'dot') b)
+    puts ((get_attr a 'max'))
+    let 'c' a + 1
+    puts ((get_attr c 'to_list'))
+    (get_attr a 'set') 0 10
+    puts ((get_attr a 'get') 0)
+    puts ((get_attr array 'int64') [1.5])
+    '''
+    target = ['int64[1, 2, 3]',
+              'float64[0.5, 1.0, 2.0]',
+              'float64[2.0, 4.0, 7.0]',
+              'float64[0.5, 1.0, 1.5]',
+              'int64[1, 0, 0]',
+              '6',
+              '1.1666666666666667',
+              '8.5',
+              '3',
+              '[2, 3, 4]',
+              '10',
+              '========== Panic: ==========',
+              'PrimFun `prim.puts` panicked:',
+              "    Args: ((get_attr array 'int64') [1.5])",
+              'PrimFun `array.int64` panicked:',
+              '    Args: {[1.5]}',
+              'Module `test` panicked at line 24:',
+              "    Statement: (puts ((get_attr array 'int64') [1.5]))",
+              '    Panic: Arg `1.5` of `array.int64` must be a `Int`, not a `Float`']
+    assert get_output(source, capsys) == target
+
+
+def test_list_methods(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'puts' (get_attr prim 'puts')
+    let 'Fun' (get_attr prim 'Fun')
+    let '+' (get_attr (get_attr prim 'int') 'add')
+    let '*' (get_attr (get_attr prim 'int') 'mul')
+    let '<' (get_attr (get_attr prim 'int') 'lt')
+    let 'add' (get_attr (get_attr prim 'int') 'add')
+    let 'lt' (get_attr (get_attr prim 'int') 'lt')
+    let 'double' (Fun 'double'
+        (let 'eval' (get_attr (get_attr (get_attr meta 'caller') 'meta') 'eval'))
+        (let 'x' (eval ((get_attr (get_attr meta 'args') 'get') 0)))
+        x * 2)
+    let 'small' (Fun 'small'
+        (let 'eval' (get_attr (get_attr (get_attr meta 'caller') 'meta') 'eval'))
+        (let 'x' (eval ((get_attr (get_attr meta 'args') 'get') 0)))
+        x < 3)
+    let 'l' [3, 1, 2]
+    (get_attr l 'append') 5
+    (get_attr l 'extend') (4, 0)
+    puts l
+    puts ((get_attr l 'pop'))
+    puts ((get_attr l 'slice') 1 3)
+    puts ((get_attr l 'concat') ['a'])
+    puts ((get_attr l 'map') double)
+    puts ((get_attr l 'filter') small)
+    puts ((get_attr l 'reduce') add 0)
+    (get_attr l 'sort') lt
+    puts l
+    ((get_attr l 'reverse'))
+    puts l
+    puts ((get_attr l 'index_of') 2)
+    puts ((get_attr ['a', 1, 'b'] 'index_of') 'b')
+    puts ((get_attr l 'index_of') 7)
+    ((get_attr l 'filter') double)
+    '''
+    target = ['[3, 1, 2, 5, 4, 0]',
+              '0',
+              '[1, 2]',
+              '[3, 1, 2, 5, 4, a]',
+              '[6, 2, 4, 10, 8]',
+              '[1, 2]',
+              '15',
+              '[1, 2, 3, 4, 5]',
+              '[5, 4, 3, 2, 1]',
+              '3',
+              '2',
+              '-1',
+              '========== Panic: ==========',
+              'PrimFun `method_fun` panicked:',
+              '    Args: {double}',
+              'PrimFun `List.filter` panicked:',
+              '    Args: [5, 4, 3, 2, 1] {double}',
+              'Module `test` panicked at line 35:',
+              "    Statement: ((get_attr l 'filter') double)",
+              '    Panic: Functions passed to `List.filter` must return `Bool`s, not `Int`']
+    assert get_output(source, capsys) == target
+
+
+def test_prim_list(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'puts' (get_attr prim 'puts')
+    let 'list' (get_attr prim 'list')
+    let '*' (get_attr (get_attr prim 'int') 'mul')
+    let 'double' ((get_attr prim 'Fun') 'double'
+        (let 'eval' (get_attr (get_attr (get_attr meta 'caller') 'meta') 'eval'))
+        (eval ((get_attr (get_attr meta 'args') 'get') 0)) * 2)
+    let 'l' [3, 1, 2]
+    (get_attr list 'append') l 4
+    puts l
+    puts ((get_attr list 'len') l)
+    puts ((get_attr list 'map') l double)
+    puts ((get_attr list 'reduce') l (get_attr (get_attr prim 'int') 'add') 0)
+    (get_attr list 'sort') l (get_attr (get_attr prim 'int') 'lt')
+    puts l
+    puts ((get_attr list 'index_of') l 4)
+    '''
+    target = ['[3, 1, 2, 4]', '4', '[6, 2, 4, 8]', '10', '[1, 2, 3, 4]', '3']
+    assert get_output(source, capsys) == target
+
+
+def test_list_callbacks_evaluated_later(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'puts' (get_attr prim 'puts')
+    let 'Fun' (get_attr prim 'Fun')
+    let 'lazy' (Fun 'lazy'
+        (let 'caller' (get_attr meta 'caller'))
+        (let 'arg' ((get_attr (get_attr meta 'args') 'get') 0))
+        (Fun 'thunk' ((get_attr (get_attr caller 'meta') 'eval') arg)))
+    let 'thunks' ((get_attr [1, 2, 3] 'map') lazy)
+    puts (((get_attr thunks 'get') 0))
+    puts (((get_attr thunks 'get') 2))
+    '''
+    target = ['1', '3']
+    assert get_output(source, capsys) == target
+
+
+def test_persistent_collections(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'puts' (get_attr prim 'puts')
+    let 'PMap' (get_attr prim 'PMap')
+    let 'PVector' (get_attr prim 'PVector')
+    let '.' ((get_attr prim 'Fun') 'dot'
+        (let 'eval' (get_attr (get_attr (get_attr meta 'caller') 'meta') 'eval'))
+        (let 'rhs' ((get_attr (get_attr meta 'args') 'get') 1))
+        ((get_attr (eval ((get_attr (get_attr meta 'args') 'get') 0)) 'dot') (get_attr meta 'caller') rhs))
+    let 'm' (PMap {(1, 'a'), (2, 'b')})
+    let 'n' ((get_attr m 'set') 3 'c')
+    puts m
+    puts n
+    puts n.[3]
+    puts ((get_attr m 'has') 3)
+    puts ((get_attr ((get_attr n 'remove') 1) 'len'))
+    let 't' ((get_attr n 'transient'))
+    (get_attr t 'set') 4 'd'
+    (get_attr t 'set') 1 'z'
+    puts ((get_attr t 'persistent'))
+    puts n
+    let 'v' (PVector [1, 2, 3])
+    let 'w' ((get_attr v 'set') 0 'x')
+    puts v
+    puts w
+    puts ((get_attr ((get_attr w 'append') 4) 'pop'))
+    puts v.[2]
+    puts ((get_attr (PVector) 'len'))
+    puts ((get_attr v 'get') 3)
+    '''
+    target = ['PMap{1 -> a, 2 -> b}',
+              'PMap{1 -> a, 2 -> b, 3 -> c}',
+              'c',
+              'false',
+              '2',
+              'PMap{1 -> z, 2 -> b, 3 -> c, 4 -> d}',
+              'PMap{1 -> a, 2 -> b, 3 -> c}',
+              'PVector[1, 2, 3]',
+              'PVector[x, 2, 3]',
+              'PVector[x, 2, 3]',
+              '3',
+              '0',
+              '========== Panic: ==========',
+              'PrimFun `prim.puts` panicked:',
+              "    Args: ((get_attr v 'get') 3)",
+              'PrimFun `method_fun` panicked:',
+              '    Args: {3}',
+              'PrimFun `PVector.get` panicked:',
+              '    Args: PVector[1, 2, 3] {3}',
+              'Module `test` panicked at line 29:',
+              "    Statement: (puts ((get_attr v 'get') 3))",
+              '    Panic: Index `3` out of range (len = `3`)']
+    assert get_output(source, capsys) == target
+
+
+class CollidingKey:
+    def __init__(self, val):
+        self.val = val
+
+    def __hash__(self):
+        return self.val % 7
+
+    def __eq__(self, other):
+        return self.val == other.val
+
+
+def test_persistent_structures():
+    n = 40000
+    vec = PVector.from_list(range(n))
+    assert list(vec) == list(range(n))
+    updated = vec.assoc(1234, 'x').append('y')
+    assert updated.nth(1234) == 'x' and updated.nth(n) == 'y'
+    assert vec.nth(1234) == 1234 and vec.len == n
+    popped = updated
+    for i in range(n - 10):
+        popped = popped.pop()
+    assert list(popped) == list(range(11))
+    transient = vec.transient()
+    for i in range(0, n, 2):
+        transient.assoc(i, -i)
+    transient.persistent()
+    assert transient.nth(2) == -2 and vec.nth(2) == 2
+
+    pmap = PMap()
+    snapshots = []
+    for i in range(300):
+        pmap = pmap.assoc(CollidingKey(i), i)
+        snapshots.append(pmap)
+    for i in range(0, 300, 3):
+        pmap = pmap.dissoc(CollidingKey(i))
+    assert pmap.len == 200
+    assert sorted(key.val for key, val in pmap.items()) == [i for i in range(300) if i % 3]
+    assert snapshots[10].len == 11 and snapshots[10].find(CollidingKey(0)) == 0
+    assert pmap.find(CollidingKey(0), 'missing') == 'missing'
+
+
+def test_persistent_snapshots():
+    # snapshots of transients keep their contents as the transient changes
+    transient = PMap().transient()
+    for i in range(100):
+        transient.assoc(CollidingKey(i), i)
+    snapshot = transient.snapshot()
+    for i in range(100):
+        transient.assoc(CollidingKey(i), -i)
+    transient.dissoc(CollidingKey(1))
+    assert snapshot.edit is None and snapshot.len == 100
+    assert all(snapshot.find(CollidingKey(i)) == i for i in range(100))
+    assert transient.find(CollidingKey(2)) == -2 and transient.len == 99
+
+    transient = PVector.from_list(range(100)).transient()
+    snapshot = transient.snapshot()
+    for i in range(100):
+        transient.assoc(i, -i)
+    transient.append('x')
+    assert snapshot.edit is None and list(snapshot) == list(range(100))
+    assert transient.nth(99) == -99 and transient.len == 101
+
+
+def test_persistent_copies(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'puts' (get_attr prim 'puts')
+    let 'PMap' (get_attr prim 'PMap')
+    let 'PVector' (get_attr prim 'PVector')
+    let 't' ((get_attr (PMap {(1, 'a'), (2, 'b')}) 'transient'))
+    let 'm' (PMap t)
+    (get_attr t 'set') 1 'z'
+    puts m
+    puts t
+    let 'u' ((get_attr (PVector [1, 2]) 'transient'))
+    let 'v' (PVector u)
+    (get_attr u 'set') 0 'x'
+    (get_attr u 'append') 3
+    puts v
+    puts u
+    '''
+    target = ['PMap{1 -> a, 2 -> b}',
+              'PMap{1 -> z, 2 -> b}',
+              'PVector[1, 2]',
+              'PVector[x, 2, 3]']
+    assert get_output(source, capsys) == target
+
+
+def test_ast_lists_changed_in_place(capsys):
+    source = '''
+    (get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+    let 'puts' (get_attr prim 'puts')
+    let 'Fun' (get_attr prim 'Fun')
+    let 'f' (Fun 'f' (puts 1))
+    let 'g' (Fun 'g' (puts 2))
+    (f)
+    let 'args' (get_attr ((get_attr (get_attr f 'body') 'get') 0) 'args')
+    let 'one' ((get_attr args 'get') 0)
+    let 'two' ((get_attr (get_attr ((get_attr (get_attr g 'body') 'get') 0) 'args') 'get') 0)
+    (get_attr args 'set') 0 two
+    (f)
+    ((get_attr args 'pop'))
+    (get_attr args 'append') one
+    (f)
+    '''
+    assert get_output(source, capsys) == ['1', '2', '1']
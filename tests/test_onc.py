@@ -0,0 +1,143 @@
+import os
+import sys
+
+import pytest
+
+from obsidian import parser
+from obsidian.interpreter import onc, prim
+from obsidian.interpreter.core import parse_module
+from obsidian.interpreter.types import Object, String, Int, Float, Symbol, List, Tuple
+from obsidian.interpreter.types.ast import ASTSemantics
+from textwrap import dedent
+
+samples = [
+    '''
+    puts "Hello, World!"; puts 'Hi' r"raw" 1_000 2.5e3f
+    ''',
+    '''
+    let x = (1, 2,
+             3)
+    let y = {x, [1, 2, 3], @sym, $z}
+    f x.y + 3 ~add 4 123456789012345678901234567890
+    ''',
+    '''
+    def (f x)
+        let z = "a $x b $(g x) c ☃"
+        if z
+            do_this
+        else
+            """triple ""quoted"" $y"""
+    ''',
+    '''
+    ({.} x)
+    ()
+    {}
+    []
+    {x; y z}
+    ''',
+]
+
+
+def structure(obj):
+    if isinstance(obj, String):
+        return obj.str
+    if isinstance(obj, (Int, Float)):
+        return type(obj).__name__, obj.int if isinstance(obj, Int) else obj.float
+    if isinstance(obj, Symbol):
+        return 'Symbol', obj.symbol
+    if isinstance(obj, (List, Tuple)):
+        return type(obj).__name__, [structure(e) for e in obj.elems]
+    if isinstance(obj, Object):
+        return type(obj).__name__, getattr(obj, 'parseinfo', None), {
+            k: structure(v) for k, v in obj.attrs.items() if k != 'meta'}
+    return obj
+
+
+def assert_roundtrip(source):
+    statements, source_map = parser.parse(source, use_cache=False, semantics=ASTSemantics)
+    loaded, loaded_source_map = onc.load(onc.dumps(statements, source_map, source), source)
+    assert [structure(s) for s in loaded] == [structure(s) for s in statements]
+    assert loaded_source_map == source_map
+    assert loaded_source_map.injected() == source_map.injected()
+
+
+@pytest.mark.parametrize('source', samples)
+def test_roundtrip(source):
+    assert_roundtrip(dedent(source))
+
+
+def test_prelude_roundtrip():
+    path = os.path.join(os.path.dirname(parser.__file__), 'prelude', 'prelude.on')
+    with open(path) as f:
+        assert_roundtrip(f.read())
+
+
+def test_positions():
+    source = 'puts "a $x"\n'
+    statements, source_map = parser.parse(source, use_cache=False, semantics=ASTSemantics)
+    loaded, loaded_source_map = onc.load(onc.dumps(statements, source_map))
+    ident = loaded[0].args_list()[0].body_list()[1]
+    assert loaded_source_map.column(ident.parseinfo) == 9
+
+
+def test_bad_files():
+    with pytest.raises(onc.OncError):
+        onc.load(b'not a compiled module')
+    source = 'puts x\n'
+    statements, source_map = parser.parse(source, use_cache=False, semantics=ASTSemantics)
+    data = onc.dumps(statements, source_map, source)
+    with pytest.raises(onc.OncError):
+        onc.load(data, 'puts y\n')
+    with pytest.raises(onc.OncError):
+        onc.load(data[:-8])
+
+
+def test_corrupt_files(tmpdir):
+    source = "(get_attr prim 'let') 'x' 'from source'\n"
+    statements, source_map = parser.parse(source, use_cache=False, semantics=ASTSemantics)
+    data = onc.dumps(statements, source_map, source)
+    fields = onc.header_struct.unpack_from(data)
+    layout = dict(zip(onc.sections, zip(fields[4::2], fields[5::2])))
+    blob_offset = layout['blob'][0]
+    nodes_offset, nodes_len = layout['nodes']
+    bad_string = data[:blob_offset] + b'\xff' + data[blob_offset + 1:]
+    # the callable of the last node, a call, points past the end
+    callable_at = nodes_offset + (nodes_len - 5 + 2) * 4
+    bad_node = data[:callable_at] + (1 << 20).to_bytes(4, sys.byteorder) + data[callable_at + 4:]
+    for corrupt in [bad_string, bad_node]:
+        with pytest.raises(onc.OncError):
+            onc.load(corrupt, source)
+    # importing falls back to the source
+    path = str(tmpdir.join('module.on'))
+    with open(path, 'w') as f:
+        f.write(source)
+    with open(onc.compile_path(path), 'wb') as f:
+        f.write(bad_string)
+    module = prim.get('import').fun(String(path), String('module'))
+    assert module.get('x').str == 'from source'
+
+
+def test_compile_file(tmpdir):
+    path = str(tmpdir.join('module.on'))
+    source = 'let x = "compiled"\n'
+    with open(path, 'w') as f:
+        f.write(source)
+    assert onc.compile_file(path) == path + 'c'
+    statements, source_map = onc.load_file(path + 'c', source)
+    assert [structure(s) for s in statements] == \
+        [structure(s) for s in parser.parse(source, use_cache=False, semantics=ASTSemantics)[0]]
+    assert isinstance(parse_module(source, path)[0], list)
+
+
+def test_import_uses_onc(tmpdir):
+    path = str(tmpdir.join('module.on'))
+    with open(path, 'w') as f:
+        f.write("(get_attr prim 'let') 'x' 'from source'\n")
+    onc.compile_file(path)
+    module = prim.get('import').fun(String(path), String('module'))
+    assert module.get('x').str == 'from source'
+    # a stale .onc file is ignored
+    with open(path, 'w') as f:
+        f.write("(get_attr prim 'let') 'x' 'edited'\n")
+    module = prim.get('import').fun(String(path), String('module'))
+    assert module.get('x').str == 'edited'
@@ -2,6 +2,8 @@ from obsidian.semantics import *
 from obsidian import parser
 from textwrap import dedent
 
+import pytest
+
 
 def preprocess(source):
     text, source_map = parser.preprocess(dedent(source))
@@ -16,7 +18,7 @@ def test_flat():
     '''
     text, source_map = preprocess(source)
     assert text == dedent(source)
-    assert source_map == {}
+    assert source_map.injected() == {}
 
 
 def test_map():
@@ -28,7 +30,7 @@ def test_map():
     '''
     text, source_map = preprocess(source)
     assert text == dedent(source)
-    assert source_map == {}
+    assert source_map.injected() == {}
 
 
 def test_map_empty_indent():
@@ -40,7 +42,7 @@ def test_map_empty_indent():
         '''
     text, source_map = preprocess(source)
     assert text == dedent(source)
-    assert source_map == {}
+    assert source_map.injected() == {}
 
 
 def test_single_indent():
@@ -53,7 +55,7 @@ def test_single_indent():
         let x =
         {-INDENT-}    3 + 4
         {-DEDENT-}''')
-    assert source_map == {2: {0: 10}, 3: {0: 10}}
+    assert source_map.injected() == {2: {0: 10}, 3: {0: 10}}
 
 
 def test_single_indent_empty_indent():
@@ -68,7 +70,7 @@ def test_single_indent_empty_indent():
         {-INDENT-}    3 + 4
 
         {-DEDENT-}''')
-    assert source_map == {2: {0: 10}, 4: {0: 10}}
+    assert source_map.injected() == {2: {0: 10}, 4: {0: 10}}
 
 
 def test_single_indent_no_trailing_line():
@@ -79,7 +81,7 @@ def test_single_indent_no_trailing_line():
     assert text == dedent('''
         let x =
         {-INDENT-}    3 + 4{-DEDENT-}''')
-    assert source_map == {2: {0: 10, 19: 10}}
+    assert source_map.injected() == {2: {0: 10, 19: 10}}
 
 
 def test_whitespace():
@@ -96,7 +98,7 @@ def test_whitespace():
 
             let y = 3
         {-DEDENT-}''')
-    assert source_map == {2: {0: 10}, 5: {0: 10}}
+    assert source_map.injected() == {2: {0: 10}, 5: {0: 10}}
 
 
 def test_nested_indent():
@@ -111,7 +113,7 @@ def test_nested_indent():
         {-INDENT-}    if cond
         {-INDENT-}        puts "Hi"
         {-DEDENT-}{-DEDENT-}''')
-    assert source_map == {2: {0: 10}, 3: {0: 10}, 4: {0: 20}}
+    assert source_map.injected() == {2: {0: 10}, 3: {0: 10}, 4: {0: 20}}
 
 
 def test_nested_indent_no_trailing_line():
@@ -124,14 +126,14 @@ def test_nested_indent_no_trailing_line():
         fun (f) =
         {-INDENT-}    if cond
         {-INDENT-}        puts "Hi"{-DEDENT-}{-DEDENT-}''')
-    assert source_map == {2: {0: 10}, 3: {0: 10, 27: 20}}
+    assert source_map.injected() == {2: {0: 10}, 3: {0: 10, 27: 20}}
 
 
 def test_empty():
     source = ''
     text, source_map = preprocess(source)
     assert text == ''
-    assert source_map == {}
+    assert source_map.injected() == {}
 
 
 def test_nested_indent_parens():
@@ -148,7 +150,7 @@ def test_nested_indent_parens():
         {-INDENT-}    if cond
         {-INDENT-}        puts "Hi"
         {-DEDENT-}{-DEDENT-}''')
-    assert source_map == {3: {0: 10}, 4: {0: 10}, 5: {0: 20}}
+    assert source_map.injected() == {3: {0: 10}, 4: {0: 10}, 5: {0: 20}}
 
 
 def test_nested_indent_nested_parens():
@@ -171,7 +173,7 @@ def test_nested_indent_nested_parens():
         {-INDENT-}    if cond
         {-INDENT-}        puts "Hi"
         {-DEDENT-}{-DEDENT-}''')
-    assert source_map == {6: {0: 10}, 7: {0: 10}, 8: {0: 20}}
+    assert source_map.injected() == {6: {0: 10}, 7: {0: 10}, 8: {0: 20}}
 
 
 def test_nested_indent_nested_parens_no_trailing_line():
@@ -192,7 +194,7 @@ def test_nested_indent_nested_parens_no_trailing_line():
            ) =
         {-INDENT-}    if cond
         {-INDENT-}        puts "Hi"{-DEDENT-}{-DEDENT-}''')
-    assert source_map == {6: {0: 10}, 7: {0: 10, 27: 20}}
+    assert source_map.injected() == {6: {0: 10}, 7: {0: 10, 27: 20}}
 
 
 def test_nested_indent_quotes():
@@ -201,7 +203,7 @@ def test_nested_indent_quotes():
         thing {3[''
 
     ]})"""
-       ) """=
+       """) =
         if cond
             puts "Hi"
     '''
@@ -211,8 +213,99 @@ def test_nested_indent_quotes():
             thing {3[''
 
         ]})"""
-           ) """=
+           """) =
         {-INDENT-}    if cond
         {-INDENT-}        puts "Hi"
         {-DEDENT-}{-DEDENT-}''')
-    assert source_map == {6: {0: 10}, 7: {0: 10}, 8: {0: 20}}
+    assert source_map.injected() == {6: {0: 10}, 7: {0: 10}, 8: {0: 20}}
+
+
+def test_brackets_in_strings():
+    source = '''
+    puts "(" ')' "[{"
+    fun (f) =
+        puts "Hi"
+    '''
+    text, source_map = preprocess(source)
+    assert text == dedent('''
+        puts "(" ')' "[{"
+        fun (f) =
+        {-INDENT-}    puts "Hi"
+        {-DEDENT-}''')
+    assert source_map.injected() == {3: {0: 10}, 4: {0: 10}}
+
+
+def test_brackets_in_multiline_string():
+    source = '''
+    puts """(
+      ]"""
+    fun (f) =
+        puts "Hi"
+    '''
+    text, source_map = preprocess(source)
+    assert text == dedent('''
+        puts """(
+          ]"""
+        fun (f) =
+        {-INDENT-}    puts "Hi"
+        {-DEDENT-}''')
+    assert source_map.injected() == {4: {0: 10}, 5: {0: 10}}
+
+
+def test_quotes_in_comments():
+    source = '''
+    puts 'x'  # don't (count this
+    fun (f) =
+        puts "Hi"
+    '''
+    text, source_map = preprocess(source)
+    assert text == dedent('''
+        puts 'x'  # don't (count this
+        fun (f) =
+        {-INDENT-}    puts "Hi"
+        {-DEDENT-}''')
+    assert source_map.injected() == {3: {0: 10}, 4: {0: 10}}
+
+
+def test_escaped_quotes():
+    source = '''
+    puts "\\"(" 'it\\'s'
+    fun (f) =
+        puts "Hi"
+    '''
+    text, source_map = preprocess(source)
+    assert source_map.injected() == {3: {0: 10}, 4: {0: 10}}
+
+
+def test_interpolated_call():
+    source = '''
+    puts "a $(f ')' (g "(")) b"
+    fun (f) =
+        puts "Hi"
+    '''
+    text, source_map = preprocess(source)
+    assert source_map.injected() == {3: {0: 10}, 4: {0: 10}}
+
+
+def test_unmatched():
+    with pytest.raises(Exception, match='Unmatched parenthesis at line 2'):
+        preprocess('''
+        puts (f))
+        ''')
+
+
+def test_positions():
+    source = '''
+    let x =
+        3 + 4
+    puts x
+    '''
+    text, source_map = preprocess(source)
+    three = text.index('3')
+    assert source_map.line(three) == 2
+    assert source_map.column(three) == 4
+    assert source_map.column(text.index(parser.indent_tok)) == 0
+    puts = text.index('puts')
+    assert source_map.line(puts) == 3
+    assert source_map.column(puts) == 0
+    assert source_map.source_offset(puts) == dedent(source).index('puts')
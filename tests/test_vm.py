@@ -0,0 +1,116 @@
+from obsidian.parser import parse
+from obsidian.interpreter import load_module, prim, vm
+from obsidian.interpreter.funs import while_fn
+from obsidian.interpreter.types.ast import ASTSemantics
+from textwrap import dedent
+
+header = '''
+(get_attr prim 'let') 'let' (get_attr prim 'let')  # import let
+let 'puts' (get_attr prim 'puts')
+let 'Fun' (get_attr prim 'Fun')
+let 'while' (get_attr prim 'while')
+let 'cond' (get_attr prim 'cond')
+let 'do' (get_attr prim 'do')
+let 'assign' (get_attr prim 'assign')
+let 'panic' (get_attr prim 'panic')
+let '+' (get_attr (get_attr prim 'int') 'add')
+let '<' (get_attr (get_attr prim 'int') 'lt')
+let '==' (get_attr (get_attr prim 'int') 'eq')
+'''
+
+
+def outputs(source, capsys):
+    # the output of `source` with the tree evaluator and with the VM
+    ast, source_map = parse(dedent(header) + dedent(source))
+    res = []
+    for evaluator in ['tree', 'bytecode']:
+        load_module(ast, source_map, 'test', {'prim': prim}, evaluator=evaluator)
+        out, err = capsys.readouterr()
+        res.append(out.splitlines())
+    return res
+
+
+def compiled(source):
+    ast, source_map = parse(dedent(header))
+    module = load_module(ast, source_map, 'test', {'prim': prim})
+    statements, source_map = parse(dedent(source), semantics=ASTSemantics)
+    return vm.compile_code(module.preprocess(statements[0]))
+
+
+def test_inlines_control_flow():
+    code = compiled('''
+    while i < 3
+        cond (i == 1, (puts 'one')) (true, (do (puts i) (puts 'not one')))
+        assign 'i' i + 1
+    ''')
+    ops = code.ops[::2]
+    assert ops.count(vm.GUARD) == 3
+    assert vm.WHILE_TEST in ops
+    assert ops.count(vm.COND_TEST) == 2
+
+
+def test_loops(capsys):
+    tree, bytecode = outputs('''
+    let 'i' 0
+    while i < 4
+        cond (i == 1, (puts 'one')) (true, (do (puts i) (puts 'not one')))
+        assign 'i' i + 1
+    puts i
+    puts (while false 1)
+    puts (cond (false, 1))
+    puts (do 1 2 3)
+    ''', capsys)
+    assert bytecode == tree
+    assert bytecode == ['0', 'not one', 'one', '2', 'not one', '3', 'not one', '4',
+                        '<Nil>', '<Nil>', '3']
+
+
+def test_rebound_names(capsys):
+    # calls that look like control flow but aren't run as plain calls
+    tree, bytecode = outputs('''
+    let 'while' (Fun 'while' (puts 'my while'))
+    while false 1
+    let 'do' cond
+    puts (do (true, 'cond'))
+    ''', capsys)
+    assert bytecode == tree
+    assert bytecode == ['my while', 'cond']
+
+
+def test_panics_in_inlined_calls(capsys):
+    tree, bytecode = outputs('''
+    let 'i' 0
+    while i < 3
+        cond (i == 2, (panic 'two'))
+        assign 'i' i + 1
+    ''', capsys)
+    assert bytecode == tree
+    assert bytecode[-1] == '    Panic: two'
+    tree, bytecode = outputs('''
+    while 1
+        puts 'never'
+    ''', capsys)
+    assert bytecode == tree
+    assert bytecode[-1] == '    Panic: Conditions passed to `prim.while` must return `Bool`s, not `Int`'
+
+
+def test_fun_bodies_use_evaluator(capsys, monkeypatch):
+    # a `while` in a Fun body is inlined by the VM like any other, whether
+    # it's the last statement or not
+    calls = []
+    call = while_fn.call
+    monkeypatch.setattr(while_fn, 'call', lambda *args: calls.append(args) or call(*args))
+    tree, bytecode = outputs('''
+    let 'count' (Fun 'count'
+        (let 'j' 0)
+        (while j < 3 (assign 'j' j + 1))
+        j)
+    let 'spin' (Fun 'spin'
+        (let 'k' 0)
+        (while k < 2 (assign 'k' k + 1)))
+    puts (count)
+    puts (spin)
+    ''', capsys)
+    assert bytecode == tree
+    assert bytecode == ['3', '2']
+    assert len(calls) == 2  # both from the tree evaluator